@@ -1,15 +1,21 @@
 from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 import base64
-import io
-import wave
+from eventlet import tpool
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from elevenlabs_client import ElevenLabsClient
 from openai_client import OpenAIClient
 from conversation_logger import ConversationLogger
+from turn_pipeline import SentenceSplitter, TurnEngine
+from async_pipeline import AsyncPipeline, PipelineBusy
+from audio_format import client_sample_rate
+from session_store import create_session_store
+from cancellation import Cancelled, TurnRegistry
+from streaming_stt import StreamingTranscriber
+from http_transport import http_transport
 from config import Config
-import tempfile
 import os
 
 app = Flask(__name__)
@@ -20,85 +26,251 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', logger
 elevenlabs_client = ElevenLabsClient()
 openai_client = OpenAIClient()
 conversation_logger = ConversationLogger()
+if Config.SERVING_MODE == "async":
+    turn_engine = AsyncPipeline(openai_client, tts_cache=elevenlabs_client.tts_cache)
+else:
+    turn_engine = TurnEngine(elevenlabs_client, openai_client)
+session_store = create_session_store()
+# The in-flight turn of each sid; a new turn or a reset cancels it
+turns = TurnRegistry()
+# Live audio_frame streams by sid: (transcriber, endpointing, binary, output sample rate, client turn id)
+streams = {}
+stream_executor = ThreadPoolExecutor(max_workers=Config.STREAMING_STT_WORKERS, thread_name_prefix="stream-stt")
+threading.Thread(target=elevenlabs_client.prewarm_tts_cache, args=([OpenAIClient.FALLBACK_RESPONSE], SentenceSplitter),
+                 name="tts-prewarm", daemon=True).start()
+# Set once upstream connections are open; /ready answers 503 until then
+worker_ready = threading.Event()
+
+def warm_up_worker():
+    started_at = time.monotonic()
+    warm = http_transport.wait_warm(Config.READY_TIMEOUT_SECONDS)
+    if isinstance(turn_engine, AsyncPipeline):
+        remaining = max(Config.READY_TIMEOUT_SECONDS - (time.monotonic() - started_at), 0)
+        warm = turn_engine.warm_up(remaining) and warm
+    if warm:
+        print(f"✅ Worker {os.getpid()} ready in {time.monotonic() - started_at:.2f}s")
+    else:
+        print(f"⚠️ Worker {os.getpid()} still connecting upstream after {Config.READY_TIMEOUT_SECONDS:.0f}s, "
+              f"taking requests anyway")
+    worker_ready.set()
+
+threading.Thread(target=warm_up_worker, name="worker-warmup", daemon=True).start()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/ready')
+def readiness_check():
+    """Readiness probe: 503 until this process's upstream connections are warm"""
+    if not worker_ready.is_set():
+        return jsonify({'status': 'warming', 'pid': os.getpid()}), 503
+    return jsonify({'status': 'ready', 'pid': os.getpid()})
+
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    # A reconnecting client gets a new sid, so this conversation can't be resumed
+    turns.cancel(request.sid, "disconnect")
+    session_store.discard(request.sid)
+    streams.pop(request.sid, None)
     print('Client disconnected')
 
 @socketio.on('audio_data')
 def handle_audio_data(data):
+    cancel = turns.begin(request.sid)
     try:
-        # Decode base64 audio data
-        audio_data = base64.b64decode(data['audio'])
+        # Clients that send a binary attachment get binary audio back; base64 strings still work
+        binary = isinstance(data['audio'], (bytes, bytearray))
+        audio_data = bytes(data['audio']) if binary else base64.b64decode(data['audio'])
+        sample_rate = output_sample_rate(data)
         
-        # Create temporary WAV file
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
+        # Transcribe audio
+        emit('status', {'message': '🔎 Transcribing...'})
         
-        try:
-            # Transcribe audio
-            emit('status', {'message': '🔎 Transcribing...'})
-            with open(temp_file_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-            transcript = elevenlabs_client.stt(audio_bytes)
-            
-            if transcript and transcript.strip():
-                emit('transcript', {'text': transcript})
-                conversation_logger.log('User', transcript)
-                
-                # Generate AI response
-                emit('status', {'message': '🤖 Generating response...'})
-                response = openai_client.ask(transcript)
-                emit('ai_response', {'text': response})
-                conversation_logger.log('AI', response)
-                
-                # Generate speech
-                emit('status', {'message': '🗣️ Generating speech...'})
-                audio_bytes = elevenlabs_client.tts(response)
-                
-                # Save to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-                    # Create proper WAV file from PCM data
-                    import wave
-                    with wave.open(temp_audio.name, 'wb') as wav_file:
-                        wav_file.setnchannels(1)  # Mono
-                        wav_file.setsampwidth(2)  # 16-bit
-                        wav_file.setframerate(22050)  # 22.05kHz sample rate
-                        wav_file.writeframes(audio_bytes)
-                    audio_file_path = temp_audio.name
-                
-                # Read audio file and encode to base64
-                with open(audio_file_path, 'rb') as audio_file:
-                    audio_bytes = audio_file.read()
-                    audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                
-                emit('audio_response', {'audio': audio_base64})
-                
-                # Clean up temporary audio file
-                os.unlink(audio_file_path)
-                
-        finally:
-            # Clean up temporary input file
-            os.unlink(temp_file_path)
+        with session_store.session(request.sid) as conversation:
+            emit_turn(unblocked(turn_engine.run(audio_data, stream_chunks=True, session=conversation, cancel=cancel,
+                                                sample_rate=sample_rate, stream_text=True)), binary, sample_rate,
+                      data.get('turn'))
             
+    except Cancelled as e:
+        emit('turn_cancelled', {'reason': str(e)})
+    except PipelineBusy as e:
+        print(f"Rejecting audio_data: {e}")
+        emit('error', {'message': str(e), 'retry_after': e.retry_after})
     except Exception as e:
         print(f"Error in handle_audio_data: {e}")
         emit('error', {'message': f'Error processing audio: {str(e)}'})
+    finally:
+        turns.finish(request.sid, cancel)
+
+def unblocked(events):
+    """Advance a turn's events on a real thread.
+
+    The turn blocks on upstream I/O and thread pools, which would otherwise
+    stall eventlet's hub (nothing is monkey patched) and hold back every emit.
+    """
+    try:
+        while True:
+            event = tpool.execute(next, events, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        # Closing the turn cancels the upstream work its events were coming from
+        events.close()
+
+def output_sample_rate(data: dict) -> int:
+    """The reply audio rate a client asked for with ``output_sample_rate``, else the TTS default"""
+    return client_sample_rate(data.get('output_sample_rate')) or elevenlabs_client.SAMPLE_RATE
+
+def emit_turn(events, binary: bool, sample_rate: int, turn=None):
+    """Forward a turn's events to the client.
+
+    The answer's text is sent as ``ai_response_delta`` events while the LLM
+    generates it: the first delta at once, later ones batched so there is at
+    most one emit per RESPONSE_DELTA_BATCH_MS. Reply audio is pushed sentence
+    by sentence. If the turn is cancelled or fails partway, the answer so far
+    is logged as interrupted. Reply text and audio carry the client's ``turn``
+    id back, so it can drop what arrives after it stopped the turn.
+    """
+    response = None
+    answer = []  # every delta so far
+    unsent = []
+    sent_at = None
+    window = Config.RESPONSE_DELTA_BATCH_MS / 1000
+
+    def send_text(force: bool = False):
+        nonlocal unsent, sent_at
+        now = time.monotonic()
+        if unsent and (force or sent_at is None or now - sent_at >= window):
+            emit('ai_response_delta', {'text': "".join(unsent), 'turn': turn})
+            unsent = []
+            sent_at = now
+
+    try:
+        for event in events:
+            if event['type'] == 'response_delta':
+                answer.append(event['text'])
+                unsent.append(event['text'])
+                send_text()
+                continue
+            # Don't hold the last few tokens back while audio streams
+            send_text(force=event['type'] in ('response', 'done'))
+            if event['type'] == 'transcript':
+                transcript = event['text']
+                if not transcript or not transcript.strip():
+                    break
+                emit('transcript', {'text': transcript, 'final': True})
+                conversation_logger.log('User', transcript, session_id=request.sid)
+                emit('status', {'message': '🤖 Generating response...'})
+            elif event['type'] == 'audio_chunk':
+                emit('audio_response', {
+                    'audio': event['pcm'] if binary else base64.b64encode(event['pcm']).decode('ascii'),
+                    'index': event['index'],
+                    'encoding': 'pcm_s16le',
+                    'sample_rate': sample_rate,
+                    'turn': turn
+                })
+            elif event['type'] == 'response':
+                emit('ai_response', {'text': event['text'], 'turn': turn})
+                response = event['text']
+            elif event['type'] == 'done':
+                emit('turn_complete', {'segments': event['segments'], 'timings': event['timings']})
+                conversation_logger.log('AI', response, session_id=request.sid, timings=event['timings'])
+    except Exception:
+        partial = "".join(answer).strip()
+        if partial and response is None:
+            conversation_logger.log('AI', partial, session_id=request.sid, interrupted=True)
+        raise
+    finally:
+        # Left early (no speech, or a failure): stop the rest of the turn now rather than when it's collected
+        events.close()
+
+@socketio.on('audio_start')
+def handle_audio_start(data):
+    """Begin a live stream of 16-bit mono PCM ``audio_frame`` events.
+
+    ``endpointing`` is ``vad`` (the server decides when the user has stopped)
+    or ``client`` (the turn runs on ``audio_end``, e.g. push-to-talk release).
+    ``sample_rate`` is the rate of the frames (16 kHz, what STT works at, needs
+    no resampling) and ``output_sample_rate`` the rate to send the reply at.
+    ``turn`` is the client's id for the turn, echoed on the reply.
+    """
+    data = data or {}
+    # The user talking over the reply stops it
+    turns.cancel(request.sid, "barge-in")
+    endpointing = data.get('endpointing', 'vad')
+    transcriber = StreamingTranscriber(elevenlabs_client.stt, stream_executor, int(data.get('sample_rate', 16000)))
+    streams[request.sid] = (transcriber, endpointing, bool(data.get('binary', True)), output_sample_rate(data),
+                            data.get('turn'))
+
+@socketio.on('audio_frame')
+def handle_audio_frame(data):
+    stream = streams.get(request.sid)
+    if stream is None:
+        emit('error', {'message': 'audio_frame before audio_start'})
+        return
+    transcriber, endpointing, _, _, _ = stream
+    try:
+        audio = data['audio'] if isinstance(data, dict) else data
+        events = transcriber.feed(bytes(audio) if isinstance(audio, (bytes, bytearray)) else base64.b64decode(audio))
+    except Exception as e:
+        print(f"Error in handle_audio_frame: {e}")
+        emit('error', {'message': f'Invalid audio frame: {str(e)}'})
+        return
+    for event in events:
+        if event['type'] == 'interim':
+            emit('transcript', {'text': event['text'], 'final': False})
+        elif event['type'] == 'end_of_speech' and endpointing == 'vad':
+            finish_stream(stream)
+
+@socketio.on('audio_end')
+def handle_audio_end(data=None):
+    stream = streams.get(request.sid)
+    if stream is not None:
+        finish_stream(stream)
+
+def finish_stream(stream):
+    """Transcribe what is left of the utterance and run the reply"""
+    transcriber, _, binary, sample_rate, turn = stream
+    cancel = turns.begin(request.sid)
+    try:
+        started_at = time.perf_counter()
+        transcript, timings = tpool.execute(transcriber.finish)
+        print(f"⏱️ STT after end of speech: {timings['stt']:.2f}s ({timings['stt_segments']} segments)")
+        if not transcript:
+            emit('status', {'message': '🎤 Ready to listen...'})
+            return
+        emit('transcript', {'text': transcript, 'final': True})
+        conversation_logger.log('User', transcript, session_id=request.sid)
+        emit('status', {'message': '🤖 Generating response...'})
+        with session_store.session(request.sid) as conversation:
+            emit_turn(unblocked(turn_engine.respond(transcript, started_at=started_at, timings=timings,
+                                                    stream_chunks=True, session=conversation, cancel=cancel,
+                                                    sample_rate=sample_rate, stream_text=True)), binary, sample_rate,
+                      turn)
+    except Cancelled as e:
+        emit('turn_cancelled', {'reason': str(e)})
+    except PipelineBusy as e:
+        print(f"Rejecting streamed turn: {e}")
+        emit('error', {'message': str(e), 'retry_after': e.retry_after})
+    except Exception as e:
+        print(f"Error in finish_stream: {e}")
+        emit('error', {'message': f'Error processing audio: {str(e)}'})
+    finally:
+        turns.finish(request.sid, cancel)
 
 @socketio.on('reset_conversation')
 def handle_reset():
-    openai_client.reset_history()
+    # Cancel first, so the stopped turn can't save its history over the reset
+    turns.cancel(request.sid, "reset")
+    session_store.reset(request.sid)
     # Log the conversation reset
-    conversation_logger.log('System', 'Conversation reset')
+    conversation_logger.log('System', 'Conversation reset', session_id=request.sid)
     emit('status', {'message': '🔄 Conversation reset'})
 
 if __name__ == '__main__':
@@ -1,23 +1,125 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, session
 import base64
-import wave
-import tempfile
+import json
 import os
 import traceback
+import uuid
 import gc
 import psutil
+import struct
+import threading
+import time
+from urllib.parse import quote
 from elevenlabs_client import ElevenLabsClient
 from openai_client import OpenAIClient
 from conversation_logger import ConversationLogger
+from turn_pipeline import SentenceSplitter, TurnEngine
+from async_pipeline import AsyncPipeline, PipelineBusy
+from audio_format import client_sample_rate, wav_bytes, wav_header
+from session_store import create_session_store
+from cancellation import Cancelled, TurnRegistry
+from metrics import metrics
+from http_transport import http_transport
 from config import Config
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 
-# Initialize clients
-elevenlabs_client = ElevenLabsClient()
-openai_client = OpenAIClient()
-conversation_logger = ConversationLogger()
+# Per-worker clients, built by init_worker after the fork
+elevenlabs_client = None
+openai_client = None
+conversation_logger = None
+turn_engine = None
+session_store = None
+# The in-flight turn of each conversation; a new turn or a reset cancels it
+turns = TurnRegistry()
+worker_lock = threading.Lock()
+worker_pid = None
+worker_ready = threading.Event()
+
+def init_worker():
+    """Build this process's clients, turn pipeline and session store, and start warming them up.
+
+    gunicorn.conf.py runs this in each worker right after the fork (the
+    master only imports the modules, so recycling a worker doesn't re-import
+    the SDKs); otherwise the first request does. A worker never shares the
+    master's connection pools, threads or event loop. ``worker_ready`` is set
+    once the upstream connections are open, or after READY_TIMEOUT_SECONDS.
+    """
+    global elevenlabs_client, openai_client, conversation_logger, turn_engine, session_store, worker_pid, worker_ready
+    with worker_lock:
+        if worker_pid == os.getpid():
+            return
+        worker_pid = os.getpid()
+        worker_ready = threading.Event()
+        elevenlabs_client = ElevenLabsClient()
+        openai_client = OpenAIClient()
+        conversation_logger = ConversationLogger()
+        if Config.SERVING_MODE == "async":
+            turn_engine = AsyncPipeline(openai_client, tts_cache=elevenlabs_client.tts_cache)
+        else:
+            turn_engine = TurnEngine(elevenlabs_client, openai_client)
+        session_store = create_session_store()
+        threading.Thread(target=elevenlabs_client.prewarm_tts_cache, args=([OpenAIClient.FALLBACK_RESPONSE], SentenceSplitter),
+                         name="tts-prewarm", daemon=True).start()
+        threading.Thread(target=warm_up_worker, args=(worker_ready,), name="worker-warmup", daemon=True).start()
+
+def warm_up_worker(ready: threading.Event):
+    started_at = time.monotonic()
+    warm = http_transport.wait_warm(Config.READY_TIMEOUT_SECONDS)
+    if isinstance(turn_engine, AsyncPipeline):
+        remaining = max(Config.READY_TIMEOUT_SECONDS - (time.monotonic() - started_at), 0)
+        warm = turn_engine.warm_up(remaining) and warm
+    if warm:
+        print(f"✅ Worker {os.getpid()} ready in {time.monotonic() - started_at:.2f}s")
+    else:
+        print(f"⚠️ Worker {os.getpid()} still connecting upstream after {Config.READY_TIMEOUT_SECONDS:.0f}s, "
+              f"taking requests anyway")
+    ready.set()
+
+@app.before_request
+def ensure_worker():
+    init_worker()
+
+def conversation_id() -> str:
+    """Conversation key for the caller, kept in the signed Flask session cookie"""
+    if 'conversation_id' not in session:
+        session['conversation_id'] = uuid.uuid4().hex
+    return session['conversation_id']
+
+def request_audio():
+    """Uploaded audio as (bytes, sent_as_binary).
+
+    Accepts a raw ``audio/*`` or ``application/octet-stream`` body, a multipart
+    form with an ``audio`` file, or the original base64 JSON ``{'audio': ...}``.
+    """
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        return request.get_data(cache=False), True
+    if 'audio' in request.files:
+        return request.files['audio'].read(), True
+    data = request.get_json(silent=True)
+    if data and 'audio' in data:
+        with metrics.span('decode_base64'):
+            return base64.b64decode(data['audio']), False
+    return None, False
+
+def output_sample_rate() -> int:
+    """The reply audio rate the client asked for with ``?sample_rate=``, else the TTS default"""
+    return client_sample_rate(request.args.get('sample_rate')) or elevenlabs_client.SAMPLE_RATE
+
+def wants(*mimetypes) -> bool:
+    """Whether the client prefers one of ``mimetypes`` over JSON"""
+    return request.accept_mimetypes.best_match(['application/json', *mimetypes]) in mimetypes
+
+# Binary turn stream: each frame is a 1-byte kind and a little-endian uint32 length, then the payload
+FRAME_EVENT = b'j'  # UTF-8 JSON turn event
+FRAME_AUDIO = b'a'  # raw PCM for the sentence being played
+
+def frame(kind: bytes, payload: bytes) -> bytes:
+    return kind + struct.pack('<I', len(payload)) + payload
+
+def busy_response(error: PipelineBusy):
+    return jsonify({'error': str(error), 'retry_after': error.retry_after}), 429, {'Retry-After': str(error.retry_after)}
 
 def log_memory_usage():
     """Log current memory usage"""
@@ -34,120 +136,251 @@ def process_audio():
     try:
         log_memory_usage()
         
-        data = request.get_json()
-        if not data or 'audio' not in data:
+        audio_data, binary = request_audio()
+        if not audio_data:
             return jsonify({'error': 'No audio data provided'}), 400
         
-        print(f"🔍 Processing audio request - data size: {len(data['audio'])}")
-        
-        # Decode base64 audio data
-        audio_data = base64.b64decode(data['audio'])
-        print(f"🎵 Decoded audio size: {len(audio_data)} bytes")
+        print(f"🎵 Received {'binary' if binary else 'base64'} audio: {len(audio_data)} bytes")
         
         # Limit audio size to prevent memory issues
         if len(audio_data) > 10 * 1024 * 1024:  # 10MB limit
             return jsonify({'error': 'Audio file too large'}), 400
         
-        # Create temporary WAV file
-        temp_file_path = None
-        temp_audio_path = None
-        
+        cancel = None
         try:
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            print(f"💾 Created temp file: {temp_file_path}")
-            
-            # Transcribe audio
+            # Transcribe audio, then stream LLM sentences into overlapped TTS
             print("🔎 Starting STT...")
-            with open(temp_file_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-            transcript = elevenlabs_client.stt(audio_bytes)
+            conversation = session_store.get(conversation_id())
+            cancel = turns.begin(conversation.session_id)
+            sample_rate = output_sample_rate()
+            events = turn_engine.run(audio_data, session=conversation, cancel=cancel, sample_rate=sample_rate)
+            transcript = next(events)['text']
             print(f"📝 Transcript: {transcript}")
             
             # Clear audio bytes from memory
-            del audio_bytes
-            gc.collect()
+            del audio_data
             
             if not transcript or not transcript.strip():
                 return jsonify({'error': 'No speech detected'}), 400
             
             # Log user input
-            conversation_logger.log('User', transcript)
+            conversation_logger.log('User', transcript, session_id=conversation.session_id)
             
-            # Generate AI response
-            print("🤖 Generating AI response...")
-            response = openai_client.ask(transcript)
+            # Generate AI response and speech
+            print("🤖 Generating AI response and speech...")
+            pcm_segments = []
+            response, timings = '', {}
+            for event in events:
+                if event['type'] == 'audio':
+                    pcm_segments.append(event['pcm'])
+                elif event['type'] == 'response':
+                    response = event['text']
+                elif event['type'] == 'done':
+                    timings = event['timings']
+            session_store.save(conversation)
             print(f"🤖 AI Response: {response}")
-            conversation_logger.log('AI', response)
+            conversation_logger.log('AI', response, session_id=conversation.session_id, timings=timings)
             
-            # Generate speech
-            print("🗣️ Generating speech...")
-            tts_audio_bytes = elevenlabs_client.tts(response)
-            print(f"🎵 Generated {len(tts_audio_bytes)} bytes of audio")
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-                # Create proper WAV file from PCM data
-                with wave.open(temp_audio.name, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # Mono
-                    wav_file.setsampwidth(2)  # 16-bit
-                    wav_file.setframerate(22050)  # 22.05kHz sample rate
-                    wav_file.writeframes(tts_audio_bytes)
-                temp_audio_path = temp_audio.name
-            
-            print(f"💾 Created audio file: {temp_audio_path}")
-            
-            # Read audio file and encode to base64
-            with open(temp_audio_path, 'rb') as audio_file:
-                final_audio_bytes = audio_file.read()
-                audio_base64 = base64.b64encode(final_audio_bytes).decode('utf-8')
-            
-            # Clear audio data from memory
-            del tts_audio_bytes, final_audio_bytes
-            gc.collect()
+            # WAV header goes straight in front of the PCM, no temp file round trip
+            with metrics.span('encode_wav', session=conversation.session_id):
+                wav_audio = wav_bytes(pcm_segments, sample_rate)
+            del pcm_segments
+            print(f"🎵 Generated {len(wav_audio)} bytes of audio")
             
             print(f"✅ Successfully processed request")
             log_memory_usage()
             
+            if wants('audio/wav'):
+                # Binary reply: the WAV is the body and the text rides along in headers
+                return Response(wav_audio, mimetype='audio/wav', headers={
+                    'X-Transcript': quote(transcript),
+                    'X-Response': quote(response),
+                    'X-Timings': json.dumps(timings)
+                })
+            
+            with metrics.span('encode_base64', session=conversation.session_id):
+                audio_base64 = base64.b64encode(wav_audio).decode('ascii')
+            del wav_audio
             return jsonify({
                 'transcript': transcript,
                 'response': response,
-                'audio': audio_base64
+                'audio': audio_base64,
+                'timings': timings
             })
             
         finally:
-            # Clean up temporary files
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            if temp_audio_path and os.path.exists(temp_audio_path):
-                os.unlink(temp_audio_path)
+            if cancel is not None:
+                turns.finish(conversation.session_id, cancel)
             # Force garbage collection
             gc.collect()
             
+    except Cancelled as e:
+        # Superseded by a newer turn or a reset; the client has moved on
+        return jsonify({'error': 'Turn cancelled', 'reason': str(e)}), 409
+    except PipelineBusy as e:
+        print(f"⏳ Rejecting audio request: {e}")
+        return busy_response(e)
     except Exception as e:
         print(f"❌ Error processing audio: {e}")
         print(f"❌ Full traceback: {traceback.format_exc()}")
         log_memory_usage()
         return jsonify({'error': f'Error processing audio: {str(e)}'}), 500
 
+@app.route('/process_audio_stream', methods=['POST'])
+def process_audio_stream():
+    """Same turn as /process_audio, streamed so playback starts on the first sentence.
+
+    Sent as NDJSON with base64 audio by default, or as binary frames (see
+    ``frame``) when the client accepts ``application/octet-stream``.
+    """
+    audio_data, _ = request_audio()
+    if not audio_data:
+        return jsonify({'error': 'No audio data provided'}), 400
+    
+    if len(audio_data) > 10 * 1024 * 1024:  # 10MB limit
+        return jsonify({'error': 'Audio file too large'}), 400
+    
+    conversation = session_store.get(conversation_id())
+    sample_rate = output_sample_rate()
+    cancel = turns.begin(conversation.session_id)
+    try:
+        events = turn_engine.run(audio_data, stream_chunks=True, session=conversation, cancel=cancel,
+                                 sample_rate=sample_rate)
+    except PipelineBusy as e:
+        turns.finish(conversation.session_id, cancel)
+        print(f"⏳ Rejecting audio request: {e}")
+        return busy_response(e)
+    
+    binary = wants('application/octet-stream')
+    
+    def encode(event: dict) -> bytes:
+        if binary:
+            return frame(FRAME_EVENT, json.dumps(event).encode('utf-8'))
+        return (json.dumps(event) + '\n').encode('utf-8')
+    
+    def generate():
+        response = None
+        stopped = "disconnect"  # why the turn ended early, until it completes
+        try:
+            for event in events:
+                if event['type'] == 'transcript':
+                    if not event['text'] or not event['text'].strip():
+                        stopped = None
+                        yield encode({'type': 'error', 'error': 'No speech detected'})
+                        return
+                    conversation_logger.log('User', event['text'], session_id=conversation.session_id)
+                elif event['type'] == 'audio_chunk' and binary:
+                    yield frame(FRAME_AUDIO, event['pcm'])
+                    continue
+                elif event['type'] == 'audio_chunk':
+                    with metrics.span('encode_base64', session=conversation.session_id):
+                        audio = base64.b64encode(event['pcm']).decode('ascii')
+                    event = {
+                        'type': 'audio_chunk',
+                        'index': event['index'],
+                        'audio': audio,
+                        'sample_rate': sample_rate
+                    }
+                elif event['type'] == 'response':
+                    response = event['text']
+                elif event['type'] == 'done':
+                    stopped = None
+                    conversation_logger.log('AI', response, session_id=conversation.session_id,
+                                            timings=event['timings'])
+                yield encode(event)
+        except Cancelled as e:
+            stopped = None
+            yield encode({'type': 'cancelled', 'reason': str(e)})
+        except Exception as e:
+            stopped = "error"
+            print(f"❌ Error streaming audio turn: {e}")
+            print(f"❌ Full traceback: {traceback.format_exc()}")
+            yield encode({'type': 'error', 'error': f'Error processing audio: {str(e)}'})
+        finally:
+            # A client that went away mid-reply stops the LLM and TTS work still running for it
+            turns.finish(conversation.session_id, cancel, stopped)
+            events.close()
+            # A cancelled or abandoned turn leaves the session to whatever cancelled it
+            if not cancel.cancelled:
+                session_store.save(conversation)
+            gc.collect()
+    
+    if binary:
+        return Response(stream_with_context(generate()), mimetype='application/octet-stream',
+                        headers={'X-Sample-Rate': str(sample_rate)})
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/speak', methods=['POST'])
+def speak():
+    """Synthesize text and stream it back as a WAV as the PCM arrives"""
+    data = request.get_json()
+    if not data or not data.get('text', '').strip():
+        return jsonify({'error': 'No text provided'}), 400
+    
+    sample_rate = output_sample_rate()
+    
+    def generate():
+        yield wav_header(sample_rate)
+        yield from elevenlabs_client.tts_stream(data['text'], sample_rate=sample_rate)
+    
+    return Response(stream_with_context(generate()), mimetype='audio/wav')
+
 @app.route('/reset', methods=['POST'])
 def reset_conversation():
-    openai_client.reset_history()
-    conversation_logger.log('System', 'Conversation reset')
+    # Cancel first, so the stopped turn can't save its history over the reset
+    turns.cancel(conversation_id(), "reset")
+    session_store.reset(conversation_id())
+    conversation_logger.log('System', 'Conversation reset', session_id=conversation_id())
     gc.collect()  # Clean up memory
     return jsonify({'message': 'Conversation reset'})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until this worker's upstream connections are warm"""
+    if not worker_ready.is_set():
+        return jsonify({'status': 'warming', 'pid': os.getpid()}), 503
+    return jsonify({'status': 'ready', 'pid': os.getpid()})
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
         log_memory_usage()
-        return jsonify({'status': 'healthy', 'memory_usage_mb': psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024})
+        return jsonify({
+            'status': 'healthy',
+            'worker': {'pid': os.getpid(), 'ready': worker_ready.is_set()},
+            'memory_usage_mb': psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024,
+            'sessions': session_store.stats(),
+            'context': openai_client.context.stats(),
+            'pipeline': turn_engine.stats(),
+            'cancellation': turns.stats(),
+            'conversation_log': conversation_logger.stats(),
+            'http': http_transport.stats(),
+            'tts_cache': elevenlabs_client.tts_cache.stats() if elevenlabs_client.tts_cache else None,
+            'response_cache': openai_client.response_cache.stats() if openai_client.response_cache else None
+        })
     except Exception as e:
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latency histograms in the Prometheus text format"""
+    http = http_transport.stats()
+    body = metrics.render({
+        'process_resident_memory_bytes': psutil.Process(os.getpid()).memory_info().rss,
+        'http_pool_connections': http['connections'],
+        'http_pool_active_connections': http['active_connections'],
+        'http_pool_max_connections': http['max_connections'],
+        'http_requests_in_flight': http['in_flight'],
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/spans', methods=['GET'])
+def metrics_spans():
+    """Recent timing spans, e.g. ``?session=<id>`` for where one conversation's turns spent their time"""
+    limit = request.args.get('limit', 200, type=int)
+    return jsonify({'spans': metrics.spans(request.args.get('session'), limit)})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     print("🌐 Starting simple web server...")
@@ -155,5 +388,6 @@ if __name__ == '__main__':
     print(f"  Voice Cloning: {'Enabled' if Config.ENABLE_VOICE_CLONING else 'Disabled'}")
     print(f"  Conversation Logging: {'Enabled' if Config.ENABLE_CONVERSATION_LOGGING else 'Disabled'}")
     log_memory_usage()
+    init_worker()
     print(f"🌐 Open http://localhost:{port} in your browser")
     app.run(debug=False, host='0.0.0.0', port=port) 
\ No newline at end of file
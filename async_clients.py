@@ -0,0 +1,193 @@
+"""
+Async Clients Module
+asyncio versions of the STT, TTS and LLM clients sharing one pooled HTTP client per event loop
+"""
+
+import asyncio
+import time
+import traceback
+from typing import AsyncIterator
+import httpx
+import openai
+from elevenlabs.client import AsyncElevenLabs
+from audio_format import StreamResampler, pcm_chunks, stt_upload, tts_output_format
+from config import Config
+from elevenlabs_client import ElevenLabsClient, elevenlabs_environment, normalize_transcript
+from http_transport import http_transport
+from metrics import metrics
+from openai_client import OpenAIClient
+from session_store import Session
+from stt_strategy import HedgedSTT
+from tts_cache import TTSCache, cache_key
+
+
+class AsyncElevenLabsClient:
+    """Non-blocking counterpart of ElevenLabsClient for the async pipeline"""
+
+    OUTPUT_FORMAT = ElevenLabsClient.OUTPUT_FORMAT
+    SAMPLE_RATE = ElevenLabsClient.SAMPLE_RATE
+    MODEL_ID = ElevenLabsClient.MODEL_ID
+
+    def __init__(self, http_client: httpx.AsyncClient, stt_strategy: HedgedSTT = None, tts_cache: TTSCache = None):
+        self.voice_id = Config.VOICE_ID or ElevenLabsClient.DEFAULT_VOICE_ID
+        self.stt_strategy = stt_strategy or HedgedSTT()
+        self.tts_cache = tts_cache
+        self.client = AsyncElevenLabs(
+            api_key=Config.ELEVENLABS_API_KEY,
+            environment=elevenlabs_environment(),
+            httpx_client=http_client
+        )
+
+    async def _convert(self, upload: dict, params: dict) -> str:
+        response = await self.client.speech_to_text.convert(
+            **upload, **params, request_options={'timeout_in_seconds': http_transport.timeout('stt')}
+        )
+        return response.text
+
+    async def stt(self, audio: bytes) -> str:
+        try:
+            print(f"🔍 Starting async STT with {len(audio)} bytes of audio")
+            with metrics.span('decode_audio'):
+                upload = stt_upload(audio)
+            result = await self.stt_strategy.transcribe_async(upload, self._convert)
+            print(f"📝 STT Result: {result}")
+            return normalize_transcript(result)
+        except Exception as e:
+            print(f"❌ STT Error: {e}")
+            print(f"❌ STT Error traceback: {traceback.format_exc()}")
+            raise
+
+    async def tts_stream(self, text: str, min_chunk_bytes: int = None, sample_rate: int = None) -> AsyncIterator[bytes]:
+        """Yield sample-aligned PCM chunks at ``sample_rate`` as they arrive, like ElevenLabsClient.tts_stream"""
+        sample_rate = sample_rate or self.SAMPLE_RATE
+        output_format, tts_rate = tts_output_format(sample_rate)
+        if tts_rate == sample_rate:
+            async for chunk in self._tts_stream(text, output_format, min_chunk_bytes):
+                yield chunk
+            return
+        resampler = StreamResampler(tts_rate, sample_rate)
+        async for chunk in self._tts_stream(text, output_format, min_chunk_bytes):
+            chunk = resampler.feed(chunk)
+            if chunk:
+                yield chunk
+        tail = resampler.flush()
+        if tail:
+            yield tail
+
+    async def _tts_stream(self, text: str, output_format: str, min_chunk_bytes: int = None) -> AsyncIterator[bytes]:
+        min_chunk_bytes = Config.TTS_STREAM_CHUNK_BYTES if min_chunk_bytes is None else min_chunk_bytes
+        key = None
+        if self.tts_cache and self.tts_cache.cacheable(text):
+            key = cache_key(self.voice_id, self.MODEL_ID, output_format, text)
+            cached = self.tts_cache.get(key)
+            if cached is not None:
+                print(f"🗃️ TTS cache hit for: '{text[:50]}'")
+                for chunk in pcm_chunks(cached, min_chunk_bytes):
+                    yield chunk
+                return
+        try:
+            print(f"🎵 Starting async TTS for text: '{text[:50]}...'")
+            started_at = time.perf_counter()
+            pending = bytearray()
+            synthesized = [] if key else None
+            first_byte_at = None
+            async for chunk in self.client.text_to_speech.stream(
+                voice_id=self.voice_id,
+                text=text,
+                model_id=self.MODEL_ID,
+                output_format=output_format,
+                request_options={'timeout_in_seconds': http_transport.timeout('tts')}
+            ):
+                if first_byte_at is None:
+                    first_byte_at = time.perf_counter()
+                    metrics.observe('tts_first_byte', first_byte_at - started_at)
+                pending += chunk
+                if len(pending) >= min_chunk_bytes:
+                    cut = len(pending) - (len(pending) % 2)
+                    out = bytes(pending[:cut])
+                    del pending[:cut]
+                    if key:
+                        synthesized.append(out)
+                    yield out
+            if pending:
+                if key:
+                    synthesized.append(bytes(pending))
+                yield bytes(pending)
+            metrics.observe('tts_total', time.perf_counter() - started_at)
+            if key:
+                self.tts_cache.put(key, b"".join(synthesized))
+        except Exception as e:
+            print(f"❌ TTS Error: {e}")
+            raise
+
+    async def tts(self, text: str, sample_rate: int = None) -> bytes:
+        return b"".join([chunk async for chunk in self.tts_stream(text, sample_rate=sample_rate)])
+
+
+class AsyncOpenAIClient:
+    """Non-blocking streaming LLM client.
+
+    Conversation bookkeeping (context window, summaries, history) is shared
+    with the synchronous OpenAIClient so both serving modes behave the same.
+    """
+
+    def __init__(self, openai_client: OpenAIClient, http_client: httpx.AsyncClient):
+        self.sync_client = openai_client
+        self.client = openai.AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL or None,
+            http_client=http_client,
+            timeout=http_transport.timeout('llm')
+        )
+
+    async def ask_stream(self, prompt: str, system_prompt: str = None, session: Session = None) -> AsyncIterator[str]:
+        session = session or self.sync_client.session
+        context = self.sync_client.context
+        response_cache = self.sync_client.response_cache
+        parts = []
+        interrupted = False
+        try:
+            cached, cache_key = self.sync_client.cached_answer(prompt, system_prompt, session)
+            if cached is not None:
+                yield cached
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.sync_client.record_turn, session, prompt, cached
+                )
+                return
+            messages = context.build_messages(prompt, system_prompt, session)
+            print(f"🤖 Streaming async request to OpenAI with {len(messages)} messages")
+
+            started_at = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        metrics.observe('llm_first_token', time.perf_counter() - started_at, session.session_id)
+                    parts.append(delta)
+                    yield delta
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ OpenAI API error: {e}")
+            if not parts:
+                print(f"🤖 Using fallback response: {OpenAIClient.FALLBACK_RESPONSE}")
+                yield OpenAIClient.FALLBACK_RESPONSE
+                return
+            interrupted = True
+
+        answer = "".join(parts).strip()
+        metrics.observe('llm_total', time.perf_counter() - started_at, session.session_id)
+        if cache_key is not None and not interrupted:
+            response_cache.put(cache_key, answer)
+        # Summarizing may call the LLM synchronously; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.sync_client.record_turn, session, prompt, answer
+        )
@@ -0,0 +1,295 @@
+"""
+Async Pipeline Module
+Serves conversational turns from a dedicated asyncio loop with bounded concurrency
+"""
+
+import asyncio
+import concurrent.futures
+import math
+import os
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator
+from config import Config
+from http_transport import http_transport
+from metrics import metrics
+from async_clients import AsyncElevenLabsClient, AsyncOpenAIClient
+from cancellation import CancelToken, Cancelled
+from turn_pipeline import ReplyOrder, SentenceSplitter, TaggedSink
+
+_DONE = object()
+
+
+class PipelineBusy(Exception):
+    """Raised when the pipeline's turn queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AsyncTurnEngine:
+    """asyncio version of TurnEngine, producing the same event dicts.
+
+    Turns are cancelled by cancelling their task, which closes the upstream
+    requests; ``cancel`` is only used to count the work that saved.
+    """
+
+    def __init__(self, elevenlabs_client: AsyncElevenLabsClient, openai_client: AsyncOpenAIClient,
+                 min_sentence_chars: int = None):
+        self.elevenlabs_client = elevenlabs_client
+        self.openai_client = openai_client
+        self.min_sentence_chars = min_sentence_chars
+
+    async def run(self, audio: bytes, system_prompt: str = None, stream_chunks: bool = False,
+                  session=None, cancel: CancelToken = None, sample_rate: int = None,
+                  stream_text: bool = False) -> AsyncIterator[dict]:
+        started_at = time.perf_counter()
+        try:
+            with metrics.session(session.session_id if session is not None else None):
+                transcript = await self.elevenlabs_client.stt(audio)
+        except asyncio.CancelledError:
+            if cancel is not None and cancel.cancelled:
+                cancel.note('stt_abandoned')
+            raise
+        stt_seconds = time.perf_counter() - started_at
+        yield {'type': 'transcript', 'text': transcript}
+
+        if not transcript or not transcript.strip():
+            return
+
+        async for event in self.respond(transcript, system_prompt, started_at=started_at,
+                                        timings={'stt': stt_seconds}, stream_chunks=stream_chunks,
+                                        session=session, cancel=cancel, sample_rate=sample_rate,
+                                        stream_text=stream_text):
+            yield event
+
+    async def _synthesize(self, sentence: str, sink: asyncio.Queue, session_id: str = None, sample_rate: int = None):
+        try:
+            with metrics.session(session_id):
+                async for chunk in self.elevenlabs_client.tts_stream(sentence, sample_rate=sample_rate):
+                    sink.put_nowait(chunk)
+        except Exception as e:
+            sink.put_nowait(e)
+        finally:
+            sink.put_nowait(None)
+
+    async def respond(self, prompt: str, system_prompt: str = None, started_at: float = None,
+                      timings: dict = None, stream_chunks: bool = False, session=None,
+                      cancel: CancelToken = None, sample_rate: int = None,
+                      stream_text: bool = False) -> AsyncIterator[dict]:
+        started_at = started_at or time.perf_counter()
+        llm_started_at = time.perf_counter()
+        timings = dict(timings or {})
+        events = asyncio.Queue()
+        response_parts = []
+        tasks = []
+        session_id = session.session_id if session is not None else None
+
+        def submit(sentence: str):
+            sink = TaggedSink(events, len(tasks))
+            events.put_nowait(('sentence', sentence))
+            tasks.append(asyncio.create_task(self._synthesize(sentence, sink, session_id, sample_rate)))
+
+        async def produce():
+            splitter = SentenceSplitter(self.min_sentence_chars)
+            error = None
+            try:
+                async for delta in self.openai_client.ask_stream(prompt, system_prompt, session=session):
+                    if not response_parts:
+                        timings['llm_first_token'] = time.perf_counter() - llm_started_at
+                    response_parts.append(delta)
+                    events.put_nowait(('delta', delta))
+                    for sentence in splitter.feed(delta):
+                        submit(sentence)
+                tail = splitter.flush()
+                if tail:
+                    submit(tail)
+                timings['llm_total'] = time.perf_counter() - llm_started_at
+            except Exception as e:
+                error = e
+            finally:
+                events.put_nowait(('end', error))
+
+        def first_audio():
+            timings['time_to_first_audio'] = time.perf_counter() - started_at
+
+        producer = asyncio.create_task(produce())
+        order = ReplyOrder(stream_chunks, stream_text, first_audio)
+        try:
+            while not order.done:
+                for event in order.accept(await events.get()):
+                    yield event
+        finally:
+            # Unlike threads, abandoned upstream requests can actually be cancelled here
+            closed_tts = 0
+            closed_llm = not producer.done()
+            if closed_llm:
+                producer.cancel()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    closed_tts += 1
+            if cancel is not None and cancel.cancelled:
+                cancel.note('llm_streams_closed', int(closed_llm))
+                cancel.note('tts_streams_closed', closed_tts)
+
+        timings['total'] = time.perf_counter() - started_at
+        metrics.observe_turn(timings, session_id)
+        print(f"⏱️ Time to first audio: {timings.get('time_to_first_audio', 0):.2f}s")
+        yield {'type': 'response', 'text': "".join(response_parts).strip()}
+        yield {'type': 'done', 'segments': order.index, 'timings': timings}
+
+
+class AsyncPipeline:
+    """Runs AsyncTurnEngine turns on a background event loop for synchronous callers.
+
+    All upstream calls share one pooled ``httpx.AsyncClient`` from http_transport, so many turns are
+    multiplexed over a handful of kept-alive connections. At most
+    ``max_concurrent`` turns run at once and ``max_queued`` more may wait;
+    beyond that ``run`` raises PipelineBusy so the caller can answer 429.
+    """
+
+    def __init__(self, openai_client, max_concurrent: int = None, max_queued: int = None, tts_cache=None):
+        self.openai_client = openai_client
+        self.tts_cache = tts_cache
+        self.max_concurrent = max_concurrent or Config.ASYNC_MAX_CONCURRENT_TURNS
+        self.max_queued = Config.ASYNC_MAX_QUEUED_TURNS if max_queued is None else max_queued
+        self.lock = threading.Lock()
+        self.loop = None
+        self.pid = None
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.avg_turn_seconds = 5.0
+
+    def _ensure_started(self):
+        # The loop thread doesn't survive a fork (gunicorn --preload), so start it per process
+        with self.lock:
+            if self.loop is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            threading.Thread(target=self._run_loop, args=(ready,), name="pipeline-loop", daemon=True).start()
+            ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.http_client = http_transport.async_client()
+        self.engine = AsyncTurnEngine(
+            AsyncElevenLabsClient(self.http_client, tts_cache=self.tts_cache),
+            AsyncOpenAIClient(self.openai_client, self.http_client)
+        )
+        self.slots = asyncio.Semaphore(self.max_concurrent)
+        self.warming = self.loop.create_task(http_transport.warm_up_async(self.http_client))
+        print(f"⚡ Async pipeline started (pid {self.pid}, {self.max_concurrent} concurrent turns)")
+        ready.set()
+        self.loop.run_forever()
+
+    def warm_up(self, timeout: float = None) -> bool:
+        """Start this process's loop and wait until its upstream connections are open; False on timeout"""
+        self._ensure_started()
+
+        async def warmed():
+            await asyncio.shield(self.warming)
+
+        try:
+            asyncio.run_coroutine_threadsafe(warmed(), self.loop).result(timeout)
+            return True
+        except concurrent.futures.TimeoutError:
+            return False
+
+    def _retry_after(self) -> int:
+        waiting = max(self.admitted - self.max_concurrent, 0) + 1
+        return max(1, math.ceil(self.avg_turn_seconds * waiting / self.max_concurrent))
+
+    def run(self, audio: bytes, system_prompt: str = None, stream_chunks: bool = False, session=None,
+            cancel: CancelToken = None, sample_rate: int = None, stream_text: bool = False) -> Iterator[dict]:
+        """Admit a turn and return an iterator over its events.
+
+        Raises PipelineBusy immediately when the queue is full. When ``cancel``
+        fires, the turn's task is cancelled and the iterator raises ``Cancelled``.
+        """
+        return self._admit(lambda: self.engine.run(audio, system_prompt, stream_chunks, session, cancel, sample_rate,
+                                                   stream_text),
+                           cancel)
+
+    def respond(self, prompt: str, system_prompt: str = None, started_at: float = None,
+                timings: dict = None, stream_chunks: bool = False, session=None,
+                cancel: CancelToken = None, sample_rate: int = None, stream_text: bool = False) -> Iterator[dict]:
+        """Like ``run`` for a prompt that is already transcribed"""
+        return self._admit(lambda: self.engine.respond(prompt, system_prompt, started_at=started_at, timings=timings,
+                                                       stream_chunks=stream_chunks, session=session, cancel=cancel,
+                                                       sample_rate=sample_rate, stream_text=stream_text),
+                           cancel)
+
+    def _admit(self, turn: Callable[[], AsyncIterator[dict]], cancel: CancelToken = None) -> Iterator[dict]:
+        self._ensure_started()
+        with self.lock:
+            if self.admitted >= self.max_concurrent + self.max_queued:
+                self.rejected += 1
+                raise PipelineBusy(self._retry_after())
+            self.admitted += 1
+
+        events = queue.Queue()
+        started = []
+
+        async def drive():
+            started.append(time.perf_counter())
+            try:
+                if cancel is not None:
+                    # Registered from inside the task, so a cancel that fires first still reaches the iterator
+                    task = asyncio.current_task()
+                    cancel.on_cancel(lambda: self.loop.call_soon_threadsafe(task.cancel))
+                async with self.slots:
+                    async for event in turn():
+                        events.put(event)
+            except BaseException as e:
+                events.put(e)
+                raise
+            finally:
+                events.put(_DONE)
+
+        def release(future):
+            # Unlike drive()'s finally, this also runs for a turn cancelled before its task took a step
+            with self.lock:
+                self.admitted -= 1
+                self.completed += 1
+                if started:
+                    self.avg_turn_seconds = 0.8 * self.avg_turn_seconds + 0.2 * (time.perf_counter() - started[0])
+
+        future = asyncio.run_coroutine_threadsafe(drive(), self.loop)
+        future.add_done_callback(release)
+        return self._iterate(events, future, cancel)
+
+    @staticmethod
+    def _iterate(events: queue.Queue, future, cancel: CancelToken = None) -> Iterator[dict]:
+        try:
+            while True:
+                item = events.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, asyncio.CancelledError) and cancel is not None and cancel.cancelled:
+                    raise Cancelled(cancel.reason)
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Caller stopped reading (client went away): cancel the in-flight upstream calls
+            future.cancel()
+
+    def stats(self) -> dict:
+        engine = getattr(self, 'engine', None)
+        with self.lock:
+            return {
+                'mode': 'async',
+                'in_flight': self.admitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'max_concurrent': self.max_concurrent,
+                'max_queued': self.max_queued,
+                'avg_turn_seconds': round(self.avg_turn_seconds, 3),
+                'stt': engine.elevenlabs_client.stt_strategy.stats() if engine else None,
+            }
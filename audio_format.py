@@ -0,0 +1,227 @@
+"""
+Audio Format Module
+Helpers for packaging raw PCM audio for clients and upstream APIs
+"""
+
+import io
+import struct
+import wave
+from math import gcd
+from typing import Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
+from scipy.signal import resample_poly
+
+# RIFF/data sizes used when the total length isn't known up front (streamed WAV)
+STREAMING_SIZE = 0xFFFFFFFF
+
+# Speech-to-text takes raw 16 kHz mono PCM directly ("pcm_s16le_16"), skipping its own decode
+STT_SAMPLE_RATE = 16000
+STT_PCM_FORMAT = "pcm_s16le_16"
+
+# Raw PCM rates text-to-speech can stream ("pcm_<rate>"), lowest first
+TTS_PCM_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+# Playback rates accepted from clients; anything else gets the server default
+MIN_CLIENT_SAMPLE_RATE = 8000
+MAX_CLIENT_SAMPLE_RATE = 96000
+
+# Compressed containers are forwarded to STT untouched
+CONTAINER_MIME_TYPES = {
+    'webm': 'audio/webm',
+    'ogg': 'audio/ogg',
+    'mp4': 'audio/mp4',
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+}
+
+
+def wav_header(sample_rate: int, channels: int = 1, sample_width: int = 2, data_size: int = None) -> bytes:
+    """Build a 44-byte PCM WAV header.
+
+    Pass ``data_size=None`` for a streaming header: players read until the
+    connection closes instead of trusting the declared length.
+    """
+    if data_size is None:
+        riff_size = data_size = STREAMING_SIZE
+    else:
+        riff_size = 36 + data_size
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', riff_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def wav_bytes(pcm: Union[bytes, Iterable[bytes]], sample_rate: int, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Wrap PCM (one buffer or a list of chunks) in a WAV container, copying the audio once"""
+    chunks = [pcm] if isinstance(pcm, (bytes, bytearray, memoryview)) else list(pcm)
+    data_size = sum(memoryview(chunk).nbytes for chunk in chunks)
+    return b"".join([wav_header(sample_rate, channels, sample_width, data_size), *chunks])
+
+
+def pcm_chunks(pcm: bytes, chunk_bytes: int) -> Iterator[bytes]:
+    """Split PCM into sample-aligned chunks of about ``chunk_bytes``"""
+    chunk_bytes = max(chunk_bytes - chunk_bytes % 2, 2)
+    for start in range(0, len(pcm), chunk_bytes):
+        yield pcm[start:start + chunk_bytes]
+
+
+def sniff_format(audio: bytes) -> str:
+    """Container of an upload from its magic bytes: wav, webm, ogg, mp4, mp3 or unknown"""
+    if audio[:4] == b'RIFF' and audio[8:12] == b'WAVE':
+        return 'wav'
+    if audio[:4] == b'\x1a\x45\xdf\xa3':  # EBML, used by WebM/Matroska
+        return 'webm'
+    if audio[:4] == b'OggS':
+        return 'ogg'
+    if audio[4:8] == b'ftyp':
+        return 'mp4'
+    if audio[:3] == b'ID3' or audio[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2'):
+        return 'mp3'
+    return 'unknown'
+
+
+def int16_to_float(samples: np.ndarray) -> np.ndarray:
+    """16-bit samples as float32 in [-1, 1)"""
+    return samples.astype(np.float32) * (1.0 / 32768)
+
+
+def float_to_int16(samples: np.ndarray) -> np.ndarray:
+    """Float samples in [-1, 1) as little-endian 16-bit, rounded and clipped"""
+    return np.clip(np.rint(samples * 32768), -32768, 32767).astype('<i2')
+
+
+def downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Average interleaved ``channels`` into one (a trailing partial frame is dropped)"""
+    if channels == 1:
+        return samples
+    samples = samples[:len(samples) - len(samples) % channels]
+    return samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Polyphase resampling (anti-aliased) from ``sample_rate`` to ``target_rate``, as float32"""
+    if sample_rate == target_rate:
+        return samples
+    common = gcd(sample_rate, target_rate)
+    return resample_poly(samples.astype(np.float32, copy=False), target_rate // common, sample_rate // common)
+
+
+def to_mono_pcm(pcm: bytes, sample_rate: int, channels: int, target_rate: int) -> bytes:
+    """Downmix 16-bit PCM to mono and resample it to ``target_rate``"""
+    if channels == 1 and sample_rate == target_rate:
+        return pcm
+    samples = resample(downmix(np.frombuffer(pcm, dtype='<i2'), channels), sample_rate, target_rate)
+    return float_to_int16(samples / 32768).tobytes()
+
+
+class StreamResampler:
+    """Resamples 16-bit mono PCM that arrives in chunks, such as a TTS stream.
+
+    Each chunk is filtered together with its neighbours, so the output has no
+    clicks at the joins and matches resampling the whole stream at once.
+    The newest few milliseconds are held back until the next ``feed`` (or
+    ``flush``) supplies the samples after them.
+    """
+
+    def __init__(self, sample_rate: int, target_rate: int):
+        common = gcd(sample_rate, target_rate)
+        self.up, self.down = target_rate // common, sample_rate // common
+        # resample_poly's filter spans 10 input samples each side per max(up, down) / up
+        reach = -(-10 * max(self.up, self.down) // self.up) + 1
+        # Whole multiples of ``down`` input samples map to whole output samples
+        self.context = -(-reach // self.down) * self.down
+        self.pending = np.zeros(self.context, dtype=np.float32)  # silence before the stream
+        self.odd = b""
+
+    def feed(self, pcm: bytes) -> bytes:
+        pcm = self.odd + pcm
+        self.odd = pcm[len(pcm) - len(pcm) % 2:]
+        samples = int16_to_float(np.frombuffer(pcm, dtype='<i2', count=len(pcm) // 2))
+        self.pending = np.concatenate([self.pending, samples])
+        end = (len(self.pending) - self.context) // self.down * self.down
+        if end <= self.context:
+            return b""
+        out = self._resample(end)
+        self.pending = self.pending[end - self.context:]
+        return out
+
+    def flush(self) -> bytes:
+        """The rest of the stream, as if silence followed it"""
+        end = len(self.pending)
+        if end <= self.context:
+            return b""
+        self.pending = np.concatenate([self.pending, np.zeros(self.context + self.down, dtype=np.float32)])
+        out = self._resample(end)
+        self.pending = np.zeros(self.context, dtype=np.float32)
+        return out
+
+    def _resample(self, end: int) -> bytes:
+        # Output for input [context, end): both ends have the filter's full reach of real samples
+        resampled = resample_poly(self.pending, self.up, self.down)
+        first = self.context * self.up // self.down
+        last = -(-end * self.up // self.down)
+        return float_to_int16(resampled[first:last]).tobytes()
+
+
+def resample_stream(chunks: Iterable[bytes], sample_rate: int, target_rate: int) -> Iterator[bytes]:
+    """Resample a stream of 16-bit mono PCM chunks (passed through if the rates match)"""
+    if sample_rate == target_rate:
+        yield from chunks
+        return
+    resampler = StreamResampler(sample_rate, target_rate)
+    try:
+        for chunk in chunks:
+            out = resampler.feed(chunk)
+            if out:
+                yield out
+    finally:
+        # An abandoned stream closes its source too (e.g. the upstream HTTP response)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    tail = resampler.flush()
+    if tail:
+        yield tail
+
+
+def tts_output_format(sample_rate: int) -> Tuple[str, int]:
+    """The TTS PCM format for a client that plays ``sample_rate``, and the rate it streams at.
+
+    An exact match if TTS offers one, otherwise the next higher rate (so
+    resampling down to the client loses nothing), or the highest there is.
+    """
+    rate = next((rate for rate in TTS_PCM_RATES if rate >= sample_rate), TTS_PCM_RATES[-1])
+    return f"pcm_{rate}", rate
+
+
+def client_sample_rate(value) -> Optional[int]:
+    """A playback rate a client asked for, or None if it's missing or not a plausible rate"""
+    try:
+        rate = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rate if MIN_CLIENT_SAMPLE_RATE <= rate <= MAX_CLIENT_SAMPLE_RATE else None
+
+
+def stt_upload(audio: bytes) -> dict:
+    """Keyword arguments for the STT convert call that upload ``audio`` most compactly.
+
+    16-bit PCM WAV is downmixed and resampled to the rate STT works at and sent
+    as raw PCM; Opus/WebM, Ogg and other compressed uploads go as they are.
+    """
+    container = sniff_format(audio)
+    if container == 'wav':
+        try:
+            with wave.open(io.BytesIO(audio)) as wav_file:
+                if wav_file.getsampwidth() == 2:
+                    pcm = to_mono_pcm(
+                        wav_file.readframes(wav_file.getnframes()),
+                        wav_file.getframerate(), wav_file.getnchannels(), STT_SAMPLE_RATE
+                    )
+                    return {'file': ("audio.pcm", pcm), 'file_format': STT_PCM_FORMAT}
+        except (wave.Error, EOFError) as e:
+            print(f"⚠️ Could not read WAV upload, sending it as-is: {e}")
+    if container in CONTAINER_MIME_TYPES:
+        return {'file': (f"audio.{container}", audio, CONTAINER_MIME_TYPES[container])}
+    return {'file': ("audio", audio)}
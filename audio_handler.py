@@ -6,54 +6,93 @@ Handles microphone input and audio playback for real-time conversation
 import pyaudio
 import numpy as np
 import wave
+import queue
 import threading
-import time
-import io
-from typing import Optional, Callable
+from typing import Callable, List, Optional
+from audio_format import STT_SAMPLE_RATE, wav_bytes
+from cancellation import TurnRegistry
 from config import Config
+from playback import create_playback
+from ring_buffer import RingBuffer
+from vad import create_endpointer
 
 class AudioHandler:
     """Handles real-time audio input and output"""
     
-    def __init__(self):
+    # What to do with an utterance that arrives while the previous one is still being handled
+    POLICIES = ("queue", "drop", "barge-in")
+    
+    def __init__(self, playback_sample_rate: int = None):
         self.p = pyaudio.PyAudio()
         self.stream = None
+        # Replies play on one output stream for the whole session (TTS audio is mono)
+        self.playback = create_playback(playback_sample_rate or Config.TTS_SAMPLE_RATE, audio=self.p)
         self.is_recording = False
-        self.audio_buffer = []
-        self.silence_threshold = 0.01
-        self.silence_duration = 1.0  # seconds
-        self.last_audio_time = time.time()
+        self.sample_rate = self._capture_rate()
+        # Capture goes into one preallocated array sized for the longest utterance
+        self.audio_buffer = RingBuffer(int(Config.MAX_UTTERANCE_SECONDS * self.sample_rate) * Config.CHANNELS)
+        # Decides where utterances start and end; keeps a pre-roll so onsets aren't clipped
+        self.endpointer = create_endpointer(self.sample_rate, Config.CHANNELS)
+        
+        # Finished utterances wait here for the worker thread, never in the audio callback
+        self.policy = Config.UTTERANCE_POLICY if Config.UTTERANCE_POLICY in self.POLICIES else "queue"
+        self.utterances = queue.Queue(maxsize=max(1, Config.UTTERANCE_QUEUE_SIZE))
+        self.busy = threading.Event()
+        # The running turn's CancelToken is current_turn; barge-in cancels it
+        self.turns = TurnRegistry()
+        self.current_turn = None
+        self.worker = None
+        self.counters = {'captured': 0, 'handled': 0, 'dropped': 0, 'barge_ins': 0, 'overruns': 0, 'max_queue_depth': 0}
+    
+    def _capture_rate(self) -> int:
+        """STT's rate if the microphone records at it, so nothing is resampled and less is buffered and uploaded"""
+        if Config.CAPTURE_AT_STT_RATE:
+            try:
+                if self.p.is_format_supported(STT_SAMPLE_RATE,
+                                              input_device=self.p.get_default_input_device_info()['index'],
+                                              input_channels=Config.CHANNELS, input_format=pyaudio.paInt16):
+                    return STT_SAMPLE_RATE
+            except (ValueError, IOError) as e:
+                print(f"⚠️ Microphone can't record at {STT_SAMPLE_RATE} Hz ({e}), using {Config.SAMPLE_RATE} Hz")
+        return Config.SAMPLE_RATE
         
     def start_recording(self, on_audio_data: Callable[[bytes], None]):
-        """Start recording from microphone"""
+        """Start recording from microphone.
+
+        ``on_audio_data`` is called with each utterance as WAV bytes on a worker
+        thread, so a slow turn never blocks capture. It should pass
+        ``current_turn`` as the ``cancel`` token of its STT/LLM/TTS calls.
+        """
         if self.is_recording:
             return
             
         self.is_recording = True
-        self.audio_buffer = []
-        self.last_audio_time = time.time()
+        self.audio_buffer.clear()
+        self.endpointer.reset()
+        self.worker = threading.Thread(target=self._handle_utterances, args=(on_audio_data,),
+                                       name="utterance-worker", daemon=True)
+        self.worker.start()
         
         def callback(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self.counters['overruns'] += 1
             if self.is_recording:
-                audio_data = np.frombuffer(in_data, dtype=np.int16)
-                audio_level = np.abs(audio_data).mean() / 32768.0
-                
-                if audio_level > self.silence_threshold:
-                    self.last_audio_time = time.time()
-                    self.audio_buffer.extend(audio_data)
-                elif self.audio_buffer and (time.time() - self.last_audio_time) > self.silence_duration:
-                    if self.audio_buffer:
-                        # Convert to WAV format for ElevenLabs STT
-                        wav_data = self._convert_to_wav(np.array(self.audio_buffer, dtype=np.int16))
-                        on_audio_data(wav_data)
-                        self.audio_buffer = []
+                for event in self.endpointer.feed(np.frombuffer(in_data, dtype=np.int16)):
+                    if event.kind == 'end':
+                        if len(self.audio_buffer):
+                            self._enqueue_utterance()
+                        continue
+                    if len(event.samples) > self.audio_buffer.free:
+                        print("✂️ Maximum utterance length reached, sending what we have")
+                        self._enqueue_utterance()
+                    self.audio_buffer.write(event.samples)
                 
             return (in_data, pyaudio.paContinue)
         
         self.stream = self.p.open(
             format=pyaudio.paInt16,
             channels=Config.CHANNELS,
-            rate=Config.SAMPLE_RATE,
+            rate=self.sample_rate,
             input=True,
             output=False,
             frames_per_buffer=Config.CHUNK_SIZE,
@@ -61,17 +100,69 @@ class AudioHandler:
         )
         
         self.stream.start_stream()
-        print("🎤 Microphone recording started...")
+        print(f"🎤 Microphone recording started ({self.sample_rate} Hz, VAD: {self.endpointer.vad.name}, "
+              f"overlapping utterances: {self.policy})...")
+    
+    def _enqueue_utterance(self):
+        """Hand the captured utterance to the worker; runs on the audio callback thread"""
+        samples = self.audio_buffer.read()
+        self.audio_buffer.clear()
+        self.counters['captured'] += 1
+        
+        in_flight = self.busy.is_set() or not self.utterances.empty()
+        if in_flight and self.policy == "drop":
+            self.counters['dropped'] += 1
+            return
+        if in_flight and self.policy == "barge-in":
+            self._discard_queued()
+            if self.busy.is_set():
+                self.counters['barge_ins'] += 1
+                self.turns.cancel("microphone", "barge-in")
+                self.playback.flush()
+        
+        try:
+            self.utterances.put_nowait(samples)
+        except queue.Full:
+            # Keep the newest speech; the oldest queued utterance is the stalest
+            self._discard_queued(1)
+            self.utterances.put_nowait(samples)
+        self.counters['max_queue_depth'] = max(self.counters['max_queue_depth'], self.utterances.qsize())
+    
+    def _discard_queued(self, limit: int = None):
+        while limit is None or limit > 0:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+            self.counters['dropped'] += 1
+            if limit is not None:
+                limit -= 1
+    
+    def _handle_utterances(self, on_audio_data: Callable[[bytes], None]):
+        while True:
+            samples = self.utterances.get()
+            if samples is None:
+                return
+            self.current_turn = self.turns.begin("microphone")
+            self.busy.set()
+            try:
+                # Convert to WAV format for ElevenLabs STT
+                on_audio_data(self._convert_to_wav([samples]))
+            except Exception as e:
+                print(f"❌ Error handling utterance: {e}")
+            finally:
+                self.counters['handled'] += 1
+                self.busy.clear()
+                self.turns.finish("microphone", self.current_turn)
     
-    def _convert_to_wav(self, audio_data: np.ndarray) -> bytes:
-        """Convert audio data to WAV format"""
-        buffer = io.BytesIO()
-        with wave.open(buffer, 'wb') as wav_file:
-            wav_file.setnchannels(Config.CHANNELS)
-            wav_file.setsampwidth(2)  # 2 bytes for int16
-            wav_file.setframerate(Config.SAMPLE_RATE)
-            wav_file.writeframes(audio_data.tobytes())
-        return buffer.getvalue()
+    def stats(self) -> dict:
+        return {**self.counters, 'queue_depth': self.utterances.qsize(), 'policy': self.policy,
+                'vad': self.endpointer.stats(), 'cancellation': self.turns.stats(), 'playback': self.playback.stats()}
+    
+    def _convert_to_wav(self, segments: List[np.ndarray]) -> bytes:
+        """Convert captured int16 segments to WAV format"""
+        # Segments were already copied out of the ring buffer, which the callback keeps reusing; this join is the second copy
+        return wav_bytes([memoryview(segment) for segment in segments], self.sample_rate, Config.CHANNELS)
     
     def stop_recording(self):
         """Stop recording from microphone"""
@@ -79,37 +170,25 @@ class AudioHandler:
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
-        print("🎤 Microphone recording stopped")
+            self.stream = None
+        stats = self.stats()
+        if self.worker:
+            self._discard_queued()
+            self.utterances.put(None)
+            self.worker = None
+        print(f"🎤 Microphone recording stopped ({stats})")
     
     def play_audio(self, audio_data: bytes):
-        """Play audio data through speakers"""
-        try:
-            output_stream = self.p.open(
-                format=pyaudio.paInt16,
-                channels=Config.CHANNELS,
-                rate=Config.SAMPLE_RATE,
-                output=True
-            )
-            
-            chunk_size = Config.CHUNK_SIZE * 2
-            for i in range(0, len(audio_data), chunk_size):
-                chunk = audio_data[i:i + chunk_size]
-                if chunk:
-                    output_stream.write(chunk)
-            
-            output_stream.stop_stream()
-            output_stream.close()
-            
-        except Exception as e:
-            print(f"❌ Error playing audio: {e}")
+        """Play audio data through speakers, returning once it has played"""
+        self.playback.play(audio_data)
     
-    def save_audio_to_file(self, audio_data: bytes, filename: str):
-        """Save audio data to a WAV file"""
+    def save_audio_to_file(self, audio_data: bytes, filename: str, sample_rate: int = None):
+        """Save audio data (captured audio unless ``sample_rate`` says otherwise) to a WAV file"""
         try:
             with wave.open(filename, 'wb') as wf:
                 wf.setnchannels(Config.CHANNELS)
                 wf.setsampwidth(2)  # 2 bytes for int16
-                wf.setframerate(Config.SAMPLE_RATE)
+                wf.setframerate(sample_rate or self.sample_rate)
                 wf.writeframes(audio_data)
             print(f"💾 Audio saved to {filename}")
         except Exception as e:
@@ -118,5 +197,6 @@ class AudioHandler:
     def cleanup(self):
         """Clean up audio resources"""
         self.stop_recording()
+        self.playback.close()
         if self.p:
             self.p.terminate() 
\ No newline at end of file
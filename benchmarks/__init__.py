@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Offline load and performance harnesses; run from the repository root with ``python -m benchmarks.<name>``
+"""
@@ -0,0 +1,110 @@
+"""
+Audio I/O Benchmark
+Compares the old temp-file audio path of /process_audio with the in-memory one
+
+    python -m benchmarks.audio_io --seconds 5 --reply-seconds 10
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import wave
+import psutil
+from audio_format import wav_bytes
+
+REPLY_SAMPLE_RATE = 22050
+
+
+def legacy_turn(request_b64: str, reply_segments: list) -> str:
+    """The audio handling /process_audio used to do around a turn"""
+    audio_data = base64.b64decode(request_b64)
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+        temp_file.write(audio_data)
+        temp_file_path = temp_file.name
+    with open(temp_file_path, 'rb') as audio_file:
+        audio_bytes = audio_file.read()
+
+    # ElevenLabsClient.stt wrote the upload to a second temp file
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        f.write(audio_bytes)
+        stt_file = f.name
+    with open(stt_file, 'rb') as audio_file:
+        audio_file.read()
+    os.unlink(stt_file)
+
+    tts_audio_bytes = b"".join(reply_segments)
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
+        with wave.open(temp_audio.name, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(REPLY_SAMPLE_RATE)
+            wav_file.writeframes(tts_audio_bytes)
+        temp_audio_path = temp_audio.name
+    with open(temp_audio_path, 'rb') as audio_file:
+        audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
+    os.unlink(temp_file_path)
+    os.unlink(temp_audio_path)
+    return audio_base64
+
+
+def in_memory_turn(request_b64: str, reply_segments: list) -> str:
+    """The audio handling /process_audio does now"""
+    audio_data = base64.b64decode(request_b64)
+    del audio_data  # handed to the STT upload as-is
+    return base64.b64encode(wav_bytes(reply_segments, REPLY_SAMPLE_RATE)).decode('ascii')
+
+
+def measure(turn, request_b64: str, reply_segments: list, iterations: int) -> dict:
+    process = psutil.Process()
+    turn(request_b64, reply_segments)  # warm up
+
+    times = []
+    io_before = process.io_counters()
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        turn(request_b64, reply_segments)
+        times.append(time.perf_counter() - started_at)
+    io_after = process.io_counters()
+
+    tracemalloc.start()
+    turn(request_b64, reply_segments)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_ms': statistics.median(times) * 1000,
+        'read_calls': (io_after.read_count - io_before.read_count) / iterations,
+        'write_calls': (io_after.write_count - io_before.write_count) / iterations,
+        'bytes_written': (io_after.write_chars - io_before.write_chars) / iterations,
+        'peak_mb': peak / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help='length of the uploaded 16kHz recording')
+    parser.add_argument('--reply-seconds', type=float, default=10.0, help='length of the synthesized reply')
+    parser.add_argument('--segments', type=int, default=4, help='reply sentences')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    request_pcm = os.urandom(int(args.seconds * 16000) * 2)
+    request_b64 = base64.b64encode(wav_bytes(request_pcm, 16000)).decode('ascii')
+    segment_bytes = int(args.reply_seconds * REPLY_SAMPLE_RATE / args.segments) * 2
+    reply_segments = [os.urandom(segment_bytes) for _ in range(args.segments)]
+
+    print(f"🧪 {args.seconds:.0f}s upload, {args.reply_seconds:.0f}s reply in {args.segments} segments, "
+          f"{args.iterations} iterations")
+    print(f"{'path':<10} {'median ms':>10} {'reads':>6} {'writes':>7} {'disk KB':>8} {'peak MB':>8}")
+    for name, turn in (('temp-file', legacy_turn), ('in-memory', in_memory_turn)):
+        result = measure(turn, request_b64, reply_segments, args.iterations)
+        print(f"{name:<10} {result['median_ms']:>10.2f} {result['read_calls']:>6.0f} {result['write_calls']:>7.0f} "
+              f"{result['bytes_written'] / 1024:>8.0f} {result['peak_mb']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Capture Buffer Benchmark
+Compares AudioHandler's old list-of-samples capture with the preallocated ring buffer
+
+    python -m benchmarks.capture_buffer --seconds 10
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from audio_format import wav_bytes
+from ring_buffer import RingBuffer
+
+
+def list_capture(chunks: list, sample_rate: int, max_seconds: float) -> tuple:
+    """What the PortAudio callback used to do: extend a list, then np.array it"""
+    buffer = []
+    callback_times = []
+    for chunk in chunks:
+        started_at = time.perf_counter()
+        buffer.extend(chunk)
+        callback_times.append(time.perf_counter() - started_at)
+    started_at = time.perf_counter()
+    wav = wav_bytes(memoryview(np.array(buffer, dtype=np.int16)), sample_rate)
+    return callback_times, time.perf_counter() - started_at, len(wav)
+
+
+def ring_capture(chunks: list, sample_rate: int, max_seconds: float) -> tuple:
+    buffer = RingBuffer(int(max_seconds * sample_rate))
+    callback_times = []
+    for chunk in chunks:
+        started_at = time.perf_counter()
+        buffer.write(chunk)
+        callback_times.append(time.perf_counter() - started_at)
+    started_at = time.perf_counter()
+    wav = wav_bytes([memoryview(segment) for segment in buffer.segments()], sample_rate)
+    return callback_times, time.perf_counter() - started_at, len(wav)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10.0, help='utterance length')
+    parser.add_argument('--max-seconds', type=float, default=30.0, help='ring buffer capacity')
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    samples = (np.random.default_rng(0).normal(0, 3000, int(args.seconds * args.sample_rate))).astype(np.int16)
+    chunks = [samples[i:i + args.chunk_size] for i in range(0, len(samples), args.chunk_size)]
+
+    print(f"🧪 {args.seconds:.0f}s utterance at {args.sample_rate} Hz in {len(chunks)} callbacks "
+          f"of {args.chunk_size} frames ({samples.nbytes / 1024:.0f} KB of PCM)")
+    print(f"{'buffer':<8} {'peak MB':>8} {'mean cb µs':>11} {'last 10% µs':>11} {'encode ms':>10}")
+    for name, capture in (('list', list_capture), ('ring', ring_capture)):
+        tracemalloc.start()
+        callback_times, encode_seconds, _ = capture(chunks, args.sample_rate, args.max_seconds)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tail = callback_times[-len(callback_times) // 10:]
+        print(f"{name:<8} {peak / 1024 / 1024:>8.2f} {np.mean(callback_times) * 1e6:>11.1f} "
+              f"{np.mean(tail) * 1e6:>11.1f} {encode_seconds * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
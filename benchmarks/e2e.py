@@ -0,0 +1,395 @@
+"""
+End-to-End Benchmark
+Drives app_simple and app with concurrent synthetic users against mock upstreams and records comparable results
+
+    python -m benchmarks.e2e --apps app_simple,app --modes sync,async --users 1,4,8 --out before.json
+    python -m benchmarks.e2e --fixtures recordings/ --distribution lognormal --jitter 0.3 --out after.json
+    python -m benchmarks.e2e --compare before.json after.json
+
+Each user replays WAV fixtures (a directory or files; synthetic speech-like
+clips by default) as back-to-back turns over the app's own streaming
+transport: binary /process_audio_stream for app_simple, Socket.IO
+``audio_data`` for app. Turn latency runs from sending the recording to the
+end of the reply, time to first audio to the first reply PCM. Peak RSS is
+sampled from the server process. Results carry the git commit and every
+knob that affects them, and upstream delays are seeded, so runs on
+different commits can be compared with ``--compare``.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+import psutil
+from benchmarks import load_test
+from benchmarks.load_test import free_port, wait_until_up
+from benchmarks.mock_upstreams import DISTRIBUTIONS, MockUpstreams
+
+APPS = ('app_simple', 'app')
+FIXTURE_SAMPLE_RATE = 16000
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile, like load_test's p95"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def load_fixtures(paths: list, count: int = 4, seed: int = 0) -> list:
+    """WAV files named in ``paths`` (directories are searched), or synthetic speech-like clips"""
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, '*.wav'))) if os.path.isdir(path) else [path]
+    if files:
+        fixtures = []
+        for path in files:
+            with open(path, 'rb') as f:
+                fixtures.append(f.read())
+        return fixtures
+    from audio_format import wav_bytes
+    from benchmarks.eval_vad import speech_like
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for _ in range(count):
+        speech = np.concatenate([np.zeros(FIXTURE_SAMPLE_RATE // 5), speech_like(rng, FIXTURE_SAMPLE_RATE)])
+        pcm = np.clip(speech * 32767, -32768, 32767).astype(np.int16)
+        fixtures.append(wav_bytes(memoryview(pcm), FIXTURE_SAMPLE_RATE))
+    return fixtures
+
+
+def serve(app_name: str, mode: str, port: int, upstream_url: str):
+    """Run one app against the mock upstreams (app_simple exactly as load_test serves it)"""
+    os.environ.update({
+        'ELEVENLABS_API_KEY': 'mock-key',
+        'OPENAI_API_KEY': 'sk-mock-key',
+        'ELEVENLABS_BASE_URL': upstream_url,
+        'OPENAI_BASE_URL': f"{upstream_url}/v1",
+        'SERVING_MODE': mode,
+        'ENABLE_CONVERSATION_LOGGING': 'false',
+    })
+    if app_name == 'app_simple':
+        load_test.serve(mode, port, upstream_url)
+        return
+    import app
+    app.socketio.run(app.app, host='127.0.0.1', port=port, log_output=False)
+
+
+class Turn:
+    """Outcome of one turn as the client saw it"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_audio = None
+        self.latency = None
+        self.status = 'ok'
+
+    def audio(self):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter() - self.started_at
+
+    def done(self, status: str = 'ok'):
+        self.latency = time.perf_counter() - self.started_at
+        self.status = status
+
+
+def simple_turn(base_url: str, audio: bytes) -> Turn:
+    """One /process_audio_stream turn with binary frames, watching for the first audio frame"""
+    request = urllib.request.Request(
+        f"{base_url}/process_audio_stream", data=audio,
+        headers={'Content-Type': 'audio/wav', 'Accept': 'application/octet-stream'}
+    )
+    turn = Turn()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            status = 'ok'
+            while True:
+                header = response.read(5)
+                if len(header) < 5:
+                    break
+                kind, length = header[:1], struct.unpack('<I', header[1:])[0]
+                payload = response.read(length)
+                if kind == b'a':
+                    turn.audio()
+                elif json.loads(payload).get('type') in ('error', 'cancelled'):
+                    status = 'error'
+            turn.done(status)
+    except urllib.error.HTTPError as e:
+        turn.done('rejected' if e.code == 429 else 'error')
+    except OSError:
+        turn.done('error')
+    return turn
+
+
+class SocketUser:
+    """A Socket.IO connection that plays turns with ``audio_data`` and waits for ``turn_complete``"""
+
+    def __init__(self, base_url: str):
+        import socketio
+        from engineio import payload
+        # A polling client that falls behind gets a turn's audio packets in one response;
+        # past this many it would drop the connection (and the next emit with it)
+        payload.Payload.max_decode_packets = 1024
+        self.client = socketio.Client()
+        self.turn = None
+        self.finished = threading.Event()
+        self.client.on('audio_response', lambda data: self.turn and self.turn.audio())
+        self.client.on('turn_complete', lambda data: self._finish('ok'))
+        self.client.on('error', lambda data: self._finish('rejected' if data.get('retry_after') else 'error'))
+        self.client.connect(base_url, wait_timeout=30)
+
+    def _finish(self, status: str):
+        if self.turn is not None and self.turn.latency is None:
+            self.turn.done(status)
+        self.finished.set()
+
+    def play(self, audio: bytes) -> Turn:
+        self.finished.clear()
+        self.turn = Turn()
+        self.client.emit('audio_data', {'audio': audio})
+        if not self.finished.wait(120):
+            self.turn.done('error')
+        return self.turn
+
+    @property
+    def transport(self) -> str:
+        return self.client.transport()
+
+    def close(self):
+        self.client.disconnect()
+
+
+class RSSSampler:
+    """Polls a process's resident memory in the background and keeps the peak"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self.peak = max(self.peak, self.process.memory_info().rss)
+            except psutil.Error:
+                return
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def drive(app_name: str, base_url: str, users: int, turns_per_user: int, fixtures: list, pid: int) -> dict:
+    """Run ``users`` concurrent users, each playing ``turns_per_user`` turns back to back"""
+    turns = []
+    transports = set()
+    lock = threading.Lock()
+
+    def user(index: int):
+        connection = SocketUser(base_url) if app_name == 'app' else None
+        if connection is not None:
+            transports.add(connection.transport)
+        try:
+            for number in range(turns_per_user):
+                audio = fixtures[(index + number) % len(fixtures)]
+                turn = connection.play(audio) if connection else simple_turn(base_url, audio)
+                with lock:
+                    turns.append(turn)
+        finally:
+            if connection is not None:
+                connection.close()
+
+    with RSSSampler(pid) as rss:
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=user, args=(index,)) for index in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started_at
+
+    ok = [turn for turn in turns if turn.status == 'ok']
+    latencies = [turn.latency for turn in ok]
+    first_audio = [turn.first_audio for turn in ok if turn.first_audio is not None]
+    return {
+        'users': users,
+        'turns': len(ok),
+        'rejected': sum(turn.status == 'rejected' for turn in turns),
+        'errors': sum(turn.status == 'error' for turn in turns),
+        'turns_per_sec': len(ok) / wall,
+        'latency': {name: percentile(latencies, q) for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'time_to_first_audio': {name: percentile(first_audio, q) for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'peak_rss_mb': rss.peak / 1024 / 1024,
+        'transport': ','.join(sorted(transports)) or 'http',
+    }
+
+
+def run_app(app_name: str, mode: str, levels: list, turns_per_user: int, fixtures: list,
+            upstreams: MockUpstreams) -> list:
+    upstream_url = upstreams.base_url
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.e2e', '--serve', app_name, '--mode', mode,
+         '--port', str(port), '--upstream', upstream_url],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url, path='/health' if app_name == 'app_simple' else '/')  # app has no /health
+        idle_rss = psutil.Process(server.pid).memory_info().rss / 1024 / 1024
+        drive(app_name, base_url, 1, 1, fixtures, server.pid)  # warm up imports, pools and caches
+        results = []
+        for level in levels:
+            before = dict(upstreams.requests)
+            result = drive(app_name, base_url, level, turns_per_user, fixtures, server.pid)
+            # New upstream connections per upstream request shows how well the app's HTTP pool is reused
+            upstream = {kind: count - before[kind] for kind, count in upstreams.requests.items()}
+            results.append(dict(result, app=app_name, mode=mode, idle_rss_mb=idle_rss,
+                                upstream_requests=upstream['stt'] + upstream['llm'] + upstream['tts'],
+                                upstream_connections=upstream['connections']))
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def print_results(results: list):
+    print(f"{'app':<10} {'mode':<6} {'users':>5} {'turns':>5} {'turns/s':>8} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6} "
+          f"{'TTFA50':>7} {'TTFA95':>7} {'RSS MB':>7} {'429s':>5} {'errors':>6}")
+    for result in results:
+        latency, first_audio = result['latency'], result['time_to_first_audio']
+        seconds = lambda value: f"{value:.2f}" if value is not None else "-"
+        print(f"{result['app']:<10} {result['mode']:<6} {result['users']:>5} {result['turns']:>5} "
+              f"{result['turns_per_sec']:>8.2f} {seconds(latency['p50']):>6} {seconds(latency['p95']):>6} "
+              f"{seconds(latency['p99']):>6} {seconds(first_audio['p50']):>7} {seconds(first_audio['p95']):>7} "
+              f"{result['peak_rss_mb']:>7.0f} {result['rejected']:>5} {result['errors']:>6}")
+
+
+def compare(before_path: str, after_path: str):
+    """Print the change in each headline number between two result files"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    if before['settings'] != after['settings']:
+        print("⚠️ The runs used different settings; differences are not only the code's")
+    print(f"{(before['git']['commit'] or '?')[:10]} -> {(after['git']['commit'] or '?')[:10]}")
+    previous = {(r['app'], r['mode'], r['users']): r for r in before['results']}
+    print(f"{'app':<10} {'mode':<6} {'users':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'TTFA50':>8} {'turns/s':>8} {'RSS':>8}")
+    for result in after['results']:
+        old = previous.get((result['app'], result['mode'], result['users']))
+        if old is None:
+            continue
+        def change(new_value, old_value):
+            if new_value is None or not old_value:
+                return f"{'-':>8}"
+            return f"{(new_value - old_value) / old_value * 100:>+7.0f}%"
+        print(f"{result['app']:<10} {result['mode']:<6} {result['users']:>5} "
+              f"{change(result['latency']['p50'], old['latency']['p50'])} "
+              f"{change(result['latency']['p95'], old['latency']['p95'])} "
+              f"{change(result['latency']['p99'], old['latency']['p99'])} "
+              f"{change(result['time_to_first_audio']['p50'], old['time_to_first_audio']['p50'])} "
+              f"{change(result['turns_per_sec'], old['turns_per_sec'])} "
+              f"{change(result['peak_rss_mb'], old['peak_rss_mb'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', default=','.join(APPS))
+    parser.add_argument('--modes', default='sync,async', help='SERVING_MODE values to run each app in')
+    parser.add_argument('--users', default='1,4,8', help='concurrent users per level')
+    parser.add_argument('--turns', type=int, default=5, help='turns per user at each level')
+    parser.add_argument('--fixtures', nargs='*', default=[], help='WAV files or directories to replay')
+    parser.add_argument('--stt-latency', type=float, default=0.3)
+    parser.add_argument('--llm-first-token', type=float, default=0.3)
+    parser.add_argument('--llm-token-interval', type=float, default=0.02)
+    parser.add_argument('--tts-first-byte', type=float, default=0.2)
+    parser.add_argument('--tts-chunk-interval', type=float, default=0.02)
+    parser.add_argument('--tts-chunk-bytes', type=int, default=4096)
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--jitter', type=float, default=0.25, help='spread of upstream latencies (see MockUpstreams)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    parser.add_argument('--serve', choices=APPS, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.mode, args.port, args.upstream)
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    upstream_settings = {
+        'stt_latency': args.stt_latency,
+        'llm_first_token': args.llm_first_token,
+        'llm_token_interval': args.llm_token_interval,
+        'tts_first_byte': args.tts_first_byte,
+        'tts_chunk_interval': args.tts_chunk_interval,
+        'tts_chunk_bytes': args.tts_chunk_bytes,
+        'distribution': args.distribution,
+        'jitter': args.jitter,
+        'seed': args.seed,
+    }
+    fixtures = load_fixtures(args.fixtures, seed=args.seed)
+    levels = [int(level) for level in args.users.split(',')]
+    upstreams = MockUpstreams(**upstream_settings)
+    upstream_url = upstreams.start()
+    print(f"🧪 Mock upstreams on {upstream_url}, {len(fixtures)} fixtures, {args.turns} turns per user")
+    results = []
+    try:
+        for app_name in args.apps.split(','):
+            for mode in args.modes.split(','):
+                results += run_app(app_name, mode, levels, args.turns, fixtures, upstreams)
+    finally:
+        upstreams.stop()
+    print_results(results)
+
+    if args.out:
+        report = {
+            'git': git_revision(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+            'settings': {'upstreams': upstream_settings, 'turns_per_user': args.turns, 'users': levels,
+                         'fixtures': args.fixtures or 'synthetic'},
+            'results': results,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
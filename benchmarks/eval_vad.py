@@ -0,0 +1,260 @@
+"""
+VAD Evaluation
+Runs the old amplitude endpointing and each VAD engine over WAV recordings and compares endpoints
+
+    python -m benchmarks.eval_vad recordings/*.wav
+    python -m benchmarks.eval_vad --write-corpus /tmp/vad-corpus   # synthetic, labelled
+
+A recording may have a sidecar ``<name>.json`` of ground-truth speech segments,
+``{"speech": [[start_seconds, end_seconds], ...]}``; without one only the
+detected utterances are reported. With no paths, a synthetic corpus of
+speech-like signals in background noise at several SNRs is generated.
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import tempfile
+import time
+import wave
+import numpy as np
+from audio_format import wav_bytes
+from vad import ENGINES, Endpointer
+
+LEGACY_THRESHOLD = 0.01
+LEGACY_SILENCE_SECONDS = 1.0
+
+
+def read_wav(path: str) -> tuple:
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        return pcm, wav.getframerate(), wav.getnchannels()
+
+
+def read_labels(path: str):
+    try:
+        with open(os.path.splitext(path)[0] + '.json') as f:
+            return [tuple(segment) for segment in json.load(f)['speech']]
+    except FileNotFoundError:
+        return None
+
+
+def legacy_endpoints(pcm: np.ndarray, sample_rate: int, channels: int, chunk_frames: int) -> list:
+    """AudioHandler's original rule: chunks above a mean-amplitude threshold are speech,
+    and an utterance ends once none has been seen for a second. Silent chunks were not kept."""
+    utterances = []
+    start = None
+    last_audio = None
+    for offset in range(0, len(pcm) // channels, chunk_frames):
+        chunk = pcm[offset * channels:(offset + chunk_frames) * channels]
+        now = (offset + len(chunk) // channels) / sample_rate  # when the callback runs
+        if np.abs(chunk).mean() / 32768.0 > LEGACY_THRESHOLD:
+            if start is None:
+                start = offset / sample_rate
+            last_audio = now
+        elif start is not None and now - last_audio > LEGACY_SILENCE_SECONDS:
+            utterances.append((start, now))
+            start = None
+    if start is not None:
+        utterances.append((start, None))
+    return utterances
+
+
+def vad_endpoints(pcm: np.ndarray, sample_rate: int, channels: int, chunk_frames: int, engine: str,
+                  hangover_ms: int = None, pre_roll_ms: int = None) -> tuple:
+    """(utterances as (start seconds, end decided at seconds), mean CPU µs per chunk)"""
+    endpointer = Endpointer(ENGINES[engine](sample_rate), channels, pre_roll_ms=pre_roll_ms, hangover_ms=hangover_ms)
+    utterances = []
+    start = None
+    cpu = 0.0
+    chunks = 0
+    for offset in range(0, len(pcm) // channels, chunk_frames):
+        chunk = pcm[offset * channels:(offset + chunk_frames) * channels]
+        started_at = time.perf_counter()
+        events = endpointer.feed(chunk)
+        cpu += time.perf_counter() - started_at
+        chunks += 1
+        now = (offset + len(chunk) // channels) / sample_rate
+        for event in events:
+            if event.kind == 'start':
+                start = event.offset / sample_rate
+            elif event.kind == 'end':
+                utterances.append((start, now))
+                start = None
+    if start is not None:
+        utterances.append((start, None))
+    return utterances, cpu / max(chunks, 1) * 1e6
+
+
+def score(utterances: list, labels: list) -> dict:
+    """Match detected utterances to labelled ones by overlap"""
+    latencies, clipped, missed, split = [], [], 0, 0
+    matched = set()
+    for true_start, true_end in labels:
+        overlapping = [i for i, (start, end) in enumerate(utterances)
+                       if start < true_end and (end is None or end > true_start)]
+        if not overlapping:
+            missed += 1
+            continue
+        matched.update(overlapping)
+        split += len(overlapping) - 1
+        first, last = utterances[overlapping[0]], utterances[overlapping[-1]]
+        clipped.append(max(0.0, first[0] - true_start))
+        if last[1] is not None:
+            latencies.append(last[1] - true_end)
+    return {
+        'latencies': latencies,
+        'clipped': clipped,
+        'missed': missed,
+        'split': split,
+        'false': len(utterances) - len(matched),
+        'never_ended': sum(1 for _, end in utterances if end is None),
+    }
+
+
+def synthetic_corpus(directory: str, sample_rate: int, seed: int = 0) -> list:
+    """Write labelled recordings of syllable-like tones in white, pink and hum noise at several SNRs"""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for noise in ('white', 'pink', 'hum'):
+        for snr_db in (30, 15, 5):
+            signal, labels = [], []
+            cursor = 0
+            for _ in range(4):
+                gap = np.zeros(int(rng.uniform(1.5, 3.0) * sample_rate))
+                signal.append(gap)
+                cursor += len(gap)
+                utterance = speech_like(rng, sample_rate)
+                labels.append([cursor / sample_rate, (cursor + len(utterance)) / sample_rate])
+                signal.append(utterance)
+                cursor += len(utterance)
+            signal.append(np.zeros(int(2.0 * sample_rate)))
+            speech = np.concatenate(signal)
+            speech_rms = np.sqrt(np.mean(np.concatenate([s for s in signal if s.any()]) ** 2))
+            background = noise_like(rng, noise, len(speech), sample_rate)
+            background *= speech_rms / 10 ** (snr_db / 20) / np.sqrt(np.mean(background ** 2))
+            pcm = np.clip((speech + background) * 32767, -32768, 32767).astype(np.int16)
+
+            path = os.path.join(directory, f"{noise}_{snr_db}db.wav")
+            with open(path, 'wb') as f:
+                f.write(wav_bytes(memoryview(pcm), sample_rate))
+            with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+                json.dump({'speech': labels}, f)
+            paths.append(path)
+    return paths
+
+
+def speech_like(rng, sample_rate: int) -> np.ndarray:
+    """A soft fricative onset, then voiced syllables with short pauses, fading out"""
+    parts = [fricative(rng, sample_rate, rng.uniform(0.08, 0.15))]
+    for syllable in range(rng.integers(4, 10)):
+        seconds = rng.uniform(0.12, 0.3)
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * 3 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        formants = (rng.uniform(300, 900), rng.uniform(900, 2500))
+        voiced = sum(np.sin(k * phase) * formant_gain(k * f0.mean(), formants) for k in range(1, 30))
+        parts.append(0.1 * voiced * np.hanning(len(t)))
+        if rng.random() < 0.3:
+            parts.append(np.zeros(int(rng.uniform(0.08, 0.25) * sample_rate)))  # pause inside the sentence
+    parts[-1] = parts[-1] * np.linspace(1, 0.3, len(parts[-1]))  # trailing off
+    return np.concatenate(parts)
+
+
+def formant_gain(frequency: float, formants: tuple) -> float:
+    """Harmonic amplitude under a two-resonance vowel envelope"""
+    return sum(1 / (1 + ((frequency - formant) / 150) ** 2) for formant in formants) + 0.05
+
+
+def fricative(rng, sample_rate: int, seconds: float) -> np.ndarray:
+    noise = rng.normal(0, 1, int(seconds * sample_rate))
+    spectrum = np.fft.rfft(noise)
+    frequencies = np.fft.rfftfreq(len(noise), 1.0 / sample_rate)
+    spectrum[(frequencies < 2500) | (frequencies > 7000)] = 0
+    return 0.02 * np.fft.irfft(spectrum, len(noise)) / np.std(np.fft.irfft(spectrum, len(noise)))
+
+
+def noise_like(rng, kind: str, length: int, sample_rate: int) -> np.ndarray:
+    if kind == 'white':
+        return rng.normal(0, 1, length)
+    if kind == 'pink':
+        spectrum = np.fft.rfft(rng.normal(0, 1, length))
+        spectrum[1:] /= np.sqrt(np.arange(1, len(spectrum)))
+        return np.fft.irfft(spectrum, length)
+    t = np.arange(length) / sample_rate
+    return np.sin(2 * np.pi * 50 * t) + 0.5 * np.sin(2 * np.pi * 150 * t) + 0.05 * rng.normal(0, 1, length)
+
+
+def summarize(name: str, results: list):
+    latencies = [value for result in results for value in result['latencies']]
+    clipped = [value for result in results for value in result['clipped']]
+    totals = {key: sum(result[key] for result in results) for key in ('missed', 'split', 'false', 'never_ended')}
+    median = f"{statistics.median(latencies) * 1000:>8.0f}" if latencies else f"{'-':>8}"
+    p95 = f"{sorted(latencies)[max(0, -(-len(latencies) * 95 // 100) - 1)] * 1000:>8.0f}" if latencies else f"{'-':>8}"
+    clip = f"{statistics.mean(clipped) * 1000:>8.0f}" if clipped else f"{'-':>8}"
+    print(f"{name:<10} {median} {p95} {clip} {totals['missed']:>7} {totals['split']:>6} "
+          f"{totals['false']:>6} {totals['never_ended']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='WAV files or directories of them')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='VAD engines to compare with the legacy rule')
+    parser.add_argument('--chunk-frames', type=int, default=1024, help='frames per audio callback')
+    parser.add_argument('--hangover-ms', type=int, default=None)
+    parser.add_argument('--pre-roll-ms', type=int, default=None)
+    parser.add_argument('--sample-rate', type=int, default=44100, help='rate of the synthetic corpus')
+    parser.add_argument('--write-corpus', default=None, help='keep the synthetic corpus in this directory')
+    parser.add_argument('--verbose', action='store_true', help='print detected utterances per file')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths += sorted(glob.glob(os.path.join(path, '*.wav'))) if os.path.isdir(path) else [path]
+    if not paths:
+        directory = args.write_corpus or tempfile.mkdtemp(prefix='vad-corpus-')
+        os.makedirs(directory, exist_ok=True)
+        paths = synthetic_corpus(directory, args.sample_rate)
+        print(f"🧪 Synthetic corpus of {len(paths)} recordings in {directory}")
+
+    engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    results = {name: [] for name in ['legacy', *engines]}
+    cpu = {engine: [] for engine in engines}
+    unlabelled = 0
+    for path in paths:
+        pcm, sample_rate, channels = read_wav(path)
+        labels = read_labels(path)
+        detected = {'legacy': legacy_endpoints(pcm, sample_rate, channels, args.chunk_frames)}
+        for engine in engines:
+            detected[engine], mean_us = vad_endpoints(pcm, sample_rate, channels, args.chunk_frames, engine,
+                                                      args.hangover_ms, args.pre_roll_ms)
+            cpu[engine].append(mean_us)
+        if args.verbose or labels is None:
+            print(f"📄 {os.path.basename(path)}")
+            for name, utterances in detected.items():
+                spans = ', '.join(f"{start:.2f}-{'∞' if end is None else f'{end:.2f}'}" for start, end in utterances)
+                print(f"   {name:<10} {spans or '(none)'}")
+        if labels is None:
+            unlabelled += 1
+            continue
+        for name, utterances in detected.items():
+            results[name].append(score(utterances, labels))
+
+    if unlabelled:
+        print(f"ℹ️ {unlabelled} recordings had no labels and are not scored")
+    if any(results.values()):
+        print("Endpoint latency: end of speech until the utterance is sent. Clipped: speech lost at onset.")
+        print(f"{'endpointer':<10} {'p50 ms':>8} {'p95 ms':>8} {'clip ms':>8} {'missed':>7} {'split':>6} "
+              f"{'false':>6} {'unended':>6}")
+        for name, scored in results.items():
+            summarize(name, scored)
+    for engine, values in cpu.items():
+        print(f"⏱️ {engine}: {statistics.mean(values):.0f} µs CPU per {args.chunk_frames}-frame callback")
+
+
+if __name__ == "__main__":
+    main()
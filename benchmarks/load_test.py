@@ -0,0 +1,157 @@
+"""
+Load Test
+Measures app_simple turn throughput against local mock upstreams as concurrent clients grow
+
+    python -m benchmarks.load_test --modes sync,async --concurrency 1,4,16
+"""
+
+import argparse
+import base64
+import http.cookiejar
+import json
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.mock_upstreams import MockUpstreams
+
+
+def synthetic_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    from audio_format import wav_header
+    pcm = b"\x00\x00" * int(seconds * sample_rate)
+    return wav_header(sample_rate, data_size=len(pcm)) + pcm
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(mode: str, port: int, upstream_url: str):
+    """Run app_simple with the chosen SERVING_MODE on a threaded server, as gunicorn's gthread workers serve it"""
+    os.environ.update({
+        'ELEVENLABS_API_KEY': 'mock-key',
+        'OPENAI_API_KEY': 'sk-mock-key',
+        'ELEVENLABS_BASE_URL': upstream_url,
+        'OPENAI_BASE_URL': f"{upstream_url}/v1",
+        'SERVING_MODE': mode,
+        'ENABLE_CONVERSATION_LOGGING': 'false',
+    })
+    from werkzeug.serving import make_server
+    import app_simple
+    server = make_server('127.0.0.1', port, app_simple.app, threaded=True)
+    server.serve_forever()
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0, path: str = "/health"):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}{path}", timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+
+def drive(base_url: str, concurrency: int, turns_per_client: int, audio: bytes) -> dict:
+    """Run ``concurrency`` clients that each play ``turns_per_client`` turns back to back"""
+    body = json.dumps({'audio': base64.b64encode(audio).decode('utf-8')}).encode()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def client():
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        for _ in range(turns_per_client):
+            request = urllib.request.Request(
+                f"{base_url}/process_audio", data=body, headers={'Content-Type': 'application/json'}
+            )
+            started_at = time.perf_counter()
+            try:
+                with opener.open(request, timeout=120) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            elapsed = time.perf_counter() - started_at
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started_at = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'turns': len(latencies),
+        'turns_per_sec': len(latencies) / wall,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else 0.0,
+        'rejected': statuses.get(429, 0),
+        'errors': sum(count for status, count in statuses.items() if status not in (200, 429)),
+    }
+
+
+def run_mode(mode: str, levels: list, turns_per_client: int, upstream_url: str) -> list:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.load_test', '--serve', mode, '--port', str(port), '--upstream', upstream_url],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url)
+        audio = synthetic_wav()
+        return [dict(drive(base_url, level, turns_per_client, audio), mode=mode) for level in levels]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--concurrency', default='1,2,4,8,16')
+    parser.add_argument('--turns', type=int, default=3, help='turns per client')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.upstream)
+        return
+
+    upstreams = MockUpstreams()
+    upstream_url = upstreams.start()
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"🧪 Mock upstreams on {upstream_url}")
+    print(f"{'mode':<6} {'clients':>7} {'turns':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'429s':>5} {'errors':>6}")
+    try:
+        for mode in args.modes.split(','):
+            for result in run_mode(mode, levels, args.turns, upstream_url):
+                print(f"{result['mode']:<6} {result['concurrency']:>7} {result['turns']:>6} "
+                      f"{result['turns_per_sec']:>8.2f} {result['p50']:>7.2f} {result['p95']:>7.2f} "
+                      f"{result['rejected']:>5} {result['errors']:>6}")
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
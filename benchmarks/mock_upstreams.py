@@ -0,0 +1,196 @@
+"""
+Mock Upstreams
+Local stand-ins for the ElevenLabs STT/TTS and OpenAI chat completion APIs
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Sure, I can help with that. "
+    "The quick answer is that it depends on a few things. "
+    "Let me know if you would like more detail on any of them."
+)
+
+
+# How ``jitter`` spreads each latency around its configured value
+DISTRIBUTIONS = ('uniform', 'lognormal')
+
+
+class MockUpstreams:
+    """Serves fake upstream APIs on one local port with configurable latencies (seconds).
+
+    With ``distribution='uniform'`` each delay is scaled by a factor in
+    [1 - jitter, 1 + jitter]; with ``'lognormal'`` the configured latency is
+    the median and ``jitter`` the sigma, which gives the long tail real APIs
+    have. ``seed`` makes the sequence of delays repeatable.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 stt_latency: float = 0.3, llm_first_token: float = 0.3, llm_token_interval: float = 0.02,
+                 tts_first_byte: float = 0.2, tts_chunk_interval: float = 0.02, tts_chunk_bytes: int = 4096,
+                 tts_bytes_per_char: int = 1000, jitter: float = 0.0, distribution: str = 'uniform',
+                 seed: int = None, transcript: str = "What can you do?", reply: str = DEFAULT_REPLY):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"distribution must be one of {DISTRIBUTIONS}")
+        self.stt_latency = stt_latency
+        self.llm_first_token = llm_first_token
+        self.llm_token_interval = llm_token_interval
+        self.tts_first_byte = tts_first_byte
+        self.tts_chunk_interval = tts_chunk_interval
+        self.tts_chunk_bytes = tts_chunk_bytes
+        self.tts_bytes_per_char = tts_bytes_per_char
+        self.jitter = jitter
+        self.distribution = distribution
+        self.random = random.Random(seed)
+        self.transcript = transcript
+        self.reply = reply
+        self.requests = {'stt': 0, 'llm': 0, 'tts': 0, 'connections': 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-upstreams", daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def delay(self, seconds: float):
+        if self.jitter:
+            with self.lock:
+                if self.distribution == 'lognormal':
+                    seconds *= self.random.lognormvariate(0.0, self.jitter)
+                else:
+                    seconds *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def count(self, kind: str):
+        with self.lock:
+            self.requests[kind] += 1
+
+    def _handler_class(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling is exercised
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                upstreams.count('connections')
+
+            def do_HEAD(self):
+                # Connection warm-up
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                path = self.path.split('?')[0]
+                if path.endswith('/speech-to-text'):
+                    self.speech_to_text()
+                elif path.endswith('/chat/completions'):
+                    self.chat_completions(json.loads(body or b'{}'))
+                elif '/text-to-speech/' in path:
+                    self.text_to_speech(json.loads(body or b'{}'))
+                else:
+                    self.send_json(404, {'detail': 'not found'})
+
+            def send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def start_chunked(self, content_type: str):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def speech_to_text(self):
+                upstreams.count('stt')
+                upstreams.delay(upstreams.stt_latency)
+                self.send_json(200, {
+                    'language_code': 'en',
+                    'language_probability': 1.0,
+                    'text': upstreams.transcript,
+                    'words': [],
+                })
+
+            def chat_completions(self, request: dict):
+                upstreams.count('llm')
+                reply = upstreams.reply if not request.get('max_tokens') else "Summary of the conversation so far."
+                upstreams.delay(upstreams.llm_first_token)
+                if not request.get('stream'):
+                    self.send_json(200, {
+                        'id': 'mock', 'object': 'chat.completion', 'created': int(time.time()),
+                        'model': request.get('model', 'mock'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': reply}}],
+                        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                    })
+                    return
+                self.start_chunked('text/event-stream')
+                words = reply.split(' ')
+                for i, word in enumerate(words):
+                    if i:
+                        upstreams.delay(upstreams.llm_token_interval)
+                    chunk = {
+                        'id': 'mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                        'model': request.get('model', 'mock'),
+                        'choices': [{'index': 0, 'finish_reason': None,
+                                     'delta': {'content': word if i == len(words) - 1 else word + ' '}}],
+                    }
+                    self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.write_chunk(b"data: [DONE]\n\n")
+                self.write_chunk(b"")
+
+            def text_to_speech(self, request: dict):
+                upstreams.count('tts')
+                remaining = max(len(request.get('text', '')), 1) * upstreams.tts_bytes_per_char
+                remaining -= remaining % 2
+                upstreams.delay(upstreams.tts_first_byte)
+                self.start_chunked('audio/pcm')
+                while remaining > 0:
+                    size = min(upstreams.tts_chunk_bytes, remaining)
+                    self.write_chunk(b"\x00" * size)
+                    remaining -= size
+                    if remaining:
+                        upstreams.delay(upstreams.tts_chunk_interval)
+                self.write_chunk(b"")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    upstreams = MockUpstreams(port=8090)
+    print(f"🧪 Mock upstreams listening on {upstreams.start()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
@@ -0,0 +1,120 @@
+"""
+Playback Benchmark
+Plays simulated streaming TTS replies through the PlaybackQueue on a real-time null device
+
+    python -m benchmarks.playback --replies 5 --reply-seconds 2 --jitter 0.6
+
+For each jitter buffer size it reports how long the first sound takes
+compared with the old path (the whole reply synthesized, then played),
+underruns and the silence they caused, the gap between two replies
+queued back to back, and how long audio keeps playing after a flush.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from playback import NullOutput, PlaybackQueue
+
+SAMPLE_RATE = 22050
+CHUNK_BYTES = 4096
+
+
+class RecordingOutput(NullOutput):
+    """A real-time null device that remembers when each write started playing"""
+
+    def __init__(self, sample_rate: int):
+        super().__init__(sample_rate)
+        self.starts = []
+
+    def write(self, pcm: bytes):
+        super().write(pcm)
+        self.starts.append(time.monotonic())
+
+
+def tts_chunks(rng: random.Random, seconds: float, first_byte: float, speed: float, jitter: float):
+    """A reply streamed like the TTS API: a first-byte wait, then chunks ``speed`` times faster than real time"""
+    remaining = int(seconds * SAMPLE_RATE) * 2
+    time.sleep(first_byte * rng.lognormvariate(0.0, jitter))
+    while remaining > 0:
+        size = min(CHUNK_BYTES, remaining)
+        yield bytes(size)
+        remaining -= size
+        if remaining:
+            time.sleep(CHUNK_BYTES / 2 / SAMPLE_RATE / speed * rng.lognormvariate(0.0, jitter))
+
+
+def run(jitter_buffer_ms: int, args) -> dict:
+    rng = random.Random(args.seed)
+    output = RecordingOutput(SAMPLE_RATE)
+    playback = PlaybackQueue(output, SAMPLE_RATE, jitter_buffer_ms=jitter_buffer_ms, period_ms=args.period_ms)
+    legacy_first, first = [], []
+    for _ in range(args.replies):
+        started_at = time.monotonic()
+        output.starts.clear()
+        output.gaps.clear()
+        chunks = list(tts_chunks(rng, args.reply_seconds, args.first_byte, args.speed, args.jitter))
+        # The old path had to wait for all of it
+        legacy_first.append(time.monotonic() - started_at)
+        del chunks
+
+        started_at = time.monotonic()
+        output.starts.clear()
+        output.gaps.clear()
+        playback.play(tts_chunks(rng, args.reply_seconds, args.first_byte, args.speed, args.jitter))
+        first.append(output.starts[0] - started_at)
+    stalls = playback.stats()
+
+    # Two replies queued back to back should play as one
+    output.clock = None
+    output.gaps.clear()
+    playback.enqueue(bytes(SAMPLE_RATE))
+    playback.end()
+    playback.enqueue(bytes(SAMPLE_RATE))
+    playback.end()
+    playback.wait()
+    back_to_back_gap = sum(output.gaps)
+
+    # Barge-in partway through a reply
+    playback.enqueue(bytes(SAMPLE_RATE * 4))
+    playback.end()
+    time.sleep(0.5)
+    flushed_at = time.monotonic()
+    playback.flush()
+    playback.wait()
+    # The device clock is when the last audio written finishes playing
+    flush_ms = max(output.clock - flushed_at, 0.0) * 1000
+    playback.close()
+    return {
+        'legacy_first': statistics.median(legacy_first),
+        'first': statistics.median(first),
+        'underruns': stalls['underruns'],
+        'underrun_ms': stalls['underrun_ms'],
+        'back_to_back_gap_ms': back_to_back_gap * 1000,
+        'flush_ms': flush_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replies', type=int, default=5)
+    parser.add_argument('--reply-seconds', type=float, default=2.0)
+    parser.add_argument('--first-byte', type=float, default=0.2, help='TTS time to first byte (s)')
+    parser.add_argument('--speed', type=float, default=2.0, help='TTS synthesis speed relative to real time')
+    parser.add_argument('--jitter', type=float, default=0.6, help='lognormal sigma of every TTS delay')
+    parser.add_argument('--jitter-buffers', default='0,60,120,250', help='jitter buffer sizes to try (ms)')
+    parser.add_argument('--period-ms', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'buffer ms':>9} {'old first':>10} {'first':>7} {'underruns':>9} {'stalled ms':>10} "
+          f"{'b2b gap ms':>10} {'flush ms':>8}")
+    for jitter_buffer_ms in (int(ms) for ms in args.jitter_buffers.split(',')):
+        result = run(jitter_buffer_ms, args)
+        print(f"{jitter_buffer_ms:>9} {result['legacy_first']:>9.2f}s {result['first']:>6.2f}s "
+              f"{result['underruns']:>9} {result['underrun_ms']:>10.0f} "
+              f"{result['back_to_back_gap_ms']:>10.1f} {result['flush_ms']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
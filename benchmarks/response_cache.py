@@ -0,0 +1,162 @@
+"""
+Response Cache Benchmark
+Checks which rewordings each cache tier answers and what a repeated question costs upstream
+
+    python -m benchmarks.response_cache --entries 1000
+
+First, pairs of prompts that ask the same thing and pairs that don't are
+looked up in the exact tier and the near-duplicate tier; a hit on a pair
+that asks something different is a wrong answer, so that column must be
+zero. Then the lookup cost is timed with ``--entries`` cached prompts.
+Last, a few questions are asked through the TurnEngine against mock
+upstreams, then asked again and then reworded, each in a fresh session:
+the repeats should make no LLM or TTS requests at all, with the response
+cache answering and the TTS cache speaking the answer.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+SAME = [
+    ("Who is Elon Musk?", "who is elon musk"),
+    ("Who is Elon Musk?", "Who is Elon Musk, please?"),
+    ("Who is Elon Musk?", "Tell me who Elon Musk is."),
+    ("What's the weather like today?", "What is the weather like today?"),
+    ("Tell me a joke.", "Can you tell me a joke?"),
+    ("Who is the prime minister of India?", "Who's the prime minister of India?"),
+    ("What time is it?", "What time is it now?"),
+    ("What is the capital of France?", "Whats the capital of France"),
+    ("What is your name?", "Hey, what is your name?"),
+    ("How are you?", "How are you doing?"),
+    ("What can you do?", "What are you able to do?"),
+]
+DIFFERENT = [
+    ("Who is Elon Musk?", "Who is Narendra Modi?"),
+    ("What is the capital of France?", "What is the capital of Spain?"),
+    ("Tell me a joke.", "Tell me a story."),
+    ("How are you?", "Who are you?"),
+    ("What time is it?", "What day is it?"),
+    ("Who is the prime minister of India?", "Who is the president of India?"),
+    ("What's the weather like today?", "What's the weather like tomorrow?"),
+    ("Turn on the lights.", "Turn off the lights."),
+    ("What is your name?", "What is my name?"),
+    ("What is 2 plus 2?", "What is 2 plus 3?"),
+    ("Tell me about you.", "Tell you about me."),
+    ("What is the weather?", "What is the weather now?"),
+]
+# (question, a rewording of it, the mock LLM's answer)
+QUESTIONS = [
+    ("Who is Elon Musk?", "Can you tell me who Elon Musk is?",
+     "Elon Musk is an entrepreneur. He runs Tesla and SpaceX, among other companies."),
+    ("Tell me a joke.", "Please tell me a joke!",
+     "Why did the scarecrow win an award? Because he was outstanding in his field."),
+    ("What is the capital of France?", "Hey, what's the capital of France?",
+     "The capital of France is Paris. It is also the country's largest city."),
+]
+
+
+def tier_hits(pairs: list, semantic: bool) -> tuple:
+    from response_cache import ResponseCache
+    exact = near = 0
+    for cached, asked in pairs:
+        cache = ResponseCache(semantic=semantic, ttl_seconds=60)
+        cache.put(cache.key(cached, None, []), "answer")
+        cache.get(cache.key(asked, None, []))
+        stats = cache.stats()
+        exact += stats['exact_hits']
+        near += stats['semantic_hits']
+    return exact, near
+
+
+def lookup_cost(entries: int, semantic: bool, lookups: int = 2000) -> float:
+    """Median microseconds per miss (the worst case: both tiers are looked up)"""
+    from response_cache import ResponseCache
+    cache = ResponseCache(max_entries=entries, semantic=semantic, ttl_seconds=60)
+    for i in range(entries):
+        cache.put(cache.key(f"what is the name of the thing number {i}", None, []), f"answer {i}")
+    keys = [cache.key(f"who wrote the book called {i}", None, []) for i in range(lookups)]
+    timings = []
+    for key in keys:
+        started_at = time.perf_counter()
+        cache.get(key)
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings) * 1e6
+
+
+def repeat_questions(upstreams) -> list:
+    """Ask each question, the same again and then reworded (fresh sessions each time); report each pass"""
+    from elevenlabs_client import ElevenLabsClient
+    from openai_client import OpenAIClient
+    from session_store import Session
+    from turn_pipeline import TurnEngine
+
+    engine = TurnEngine(ElevenLabsClient(), OpenAIClient())
+    results = []
+    for name, reworded in (('first', False), ('repeat', False), ('reworded', True)):
+        before = dict(upstreams.requests)
+        first_audio, totals, answers = [], [], []
+        for i, (question, rewording, reply) in enumerate(QUESTIONS):
+            upstreams.reply = reply
+            for event in engine.respond(rewording if reworded else question, session=Session(f"user-{name}-{i}")):
+                if event['type'] == 'response':
+                    answers.append(event['text'] == reply)
+                if event['type'] == 'done':
+                    first_audio.append(event['timings']['time_to_first_audio'])
+                    totals.append(event['timings']['total'])
+        results.append({
+            'pass': name,
+            'llm': upstreams.requests['llm'] - before['llm'],
+            'tts': upstreams.requests['tts'] - before['tts'],
+            'first_audio_ms': statistics.median(first_audio) * 1000,
+            'total_ms': statistics.median(totals) * 1000,
+            'correct': all(answers),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1000, help='cached prompts when timing lookups')
+    parser.add_argument('--semantic', choices=('on', 'off'), default='on',
+                        help='near-duplicate tier for the repeated-question run')
+    args = parser.parse_args()
+
+    from benchmarks.mock_upstreams import MockUpstreams
+    upstreams = MockUpstreams(seed=0)
+    upstream_url = upstreams.start()
+    # Before anything imports config
+    os.environ.update({
+        'ELEVENLABS_API_KEY': 'mock-key',
+        'OPENAI_API_KEY': 'sk-mock-key',
+        'ELEVENLABS_BASE_URL': upstream_url,
+        'OPENAI_BASE_URL': f"{upstream_url}/v1",
+        'RESPONSE_CACHE_ENABLED': 'true',
+        'RESPONSE_CACHE_SEMANTIC': 'true' if args.semantic == 'on' else 'false',
+        'TTS_CACHE_ENABLED': 'true',
+        'TTS_CACHE_DIR': '',
+        'TTS_CACHE_PREWARM_FILE': '',
+    })
+
+    print(f"{'tier':>14} {'same: exact':>11} {'near':>5} {'different: hits':>15} {'lookup us':>9}")
+    for semantic in (False, True):
+        same_exact, same_near = tier_hits(SAME, semantic)
+        different_exact, different_near = tier_hits(DIFFERENT, semantic)
+        print(f"{'exact + near' if semantic else 'exact':>14} {same_exact:>8}/{len(SAME)} {same_near:>5} "
+              f"{different_exact + different_near:>12}/{len(DIFFERENT)} "
+              f"{lookup_cost(args.entries, semantic):>9.1f}")
+
+    print()
+    print(f"{'pass':>9} {'llm reqs':>8} {'tts reqs':>8} {'first audio':>11} {'total':>8} {'answer':>7}")
+    try:
+        results = repeat_questions(upstreams)
+    finally:
+        upstreams.stop()
+    for result in results:
+        print(f"{result['pass']:>9} {result['llm']:>8} {result['tts']:>8} {result['first_audio_ms']:>9.0f}ms "
+              f"{result['total_ms']:>6.0f}ms {'ok' if result['correct'] else 'WRONG':>7}")
+
+
+if __name__ == "__main__":
+    main()
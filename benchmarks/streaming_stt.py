@@ -0,0 +1,75 @@
+"""
+Streaming STT Benchmark
+Compares how long a turn waits on STT after the user stops speaking, whole-recording vs streamed segments
+
+    python -m benchmarks.streaming_stt --utterances 5 --stt-base 0.3 --stt-per-second 0.1
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio_format import wav_bytes
+from benchmarks.eval_vad import noise_like, speech_like
+from streaming_stt import StreamingTranscriber
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.085  # what the browser's 4096-sample ScriptProcessor sends at 48 kHz
+
+
+def fake_stt(base: float, per_second: float):
+    """An STT call whose latency grows with the length of the upload, like the real API"""
+    def transcribe(wav: bytes) -> str:
+        seconds = (len(wav) - 44) / 2 / SAMPLE_RATE
+        time.sleep(base + per_second * seconds)
+        return f"<{seconds:.1f}s>"
+    return transcribe
+
+
+def utterance(rng) -> np.ndarray:
+    """A few sentences with pauses, in light background noise, followed by trailing silence"""
+    parts = []
+    for _ in range(3):
+        parts += [speech_like(rng, SAMPLE_RATE), np.zeros(int(rng.uniform(0.3, 0.6) * SAMPLE_RATE))]
+    speech = np.concatenate(parts)
+    speech += 0.003 * noise_like(rng, 'white', len(speech), SAMPLE_RATE)
+    return np.clip(speech * 32767, -32768, 32767).astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--utterances', type=int, default=5)
+    parser.add_argument('--stt-base', type=float, default=0.3, help='STT latency per request (s)')
+    parser.add_argument('--stt-per-second', type=float, default=0.1, help='extra STT latency per second of audio')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    transcribe = fake_stt(args.stt_base, args.stt_per_second)
+    executor = ThreadPoolExecutor(max_workers=8)
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    batch, streamed, segments = [], [], []
+    for _ in range(args.utterances):
+        pcm = utterance(rng)
+
+        # Push-to-talk release at the end of the recording: the old path uploads it all now
+        started_at = time.perf_counter()
+        transcribe(wav_bytes(memoryview(pcm), SAMPLE_RATE))
+        batch.append(time.perf_counter() - started_at)
+
+        transcriber = StreamingTranscriber(transcribe, executor, SAMPLE_RATE)
+        for offset in range(0, len(pcm), frame):
+            transcriber.feed(pcm[offset:offset + frame].tobytes())
+            time.sleep(FRAME_SECONDS)  # frames arrive in real time
+        _, timings = transcriber.finish()
+        streamed.append(timings['stt'])
+        segments.append(timings['stt_segments'])
+        print(f"🎙️ {len(pcm) / SAMPLE_RATE:.1f}s utterance: whole {batch[-1]:.2f}s, "
+              f"streamed {streamed[-1]:.2f}s ({segments[-1]} segments)")
+
+    print(f"STT wait after end of speech, median: whole recording {statistics.median(batch):.2f}s, "
+          f"streamed {statistics.median(streamed):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
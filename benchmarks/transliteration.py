@@ -0,0 +1,144 @@
+"""
+Transliteration Benchmark
+Compares the compiled transliteration engine's output with the old replace loops, then times both
+
+    python -m benchmarks.transliteration --iterations 20000
+
+Expected output of the engine is checked by test_transliteration.py.
+"""
+
+import argparse
+import timeit
+from transliteration import to_english
+
+# The tables and normalization elevenlabs_client used before transliteration.py (duplicate keys and all)
+LEGACY_DEVANAGARI_CHARS = ['अ', 'आ', 'इ', 'ई', 'उ', 'ऊ', 'ए', 'ऐ', 'ओ', 'औ', 'क', 'ख', 'ग', 'घ', 'च', 'छ', 'ज', 'झ', 'ट', 'ठ', 'ड', 'ढ', 'ण', 'त', 'थ', 'द', 'ध', 'न', 'प', 'फ', 'ब', 'भ', 'म', 'य', 'र', 'ल', 'व', 'श', 'ष', 'स', 'ह', 'ड़', 'ढ़', '़', '्', 'ं', 'ः']
+
+LEGACY_HINDI_TO_ENGLISH = {
+    'प्राइम मिनिस्टर ऑफ इंडिया': 'Prime Minister of India',
+    'व्हू इज': 'Who is',
+    'इलोन मस्क': 'Elon Musk',
+    'नरेंद्र मोदी': 'Narendra Modi',
+    'भारत': 'India',
+    'प्रधानमंत्री': 'Prime Minister',
+    'क्या': 'What',
+    'कौन': 'Who',
+    'कहाँ': 'Where',
+    'कब': 'When',
+    'कैसे': 'How',
+    'क्यों': 'Why',
+    'है': 'is',
+    'हैं': 'are',
+    'था': 'was',
+    'थे': 'were',
+    'में': 'in',
+    'का': 'of',
+    'के': 'of',
+    'की': 'of',
+    'और': 'and',
+    'लेकिन': 'but',
+    'या': 'or',
+    'नहीं': 'no',
+    'हाँ': 'yes',
+    'बहुत': 'very',
+    'अच्छा': 'good',
+    'बुरा': 'bad',
+    'बड़ा': 'big',
+    'छोटा': 'small',
+    'नया': 'new',
+    'पुराना': 'old',
+    'सही': 'correct',
+    'गलत': 'wrong',
+    'आज': 'today',
+    'कल': 'tomorrow',
+    'परसों': 'day after tomorrow',
+    'कल': 'yesterday',
+    'अभी': 'now',
+    'फिर': 'then',
+    'भी': 'also',
+    'सिर्फ': 'only',
+    'भी': 'too',
+    'नहीं': 'not',
+    'मैं': 'I',
+    'मुझे': 'me',
+    'मेरा': 'my',
+    'मेरी': 'my',
+    'मेरे': 'my',
+    'आप': 'you',
+    'आपका': 'your',
+    'आपकी': 'your',
+    'आपके': 'your',
+    'वह': 'he/she',
+    'उसका': 'his/her',
+    'उसकी': 'his/her',
+    'उसके': 'his/her',
+    'यह': 'this',
+    'वह': 'that',
+    'यहाँ': 'here',
+    'वहाँ': 'there',
+    'कहाँ': 'where',
+    'कब': 'when',
+    'कैसे': 'how',
+    'क्यों': 'why',
+    'क्या': 'what',
+    'कौन': 'who'
+}
+
+LEGACY_PHONETIC_MAPPING = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ee', 'उ': 'u', 'ऊ': 'oo',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'च': 'ch', 'छ': 'chh',
+    'ज': 'j', 'झ': 'jh', 'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh',
+    'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y',
+    'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh', 'स': 's',
+    'ह': 'h', 'ड़': 'r', 'ढ़': 'rh'
+}
+
+
+def legacy_normalize(result: str) -> str:
+    """The old normalize_transcript, minus its prints so only the string work is timed"""
+    if any(char in result for char in LEGACY_DEVANAGARI_CHARS):
+        for hindi, english in LEGACY_HINDI_TO_ENGLISH.items():
+            result = result.replace(hindi, english)
+        if any(char in result for char in LEGACY_DEVANAGARI_CHARS):
+            for hindi_char, english_char in LEGACY_PHONETIC_MAPPING.items():
+                result = result.replace(hindi_char, english_char)
+            result = result.replace('़', '').replace('्', '').replace('ं', 'n').replace('ः', 'h')
+    if any(char in result for char in LEGACY_DEVANAGARI_CHARS):
+        if 'प्राइम मिनिस्टर' in result or 'prime minister' in result.lower():
+            result = "Prime Minister of India"
+        elif 'who' in result.lower() or 'कौन' in result:
+            result = "Who is"
+        else:
+            result = "I heard you speak, but please try speaking in English more clearly"
+    return result
+
+
+CORPUS = {
+    'english': ["What is the weather like today?", "Tell me a joke about computers.", "Who is Elon Musk?"],
+    'phrases': ["व्हू इज प्राइम मिनिस्टर ऑफ इंडिया", "इलोन मस्क कौन है", "भारत का प्रधानमंत्री कौन है"],
+    'phonetic': ["नमस्ते आप कैसे हैं", "मुझे क्रिकेट के बारे में बताइए", "आज दिल्ली में मौसम कैसा है"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000, help='calls per transcript when timing')
+    args = parser.parse_args()
+
+    print("Old vs new output:")
+    for transcript in [t for texts in CORPUS.values() for t in texts]:
+        old, new = legacy_normalize(transcript), to_english(transcript)
+        print(f"  {'=' if old == new else '≠'} {transcript!r}: {old!r} -> {new!r}")
+
+    print(f"{'corpus':<10} {'old µs':>8} {'new µs':>8} {'speedup':>8}")
+    for name, texts in CORPUS.items():
+        old = min(timeit.repeat(lambda: [legacy_normalize(t) for t in texts], number=args.iterations // 10, repeat=5))
+        new = min(timeit.repeat(lambda: [to_english(t) for t in texts], number=args.iterations // 10, repeat=5))
+        per_call = 1e6 / (args.iterations // 10 * len(texts))
+        print(f"{name:<10} {old * per_call:>8.2f} {new * per_call:>8.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
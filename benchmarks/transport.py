@@ -0,0 +1,83 @@
+"""
+Transport Benchmark
+Compares bytes on the wire and server CPU per turn for the base64 JSON and binary transports
+
+    python -m benchmarks.transport --turns 20 --seconds 5
+"""
+
+import argparse
+import base64
+import json
+import subprocess
+import sys
+import urllib.request
+import psutil
+from benchmarks.load_test import free_port, synthetic_wav, wait_until_up
+from benchmarks.mock_upstreams import MockUpstreams
+
+# name: (path, request content type, Accept)
+TRANSPORTS = {
+    'json': ('/process_audio', 'application/json', 'application/json'),
+    'binary': ('/process_audio', 'audio/wav', 'audio/wav'),
+    'ndjson-stream': ('/process_audio_stream', 'application/json', 'application/x-ndjson'),
+    'binary-stream': ('/process_audio_stream', 'audio/wav', 'application/octet-stream'),
+}
+
+
+def run_turn(base_url: str, transport: str, audio: bytes) -> tuple:
+    """Play one turn and return (request body bytes, response body bytes)"""
+    path, content_type, accept = TRANSPORTS[transport]
+    if content_type == 'application/json':
+        body = json.dumps({'audio': base64.b64encode(audio).decode('ascii')}).encode()
+    else:
+        body = audio
+    request = urllib.request.Request(
+        f"{base_url}{path}", data=body, headers={'Content-Type': content_type, 'Accept': accept}
+    )
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return len(body), len(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=20, help='turns per transport')
+    parser.add_argument('--seconds', type=float, default=5.0, help='length of each uploaded recording')
+    parser.add_argument('--sample-rate', type=int, default=44100, help='rate the browser records at')
+    args = parser.parse_args()
+
+    upstreams = MockUpstreams(stt_latency=0.0, llm_first_token=0.0, llm_token_interval=0.0,
+                              tts_first_byte=0.0, tts_chunk_interval=0.0)
+    upstream_url = upstreams.start()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.load_test', '--serve', 'sync', '--port', str(port), '--upstream', upstream_url],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url)
+        process = psutil.Process(server.pid)
+        audio = synthetic_wav(args.seconds, args.sample_rate)
+        print(f"🧪 {args.seconds:.0f}s {args.sample_rate} Hz upload ({len(audio) / 1024:.0f} KB), "
+              f"{args.turns} turns per transport")
+        print(f"{'transport':<14} {'up KB':>7} {'down KB':>8} {'server CPU ms':>14}")
+        for transport in TRANSPORTS:
+            run_turn(base_url, transport, audio)  # warm up
+            cpu_before = process.cpu_times()
+            sent = received = 0
+            for _ in range(args.turns):
+                up, down = run_turn(base_url, transport, audio)
+                sent += up
+                received += down
+            cpu_after = process.cpu_times()
+            cpu = (cpu_after.user + cpu_after.system) - (cpu_before.user + cpu_before.system)
+            print(f"{transport:<14} {sent / args.turns / 1024:>7.0f} {received / args.turns / 1024:>8.0f} "
+                  f"{cpu / args.turns * 1000:>14.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Workers Benchmark
+Measures app_simple turn throughput under gunicorn as the number of worker processes grows
+
+    python -m benchmarks.workers --workers 1,2,4 --clients 32 --turns 5
+
+Each worker count gets a fresh ``gunicorn -c gunicorn.conf.py`` serving
+the chosen SERVING_MODE with SQLite sessions, so a client's turns can land
+on any worker. Startup runs from launch to the first 200 from /ready.
+The mock upstreams run in their own process and their latencies are
+scaled by ``--latency-scale``: the shorter they are, the more a turn is
+bound by the app's own CPU, which is what extra workers add. Throughput
+only scales up to the number of CPUs the machine has. ``--max-requests``
+recycles workers during the run; ``pids`` counts every worker process
+seen, so it exceeds the worker count when that happens.
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import psutil
+from benchmarks.load_test import drive, free_port, synthetic_wav, wait_until_up
+from benchmarks.mock_upstreams import MockUpstreams
+
+
+def serve_upstreams(port: int, scale: float):
+    upstreams = MockUpstreams(port=port, stt_latency=0.3 * scale, llm_first_token=0.3 * scale,
+                              llm_token_interval=0.02 * scale, tts_first_byte=0.2 * scale,
+                              tts_chunk_interval=0.02 * scale)
+    upstreams.server.serve_forever()
+
+
+class WorkerSampler:
+    """Polls the gunicorn master's children in the background and keeps every pid seen"""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.pids = set()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self.pids.update(child.pid for child in self.process.children())
+            except psutil.Error:
+                return
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_workers(workers: int, mode: str, clients: int, turns: int, max_requests: int, upstream_url: str) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, **{
+            'ELEVENLABS_API_KEY': 'mock-key',
+            'OPENAI_API_KEY': 'sk-mock-key',
+            'ELEVENLABS_BASE_URL': upstream_url,
+            'OPENAI_BASE_URL': f"{upstream_url}/v1",
+            'SERVING_MODE': mode,
+            'SESSION_BACKEND': 'sqlite',
+            'SESSION_DB_PATH': os.path.join(directory, 'sessions.db'),
+            'ENABLE_CONVERSATION_LOGGING': 'false',
+            'TTS_CACHE_PREWARM_FILE': '',
+            'WEB_CONCURRENCY': str(workers),
+            'WEB_MAX_REQUESTS': str(max_requests),
+            'PORT': str(port),
+        })
+        started_at = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app_simple:app', '-c', 'gunicorn.conf.py'],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(base_url, timeout=60, path='/ready')
+            startup = time.perf_counter() - started_at
+            audio = synthetic_wav()
+            drive(base_url, workers, 1, audio)  # let every worker take a turn before timing
+            with WorkerSampler(server.pid) as sampler:
+                result = drive(base_url, clients, turns, audio)
+            return dict(result, workers=workers, mode=mode, startup=startup, pids=len(sampler.pids))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--modes', default='async')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--turns', type=int, default=5, help='turns per client')
+    parser.add_argument('--latency-scale', type=float, default=0.25, help='multiplier on the mock upstream latencies')
+    parser.add_argument('--max-requests', type=int, default=0, help='recycle workers after this many requests (0: never)')
+    args = parser.parse_args()
+
+    port = free_port()
+    upstreams = multiprocessing.Process(target=serve_upstreams, args=(port, args.latency_scale), daemon=True)
+    upstreams.start()
+    upstream_url = f"http://127.0.0.1:{port}"
+    print(f"🧪 Mock upstreams on {upstream_url} ({os.cpu_count()} CPUs)")
+    print(f"{'mode':<6} {'workers':>7} {'startup s':>9} {'turns':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} "
+          f"{'429s':>5} {'errors':>6} {'pids':>5}")
+    try:
+        for mode in args.modes.split(','):
+            for workers in (int(count) for count in args.workers.split(',')):
+                result = run_workers(workers, mode, args.clients, args.turns, args.max_requests, upstream_url)
+                print(f"{result['mode']:<6} {result['workers']:>7} {result['startup']:>9.2f} {result['turns']:>6} "
+                      f"{result['turns_per_sec']:>8.2f} {result['p50']:>7.2f} {result['p95']:>7.2f} "
+                      f"{result['rejected']:>5} {result['errors']:>6} {result['pids']:>5}")
+    finally:
+        upstreams.terminate()
+
+
+if __name__ == "__main__":
+    main()
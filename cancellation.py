@@ -0,0 +1,123 @@
+"""
+Cancellation Module
+Cooperative cancellation of in-flight turns, so superseded work stops calling upstream APIs
+"""
+
+import threading
+from typing import Callable, Dict
+
+
+class Cancelled(Exception):
+    """Raised by work that stopped because its CancelToken was cancelled"""
+
+
+class CancelToken:
+    """Asks one turn's STT, LLM and TTS work to stop.
+
+    Work checks the token between units (a streamed chunk, a sentence) and
+    raises ``Cancelled``; blocking waits register ``on_cancel`` callbacks so
+    they wake up straight away. ``note`` counts the work a cancellation saved
+    in the metrics of the TurnRegistry that issued the token.
+    """
+
+    def __init__(self, registry: "TurnRegistry" = None):
+        self.registry = registry
+        self.reason = None
+        self.event = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.reason = reason
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Cancel callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Call ``callback`` once the token is cancelled (now, if it already is)"""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self.event.is_set():
+            raise Cancelled(self.reason)
+
+    def note(self, saved: str, count: int = 1):
+        if self.registry is not None and count:
+            self.registry.add(saved, count)
+
+
+class TurnRegistry:
+    """The in-flight turn of each session; starting a new one cancels the old one.
+
+    Metrics count cancelled turns by reason and the upstream work that was
+    saved: STT calls abandoned, LLM calls discarded or streams hung up on, and
+    TTS streams closed or sentences never synthesized.
+    """
+
+    SAVED = ('stt_abandoned', 'llm_calls_discarded', 'llm_streams_closed', 'tts_streams_closed', 'tts_sentences_skipped')
+
+    def __init__(self):
+        self.active: Dict[str, CancelToken] = {}
+        self.lock = threading.Lock()
+        self.metrics = {'turns_started': 0, 'turns_cancelled': 0, **{saved: 0 for saved in self.SAVED}}
+        self.reasons = {}
+
+    def begin(self, session_id: str, reason: str = "superseded") -> CancelToken:
+        """Token for a new turn of ``session_id``, cancelling the turn it replaces"""
+        token = CancelToken(self)
+        with self.lock:
+            previous = self.active.get(session_id)
+            self.active[session_id] = token
+            self.metrics['turns_started'] += 1
+        if previous is not None:
+            self._cancel(previous, reason)
+        return token
+
+    def cancel(self, session_id: str, reason: str) -> bool:
+        """Cancel the in-flight turn of ``session_id``, if there is one"""
+        with self.lock:
+            token = self.active.pop(session_id, None)
+        if token is None:
+            return False
+        self._cancel(token, reason)
+        return True
+
+    def finish(self, session_id: str, token: CancelToken, reason: str = None):
+        """Forget a turn that ended; with ``reason`` it ended early, so cancel whatever work it left running"""
+        with self.lock:
+            if self.active.get(session_id) is token:
+                del self.active[session_id]
+        if reason is not None:
+            self._cancel(token, reason)
+
+    def add(self, saved: str, count: int = 1):
+        with self.lock:
+            self.metrics[saved] = self.metrics.get(saved, 0) + count
+
+    def _cancel(self, token: CancelToken, reason: str):
+        if token.cancelled:
+            return
+        with self.lock:
+            self.metrics['turns_cancelled'] += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        print(f"🛑 Cancelling in-flight turn ({reason})")
+        token.cancel(reason)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.metrics, 'in_flight': len(self.active), 'reasons': dict(self.reasons)}
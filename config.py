@@ -19,6 +19,10 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
+    # Upstream API overrides (leave empty for the public endpoints)
+    ELEVENLABS_BASE_URL: str = os.getenv("ELEVENLABS_BASE_URL", "")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    
     # Conversational AI Settings
     AGENT_ID: str = os.getenv("AGENT_ID", "")
     VOICE_ID: str = os.getenv("VOICE_ID", "")
@@ -27,14 +31,111 @@ class Config:
     SAMPLE_RATE: int = int(os.getenv("SAMPLE_RATE", "44100"))
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1024"))
     CHANNELS: int = int(os.getenv("CHANNELS", "1"))
+    MAX_UTTERANCE_SECONDS: float = float(os.getenv("MAX_UTTERANCE_SECONDS", "30"))
+    UTTERANCE_QUEUE_SIZE: int = int(os.getenv("UTTERANCE_QUEUE_SIZE", "2"))
+    UTTERANCE_POLICY: str = os.getenv("UTTERANCE_POLICY", "queue")  # queue, drop or barge-in
+    CAPTURE_AT_STT_RATE: bool = os.getenv("CAPTURE_AT_STT_RATE", "true").lower() == "true"
+    
+    # Playback Settings
+    PLAYBACK_DEVICE: str = os.getenv("PLAYBACK_DEVICE", "pyaudio")  # pyaudio, file or null
+    PLAYBACK_FILE: str = os.getenv("PLAYBACK_FILE", "playback.wav")
+    PLAYBACK_JITTER_BUFFER_MS: int = int(os.getenv("PLAYBACK_JITTER_BUFFER_MS", "120"))
+    PLAYBACK_PERIOD_MS: int = int(os.getenv("PLAYBACK_PERIOD_MS", "20"))
+    
+    # Voice Activity Detection Settings
+    VAD_ENGINE: str = os.getenv("VAD_ENGINE", "spectral")  # spectral or energy
+    VAD_FRAME_MS: int = int(os.getenv("VAD_FRAME_MS", "20"))  # 10-30
+    VAD_MARGIN_DB: float = float(os.getenv("VAD_MARGIN_DB", "9"))  # speech level above the noise floor
+    VAD_MIN_SPEECH_MS: int = int(os.getenv("VAD_MIN_SPEECH_MS", "60"))
+    VAD_PRE_ROLL_MS: int = int(os.getenv("VAD_PRE_ROLL_MS", "300"))
+    VAD_HANGOVER_MS: int = int(os.getenv("VAD_HANGOVER_MS", "500"))
+    
+    # Turn Pipeline Settings
+    PIPELINE_TTS_WORKERS: int = int(os.getenv("PIPELINE_TTS_WORKERS", "4"))
+    PIPELINE_MIN_SENTENCE_CHARS: int = int(os.getenv("PIPELINE_MIN_SENTENCE_CHARS", "20"))
+    TTS_STREAM_CHUNK_BYTES: int = int(os.getenv("TTS_STREAM_CHUNK_BYTES", "4096"))
+    TTS_SAMPLE_RATE: int = int(os.getenv("TTS_SAMPLE_RATE", "22050"))  # for clients that don't ask for a rate
+    RESPONSE_DELTA_BATCH_MS: int = int(os.getenv("RESPONSE_DELTA_BATCH_MS", "50"))  # ai_response_delta window
+    
+    # TTS Cache Settings
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    TTS_CACHE_MAX_TEXT_CHARS: int = int(os.getenv("TTS_CACHE_MAX_TEXT_CHARS", "300"))
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "")  # empty keeps the cache in memory only
+    TTS_CACHE_DISK_MAX_BYTES: int = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+    TTS_CACHE_PREWARM_FILE: str = os.getenv("TTS_CACHE_PREWARM_FILE", "")  # one phrase per line
+    
+    # Response Cache Settings
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    RESPONSE_CACHE_CONTEXT_MESSAGES: int = int(os.getenv("RESPONSE_CACHE_CONTEXT_MESSAGES", "2"))
+    RESPONSE_CACHE_MAX_PROMPT_CHARS: int = int(os.getenv("RESPONSE_CACHE_MAX_PROMPT_CHARS", "200"))
+    RESPONSE_CACHE_SEMANTIC: bool = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+    
+    # STT Strategy Settings
+    STT_OPTIONS: str = os.getenv("STT_OPTIONS", "scribe_v1:en,scribe_v1,scribe_v1_experimental:en")  # model[:language],...
+    STT_MAX_PARALLEL: int = int(os.getenv("STT_MAX_PARALLEL", "2"))  # 1 disables hedging
+    STT_HEDGE_PERCENTILE: float = float(os.getenv("STT_HEDGE_PERCENTILE", "0.9"))
+    STT_HEDGE_DELAY_SECONDS: float = float(os.getenv("STT_HEDGE_DELAY_SECONDS", "2.0"))
+    STT_FAILURE_COOLDOWN_SECONDS: float = float(os.getenv("STT_FAILURE_COOLDOWN_SECONDS", "30"))
+    
+    # Streaming STT Settings (audio_frame over Socket.IO)
+    STREAMING_SEGMENT_PAUSE_MS: int = int(os.getenv("STREAMING_SEGMENT_PAUSE_MS", "250"))  # pause that closes a segment
+    STREAMING_MAX_SEGMENT_SECONDS: float = float(os.getenv("STREAMING_MAX_SEGMENT_SECONDS", "15"))
+    STREAMING_STT_WORKERS: int = int(os.getenv("STREAMING_STT_WORKERS", "8"))
+    
+    # Serving Settings
+    SERVING_MODE: str = os.getenv("SERVING_MODE", "sync")  # sync or async
+    ASYNC_MAX_CONCURRENT_TURNS: int = int(os.getenv("ASYNC_MAX_CONCURRENT_TURNS", "8"))
+    ASYNC_MAX_QUEUED_TURNS: int = int(os.getenv("ASYNC_MAX_QUEUED_TURNS", "16"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # gunicorn workers; 0 is one per CPU
+    WEB_THREADS: int = int(os.getenv("WEB_THREADS", "32"))
+    WEB_MAX_REQUESTS: int = int(os.getenv("WEB_MAX_REQUESTS", "1000"))  # recycle a worker after this many; 0 never
+    READY_TIMEOUT_SECONDS: float = float(os.getenv("READY_TIMEOUT_SECONDS", "10"))  # longest a worker warms up
+    
+    # Upstream HTTP Settings (one pool shared by the ElevenLabs and OpenAI clients)
+    HTTP_POOL_MAX_CONNECTIONS: int = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "32"))
+    HTTP_POOL_MAX_KEEPALIVE: int = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "16"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))  # idle time before a connection is closed
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"  # needs httpx[http2]
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP_WRITE_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_WRITE_TIMEOUT_SECONDS", "10"))
+    HTTP_POOL_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "10"))  # wait for a free connection
+    HTTP_STT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_STT_TIMEOUT_SECONDS", "30"))  # read timeouts per stage
+    HTTP_LLM_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_LLM_TIMEOUT_SECONDS", "30"))
+    HTTP_TTS_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TTS_TIMEOUT_SECONDS", "20"))
+    HTTP_WARMUP_CONNECTIONS: int = int(os.getenv("HTTP_WARMUP_CONNECTIONS", "2"))  # per upstream at startup; 0 disables
+    
+    # Session Settings
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")  # memory or sqlite
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "sessions.db")
+    SESSION_TTL_SECONDS: int = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+    SESSION_MAX_COUNT: int = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+    SESSION_MAX_BYTES: int = int(os.getenv("SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+    
+    # Context Window Settings
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+    CONTEXT_SUMMARY_TOKENS: int = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "250"))
+    CONTEXT_LOW_WATER: float = float(os.getenv("CONTEXT_LOW_WATER", "0.6"))
+    CONTEXT_MIN_RECENT_MESSAGES: int = int(os.getenv("CONTEXT_MIN_RECENT_MESSAGES", "4"))
+    CONTEXT_METRICS_HISTORY: int = int(os.getenv("CONTEXT_METRICS_HISTORY", "500"))
     
     # Voice Cloning Settings
     ENABLE_VOICE_CLONING: bool = os.getenv("ENABLE_VOICE_CLONING", "false").lower() == "true"
     CLONED_VOICE_NAME: str = os.getenv("CLONED_VOICE_NAME", "my_cloned_voice")
     
+    # Metrics Settings
+    METRICS_RECENT_SPANS: int = int(os.getenv("METRICS_RECENT_SPANS", "2000"))  # spans kept with their session id
+    
     # Logging Settings
     ENABLE_CONVERSATION_LOGGING: bool = os.getenv("ENABLE_CONVERSATION_LOGGING", "true").lower() == "true"
-    LOG_FILE_PATH: str = os.getenv("LOG_FILE_PATH", "conversation_log.txt")
+    LOG_FILE_PATH: str = os.getenv("LOG_FILE_PATH", "conversation_log.jsonl")
+    LOG_FLUSH_BATCH: int = int(os.getenv("LOG_FLUSH_BATCH", "64"))  # records per write
+    LOG_FLUSH_INTERVAL_MS: int = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "1000"))  # longest a record waits
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # rotate past this; 0 never
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # gzipped rotations kept
     
     @classmethod
     def validate(cls) -> bool:
@@ -63,6 +164,9 @@ class Config:
         print(f"  Sample Rate: {cls.SAMPLE_RATE} Hz")
         print(f"  Chunk Size: {cls.CHUNK_SIZE}")
         print(f"  Channels: {cls.CHANNELS}")
+        print(f"  Max Utterance: {cls.MAX_UTTERANCE_SECONDS:.0f}s")
+        print(f"  Overlapping Utterances: {cls.UTTERANCE_POLICY}")
+        print(f"  VAD: {cls.VAD_ENGINE} (hangover {cls.VAD_HANGOVER_MS}ms, pre-roll {cls.VAD_PRE_ROLL_MS}ms)")
         print(f"  Voice Cloning: {'Enabled' if cls.ENABLE_VOICE_CLONING else 'Disabled'}")
         print(f"  Conversation Logging: {'Enabled' if cls.ENABLE_CONVERSATION_LOGGING else 'Disabled'}")
         if cls.AGENT_ID:
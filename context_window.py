@@ -0,0 +1,173 @@
+"""
+Context Window Module
+Keeps LLM prompts within a token budget by rolling old turns into a summary
+"""
+
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+from config import Config
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken is optional; fall back to a local estimate (~4 characters per token)
+    _encoding = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Per-message framing tokens added by the chat format
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate, without tiktoken) the tokens in ``text``"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum((len(token) + 3) // 4 for token in _TOKEN_PATTERN.findall(text))
+
+
+def count_message_tokens(messages: List[dict]) -> int:
+    return sum(count_tokens(message["content"]) + _MESSAGE_OVERHEAD_TOKENS for message in messages) + 2
+
+
+class ContextWindow:
+    """Builds token-budgeted prompts from a session's history and summary.
+
+    Recent turns are kept verbatim. Once they outgrow the budget, the oldest
+    turns are folded into ``session.summary`` and dropped from the history,
+    sliding the window down to a low-water mark so the summary is only
+    recomputed every few turns rather than on every request. The summary is
+    written on a background thread, one at a time, and folded into the
+    session when its next prompt is built, so no turn waits for it.
+    """
+
+    def __init__(self, summarizer: Callable[[str, List[Tuple[str, str]]], str],
+                 budget_tokens: int = None, summary_tokens: int = None,
+                 low_water: float = None, min_recent_messages: int = None):
+        self.summarizer = summarizer
+        self.budget_tokens = budget_tokens or Config.CONTEXT_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens or Config.CONTEXT_SUMMARY_TOKENS
+        self.low_water = low_water or Config.CONTEXT_LOW_WATER
+        self.min_recent_messages = Config.CONTEXT_MIN_RECENT_MESSAGES if min_recent_messages is None else min_recent_messages
+        self.turns = deque(maxlen=Config.CONTEXT_METRICS_HISTORY)
+        self.summaries = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+        # session id -> (summary it extends, messages it folds, future of the new summary)
+        self.pending = OrderedDict()
+
+    @property
+    def verbatim_budget(self) -> int:
+        return max(self.budget_tokens - self.summary_tokens, 0)
+
+    def build_messages(self, prompt: str, system_prompt: str, session) -> List[dict]:
+        """Assemble the prompt for ``session`` and record its size"""
+        self.apply_summary(session)
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if session.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {session.summary}"})
+
+        # Normally compaction keeps history under budget already; if it couldn't
+        # (summarizer failure, one huge message) drop the oldest turns from the prompt
+        history = session.history
+        start = 0
+        tokens = self._history_tokens(history)
+        while tokens > self.verbatim_budget and len(history) - start > self.min_recent_messages:
+            tokens -= count_tokens(history[start][1]) + _MESSAGE_OVERHEAD_TOKENS
+            start += 1
+
+        for role, content in history[start:]:
+            messages.append({"role": role, "content": content})
+        messages.append({"role": "user", "content": prompt})
+
+        prompt_tokens = count_message_tokens(messages)
+        with self.lock:
+            self.turns.append({
+                'session': session.session_id,
+                'prompt_tokens': prompt_tokens,
+                'history_messages': len(history) - start,
+                'summary_tokens': count_tokens(session.summary),
+            })
+        return messages
+
+    def compact(self, session) -> bool:
+        """Start folding the oldest turns into the session summary if history is over budget.
+
+        Returns straight away; the summary is applied by ``apply_summary``.
+        """
+        history = session.history
+        if self._history_tokens(history) <= self.verbatim_budget:
+            return False
+
+        target = int(self.verbatim_budget * self.low_water)
+        tokens = self._history_tokens(history)
+        cut = 0
+        # Collapse whole user/assistant exchanges so the window never starts mid-turn
+        while tokens > target and len(history) - cut - 2 >= self.min_recent_messages:
+            tokens -= sum(count_tokens(content) + _MESSAGE_OVERHEAD_TOKENS for _, content in history[cut:cut + 2])
+            cut += 2
+        if cut == 0:
+            return False
+
+        with self.lock:
+            if session.session_id in self.pending:
+                return False
+            folded = list(history[:cut])
+            self.pending[session.session_id] = (session.summary, folded,
+                                                self.executor.submit(self.summarizer, session.summary, folded))
+            while len(self.pending) > Config.SESSION_MAX_COUNT:
+                self.pending.popitem(last=False)
+        return True
+
+    def apply_summary(self, session) -> bool:
+        """Fold a finished background summary into ``session``.
+
+        Done on the turn's own thread, into whichever copy of the session the
+        turn loaded, so it is saved with the turn. Skipped if the
+        conversation was reset or changed underneath it.
+        """
+        with self.lock:
+            pending = self.pending.get(session.session_id)
+            if pending is None or not pending[2].done():
+                return False
+            del self.pending[session.session_id]
+        previous, folded, future = pending
+        try:
+            summary = future.result()
+        except Exception as e:
+            print(f"⚠️ Conversation summary failed, keeping full history: {e}")
+            return False
+        if session.summary != previous or session.history[:len(folded)] != folded:
+            return False
+
+        session.summary = summary
+        del session.history[:len(folded)]
+        with self.lock:
+            self.summaries += 1
+        print(f"🧾 Summarized {len(folded)} older messages into {count_tokens(summary)} tokens")
+        return True
+
+    def stats(self) -> dict:
+        with self.lock:
+            prompt_tokens = [turn['prompt_tokens'] for turn in self.turns]
+            return {
+                'budget_tokens': self.budget_tokens,
+                'turns': len(prompt_tokens),
+                'summaries': self.summaries,
+                'last_prompt_tokens': prompt_tokens[-1] if prompt_tokens else 0,
+                'avg_prompt_tokens': sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else 0,
+                'max_prompt_tokens': max(prompt_tokens, default=0),
+                'recent_prompt_tokens': prompt_tokens[-20:],
+            }
+
+    @staticmethod
+    def _history_tokens(history) -> int:
+        return sum(count_tokens(content) + _MESSAGE_OVERHEAD_TOKENS for _, content in history)
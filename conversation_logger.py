@@ -1,22 +1,190 @@
 """
 Conversation Logger Module
-Logs the conversation to a file if enabled in config
+Logs the conversation as JSON lines, written in batches by a background thread
 """
 
+import atexit
 import datetime
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
 from config import Config
 
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): fine for one process, but rotation can race other writers
+    fcntl = None
+
+
 class ConversationLogger:
-    def __init__(self):
+    """Queues conversation records and appends them to ``LOG_FILE_PATH`` off the request path.
+
+    ``log`` only puts a record on an in-memory queue. A writer thread
+    appends whatever has queued up as one write, once ``LOG_FLUSH_BATCH``
+    records are waiting or ``LOG_FLUSH_INTERVAL_MS`` after the first of them,
+    so workers sharing the file append whole lines. When the file passes
+    ``LOG_MAX_BYTES`` it is gzipped to ``<path>.1.gz`` (older ones shift up,
+    ``LOG_BACKUP_COUNT`` are kept). Writes, the rename that starts a
+    rotation and the archiving hold an exclusive lock on the file, and a
+    writer checks the file it locked is still the one at the path, so no
+    worker appends to a file that is being archived and two workers never
+    archive at once. Queued records are flushed at exit.
+
+    Each line is a JSON object::
+
+        {"ts": "...", "pid": 123, "session": "...", "speaker": "AI", "text": "...", "timings": {...}}
+
+    A reply cut short by barge-in or an error is logged with the text
+    generated so far and ``"interrupted": true``.
+    """
+
+    def __init__(self, log_file: str = None):
         self.enabled = Config.ENABLE_CONVERSATION_LOGGING
-        self.log_file = Config.LOG_FILE_PATH
+        self.log_file = log_file or Config.LOG_FILE_PATH
+        self.batch_size = max(1, Config.LOG_FLUSH_BATCH)
+        self.flush_interval = Config.LOG_FLUSH_INTERVAL_MS / 1000
+        self.max_bytes = Config.LOG_MAX_BYTES
+        self.backup_count = Config.LOG_BACKUP_COUNT
+        self.records = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.counters = {'logged': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'rotations': 0, 'write_errors': 0}
+        self.lock = threading.Lock()
+        self.writer = None
         if self.enabled:
-            with open(self.log_file, 'a') as f:
-                f.write(f"\n--- New Conversation Session: {datetime.datetime.now()} ---\n")
+            self.writer = threading.Thread(target=self._write_loop, name="conversation-log", daemon=True)
+            self.writer.start()
+            atexit.register(self.close)
+            self.log('System', 'New conversation session')
 
-    def log(self, speaker: str, text: str):
+    def log(self, speaker: str, text: str, session_id: str = None, timings: dict = None, interrupted: bool = None):
+        """Queue one record; never blocks (records are dropped if the writer falls behind)"""
         if not self.enabled:
             return
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] {speaker}: {text}\n") 
\ No newline at end of file
+        record = {'ts': time.time(), 'session': session_id, 'speaker': speaker, 'text': text, 'timings': timings,
+                  'interrupted': interrupted}
+        try:
+            self.records.put_nowait(record)
+            self._count('logged')
+        except queue.Full:
+            self._count('dropped')
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything logged so far is on disk"""
+        if self.writer is None or not self.writer.is_alive():
+            return True
+        written = threading.Event()
+        self.records.put(written)
+        return written.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Flush and stop the writer thread"""
+        if self.writer is None or not self.writer.is_alive():
+            return
+        self.records.put(None)
+        self.writer.join(timeout)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+        return {**counters, 'enabled': self.enabled, 'queued': self.records.qsize()}
+
+    def _count(self, counter: str, count: int = 1):
+        with self.lock:
+            self.counters[counter] += count
+
+    def _write_loop(self):
+        batch = []
+        waiters = []
+        deadline = None
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                item = self.records.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # interval elapsed
+            stopping = item is None
+            if isinstance(item, dict):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            if batch and (stopping or waiters or item is False or len(batch) >= self.batch_size):
+                self._write(batch)
+                batch = []
+                deadline = None
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+            if stopping:
+                return
+
+    def _write(self, batch: list):
+        lines = []
+        for record in batch:
+            record['ts'] = datetime.datetime.fromtimestamp(record['ts']).isoformat(timespec='milliseconds')
+            lines.append(json.dumps({'pid': os.getpid(), **{k: v for k, v in record.items() if v is not None}},
+                                    ensure_ascii=False))
+        data = ("\n".join(lines) + "\n").encode('utf-8')
+        try:
+            fd = self._open_current()
+            try:
+                # One O_APPEND write per batch, so other processes' lines never land inside ours
+                os.write(fd, data)
+                full = self.max_bytes and os.fstat(fd).st_size >= self.max_bytes
+                rotating = self._detach() if full else None
+            finally:
+                os.close(fd)  # releases the lock
+            self._count('written', len(batch))
+            self._count('batches')
+            if rotating:
+                self._archive(rotating)
+        except OSError as e:
+            self._count('write_errors')
+            print(f"⚠️ Could not write conversation log: {e}")
+
+    def _open_current(self) -> int:
+        """Open the log for appending, locked, and make sure it is still the file at ``log_file``"""
+        while True:
+            fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl is None:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.log_file).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # Another worker rotated it between our open and lock; append to the new file instead
+            os.close(fd)
+
+    def _detach(self):
+        """Move the full log aside (under its lock) so writers start a fresh file; returns its new path"""
+        rotating = f"{self.log_file}.{os.getpid()}.rotating"
+        try:
+            os.rename(self.log_file, rotating)
+        except FileNotFoundError:
+            return None  # another worker rotated it first (no flock)
+        return rotating
+
+    def _archive(self, rotating: str):
+        """Gzip a detached log to <path>.1.gz, shifting older archives up"""
+        # Under the current log's lock, so two workers rotating at once don't both write <path>.1.gz
+        fd = self._open_current()
+        try:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.log_file}.{index}.gz"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.log_file}.{index + 1}.gz")
+            if self.backup_count > 0:
+                with open(rotating, 'rb') as source, gzip.open(f"{self.log_file}.1.gz", 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            os.remove(rotating)
+        finally:
+            os.close(fd)
+        self._count('rotations')
+        print(f"🗜️ Rotated conversation log {self.log_file}")
@@ -4,29 +4,70 @@ Handles STT, TTS, and voice management using the official ElevenLabs SDK
 """
 
 from elevenlabs import client, voices, Voice
+from elevenlabs.environment import ElevenLabsEnvironment
 from elevenlabs.text_to_speech import client as tts_client
 from elevenlabs.speech_to_text import client as stt_client
+from audio_format import pcm_chunks, resample_stream, stt_upload, tts_output_format
+from cancellation import CancelToken, Cancelled
 from config import Config
+from http_transport import http_transport
+from metrics import metrics
+from stt_strategy import HedgedSTT
+from transliteration import contains_devanagari, to_english
+from tts_cache import cache_key, create_tts_cache, prewarm_phrases
+from typing import Callable, Iterator, List
+import time
 import traceback
-import gc
+
+
+def elevenlabs_environment() -> ElevenLabsEnvironment:
+    """API environment, overridable with ELEVENLABS_BASE_URL (e.g. for local mock upstreams)"""
+    if Config.ELEVENLABS_BASE_URL:
+        base = Config.ELEVENLABS_BASE_URL.rstrip('/')
+        return ElevenLabsEnvironment(base=base, wss=base.replace('http', 'ws', 1))
+    return ElevenLabsEnvironment.PRODUCTION
+
+
+def normalize_transcript(result: str) -> str:
+    """Convert a transcript that came back in Devanagari script into English text"""
+    if not contains_devanagari(result):
+        return result
+    converted = to_english(result)
+    print(f"⚠️ Result was in Hindi script, converted to: {converted}")
+    return converted
+
 
 class ElevenLabsClient:
+    # Raw 16-bit mono PCM keeps the reply streamable without a container. SAMPLE_RATE is what
+    # callers get unless they ask for their own rate; OUTPUT_FORMAT is the TTS format closest to it
+    SAMPLE_RATE = Config.TTS_SAMPLE_RATE
+    OUTPUT_FORMAT = tts_output_format(SAMPLE_RATE)[0]
+    MODEL_ID = "eleven_turbo_v2"
+    DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel
+
     def __init__(self):
-        self.voice_id = Config.VOICE_ID or "21m00Tcm4TlvDq8ikWAM"  # Default voice ID (Rachel)
+        self.voice_id = Config.VOICE_ID or self.DEFAULT_VOICE_ID
         self.agent_id = Config.AGENT_ID
         self.voice = None
+        self.stt_strategy = HedgedSTT()
+        self.tts_cache = create_tts_cache()
         print(f"🔧 Initializing ElevenLabs client with voice ID: {self.voice_id}")
         print(f"🔑 API Key configured: {'Yes' if Config.ELEVENLABS_API_KEY else 'No'}")
         if Config.ELEVENLABS_API_KEY:
             print(f"🔑 API Key starts with: {Config.ELEVENLABS_API_KEY[:10]}...")
         
         try:
-            self.client = client.ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
+            self.client = client.ElevenLabs(
+                api_key=Config.ELEVENLABS_API_KEY,
+                environment=elevenlabs_environment(),
+                httpx_client=http_transport.client
+            )
             print("✅ ElevenLabs client initialized successfully")
         except Exception as e:
             print(f"❌ Failed to initialize ElevenLabs client: {e}")
             raise
         
+        http_transport.warm_up(elevenlabs_environment().base)
         self._init_voice()
 
     def _init_voice(self):
@@ -49,229 +90,137 @@ class ElevenLabsClient:
         print(f"[INFO] Voice cloning requested for: {name}")
         return type('Voice', (), {'voice_id': "21m00Tcm4TlvDq8ikWAM"})()
 
-    def tts(self, text: str) -> bytes:
+    def tts(self, text: str, cancel: CancelToken = None, sample_rate: int = None) -> bytes:
+        """Synthesize ``text`` and return the whole reply as PCM bytes"""
+        audio_bytes = b"".join(self.tts_stream(text, cancel=cancel, sample_rate=sample_rate))
+        print(f"🎵 Generated {len(audio_bytes)} bytes of PCM audio")
+        return audio_bytes
+
+    def tts_cache_key(self, text: str, output_format: str = None) -> str:
+        return cache_key(self.voice.voice_id, self.MODEL_ID, output_format or self.OUTPUT_FORMAT, text)
+
+    def prewarm_tts_cache(self, phrases: List[str] = (), splitter: Callable = None):
+        """Synthesize common phrases ahead of time so their first use is a cache hit.
+
+        ``phrases`` and ``splitter`` go to ``prewarm_phrases``. Only done when the
+        audio outlives the process (TTS_CACHE_DIR) or phrases were asked for
+        (TTS_CACHE_PREWARM_FILE); a memory-only cache would pay for the same
+        synthesis again on every start and worker recycle.
+        """
+        if self.tts_cache and (self.tts_cache.disk_dir or Config.TTS_CACHE_PREWARM_FILE):
+            self.tts_cache.prewarm(
+                prewarm_phrases(phrases, splitter),
+                # Cached as TTS sent it; resampling happens on the way out
+                lambda text: b"".join(self._tts_stream(text, self.OUTPUT_FORMAT, use_cache=False)),
+                self.tts_cache_key
+            )
+
+    def tts_stream(self, text: str, min_chunk_bytes: int = None, use_cache: bool = True,
+                   cancel: CancelToken = None, sample_rate: int = None) -> Iterator[bytes]:
+        """Synthesize ``text`` and yield PCM chunks as they arrive from the API.
+
+        Chunks are coalesced up to ``min_chunk_bytes`` so consumers aren't flooded
+        with tiny network reads, and always hold whole 16-bit samples. Short
+        phrases are served from, and saved to, the TTS cache. If ``cancel``
+        fires, the upstream stream is closed and ``Cancelled`` raised.
+
+        The audio is at ``sample_rate`` (default SAMPLE_RATE): TTS streams the
+        nearest format it offers, resampled on the way through if it differs.
+        """
+        sample_rate = sample_rate or self.SAMPLE_RATE
+        output_format, tts_rate = tts_output_format(sample_rate)
+        return resample_stream(self._tts_stream(text, output_format, min_chunk_bytes, use_cache, cancel),
+                               tts_rate, sample_rate)
+
+    def _tts_stream(self, text: str, output_format: str, min_chunk_bytes: int = None, use_cache: bool = True,
+                    cancel: CancelToken = None) -> Iterator[bytes]:
         if not self.voice:
             raise ValueError("No voice selected")
+        if cancel is not None:
+            cancel.raise_if_cancelled()
         
+        min_chunk_bytes = Config.TTS_STREAM_CHUNK_BYTES if min_chunk_bytes is None else min_chunk_bytes
+        key = None
+        if use_cache and self.tts_cache and self.tts_cache.cacheable(text):
+            key = self.tts_cache_key(text, output_format)
+            cached = self.tts_cache.get(key)
+            if cached is not None:
+                print(f"🗃️ TTS cache hit for: '{text[:50]}'")
+                yield from pcm_chunks(cached, min_chunk_bytes)
+                return
+        
+        response = None
         try:
             print(f"🎵 Starting TTS for text: '{text[:50]}...'")
-            # Use higher quality PCM format with correct sample rate
-            response = self.client.text_to_speech.convert(
+            started_at = time.perf_counter()
+            response = self.client.text_to_speech.stream(
                 voice_id=self.voice.voice_id,
                 text=text,
-                model_id="eleven_turbo_v2",
-                output_format="pcm_22050"  # 22.05kHz PCM format
+                model_id=self.MODEL_ID,
+                output_format=output_format,
+                request_options={'timeout_in_seconds': http_transport.timeout('tts')}
             )
             
-            # Convert generator to bytes
-            audio_bytes = b""
+            pending = bytearray()
+            synthesized = [] if key else None
+            first_byte_at = None
             for chunk in response:
-                audio_bytes += chunk
-                # Clear chunk from memory immediately
-                del chunk
+                if cancel is not None and cancel.cancelled:
+                    cancel.note('tts_streams_closed')
+                    raise Cancelled(cancel.reason)
+                if first_byte_at is None:
+                    first_byte_at = time.perf_counter()
+                    metrics.observe('tts_first_byte', first_byte_at - started_at)
+                pending += chunk
+                if len(pending) >= min_chunk_bytes:
+                    # Hold back a trailing odd byte so every chunk is sample aligned
+                    cut = len(pending) - (len(pending) % 2)
+                    out = bytes(pending[:cut])
+                    del pending[:cut]
+                    if key:
+                        synthesized.append(out)
+                    yield out
+            
+            if pending:
+                if key:
+                    synthesized.append(bytes(pending))
+                yield bytes(pending)
+            metrics.observe('tts_total', time.perf_counter() - started_at)
             
-            print(f"🎵 Generated {len(audio_bytes)} bytes of PCM audio")
-            return audio_bytes
+            # Only a stream that ran to the end is cached, never a cancelled one
+            if key:
+                self.tts_cache.put(key, b"".join(synthesized))
             
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"❌ TTS Error: {e}")
             print(f"❌ TTS Error traceback: {traceback.format_exc()}")
             raise
+        finally:
+            # Closing the SDK's generator closes the HTTP response, so an abandoned stream stops downloading
+            if response is not None and hasattr(response, 'close'):
+                response.close()
 
-    def stt(self, audio: bytes) -> str:
-        # Save audio to temporary file for STT
-        import tempfile
-        import os
-        
+    def _convert(self, upload: dict, params: dict) -> str:
+        # Each attempt builds its own request body, so parallel attempts never share a file handle
+        response = self.client.speech_to_text.convert(
+            **upload, **params, request_options={'timeout_in_seconds': http_transport.timeout('stt')}
+        )
+        return response.text
+
+    def stt(self, audio: bytes, cancel: CancelToken = None) -> str:
         try:
             print(f"🔍 Starting STT with {len(audio)} bytes of audio")
+            with metrics.span('decode_audio'):
+                upload = stt_upload(audio)
+            result = self.stt_strategy.transcribe(upload, self._convert, cancel)
+            print(f"📝 STT Result: {result}")
+            return normalize_transcript(result)
             
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                f.write(audio)
-                temp_file = f.name
-            
-            print(f"💾 Created STT temp file: {temp_file}")
-            
-            try:
-                # Open the file and pass it to the API
-                with open(temp_file, 'rb') as audio_file:
-                    # Try multiple approaches for English transcription
-                    try:
-                        print("🔍 Attempting STT with English language specification...")
-                        response = self.client.speech_to_text.convert(
-                            file=audio_file,
-                            model_id="scribe_v1",
-                            language="en",
-                            prompt="This is English speech. Please transcribe in English."
-                        )
-                    except Exception as lang_error:
-                        print(f"⚠️ English language specification failed: {lang_error}")
-                        try:
-                            print("🔍 Trying with English prompt only...")
-                            response = self.client.speech_to_text.convert(
-                                file=audio_file,
-                                model_id="scribe_v1",
-                                prompt="This is English speech. Please transcribe in English."
-                            )
-                        except Exception as prompt_error:
-                            print(f"⚠️ English prompt failed: {prompt_error}")
-                            try:
-                                print("🔍 Trying with different model...")
-                                response = self.client.speech_to_text.convert(
-                                    file=audio_file,
-                                    model_id="whisper-1",
-                                    language="en"
-                                )
-                            except Exception as whisper_error:
-                                print(f"⚠️ Whisper model failed: {whisper_error}")
-                                try:
-                                    print("🔍 Trying with whisper model without language...")
-                                    response = self.client.speech_to_text.convert(
-                                        file=audio_file,
-                                        model_id="whisper-1"
-                                    )
-                                except Exception as whisper2_error:
-                                    print(f"⚠️ Whisper model without language failed: {whisper2_error}")
-                                    try:
-                                        print("🔍 Trying with scribe model without any parameters...")
-                                        response = self.client.speech_to_text.convert(
-                                            file=audio_file,
-                                            model_id="scribe_v1"
-                                        )
-                                    except Exception as scribe_error:
-                                        print(f"⚠️ Scribe model failed: {scribe_error}")
-                                        print("🔍 Trying with any available model...")
-                                        response = self.client.speech_to_text.convert(
-                                            file=audio_file
-                                        )
-                
-                result = response.text
-                print(f"📝 STT Result: {result}")
-                
-                # Clear response from memory
-                del response
-                gc.collect()
-                
-                # If result is still in Hindi script, try to convert common patterns
-                if any(char in result for char in ['अ', 'आ', 'इ', 'ई', 'उ', 'ऊ', 'ए', 'ऐ', 'ओ', 'औ', 'क', 'ख', 'ग', 'घ', 'च', 'छ', 'ज', 'झ', 'ट', 'ठ', 'ड', 'ढ', 'ण', 'त', 'थ', 'द', 'ध', 'न', 'प', 'फ', 'ब', 'भ', 'म', 'य', 'र', 'ल', 'व', 'श', 'ष', 'स', 'ह', 'ड़', 'ढ़', '़', '्', 'ं', 'ः']):
-                    print("⚠️ Result still in Hindi script, attempting manual conversion...")
-                    # Common Hindi to English mappings for common phrases
-                    hindi_to_english = {
-                        'प्राइम मिनिस्टर ऑफ इंडिया': 'Prime Minister of India',
-                        'व्हू इज': 'Who is',
-                        'इलोन मस्क': 'Elon Musk',
-                        'नरेंद्र मोदी': 'Narendra Modi',
-                        'भारत': 'India',
-                        'प्रधानमंत्री': 'Prime Minister',
-                        'क्या': 'What',
-                        'कौन': 'Who',
-                        'कहाँ': 'Where',
-                        'कब': 'When',
-                        'कैसे': 'How',
-                        'क्यों': 'Why',
-                        'है': 'is',
-                        'हैं': 'are',
-                        'था': 'was',
-                        'थे': 'were',
-                        'में': 'in',
-                        'का': 'of',
-                        'के': 'of',
-                        'की': 'of',
-                        'और': 'and',
-                        'लेकिन': 'but',
-                        'या': 'or',
-                        'नहीं': 'no',
-                        'हाँ': 'yes',
-                        'बहुत': 'very',
-                        'अच्छा': 'good',
-                        'बुरा': 'bad',
-                        'बड़ा': 'big',
-                        'छोटा': 'small',
-                        'नया': 'new',
-                        'पुराना': 'old',
-                        'सही': 'correct',
-                        'गलत': 'wrong',
-                        'आज': 'today',
-                        'कल': 'tomorrow',
-                        'परसों': 'day after tomorrow',
-                        'कल': 'yesterday',
-                        'अभी': 'now',
-                        'फिर': 'then',
-                        'भी': 'also',
-                        'सिर्फ': 'only',
-                        'भी': 'too',
-                        'नहीं': 'not',
-                        'मैं': 'I',
-                        'मुझे': 'me',
-                        'मेरा': 'my',
-                        'मेरी': 'my',
-                        'मेरे': 'my',
-                        'आप': 'you',
-                        'आपका': 'your',
-                        'आपकी': 'your',
-                        'आपके': 'your',
-                        'वह': 'he/she',
-                        'उसका': 'his/her',
-                        'उसकी': 'his/her',
-                        'उसके': 'his/her',
-                        'यह': 'this',
-                        'वह': 'that',
-                        'यहाँ': 'here',
-                        'वहाँ': 'there',
-                        'कहाँ': 'where',
-                        'कब': 'when',
-                        'कैसे': 'how',
-                        'क्यों': 'why',
-                        'क्या': 'what',
-                        'कौन': 'who'
-                    }
-                    
-                    for hindi, english in hindi_to_english.items():
-                        result = result.replace(hindi, english)
-                    
-                    print(f"📝 Converted result: {result}")
-                    
-                    # If still contains Hindi characters, try phonetic conversion
-                    if any(char in result for char in ['अ', 'आ', 'इ', 'ई', 'उ', 'ऊ', 'ए', 'ऐ', 'ओ', 'औ', 'क', 'ख', 'ग', 'घ', 'च', 'छ', 'ज', 'झ', 'ट', 'ठ', 'ड', 'ढ', 'ण', 'त', 'थ', 'द', 'ध', 'न', 'प', 'फ', 'ब', 'भ', 'म', 'य', 'र', 'ल', 'व', 'श', 'ष', 'स', 'ह', 'ड़', 'ढ़', '़', '्', 'ं', 'ः']):
-                        print("⚠️ Still contains Hindi characters, attempting phonetic conversion...")
-                        # Try to convert remaining Hindi to English phonetically
-                        phonetic_mapping = {
-                            'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ee', 'उ': 'u', 'ऊ': 'oo',
-                            'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
-                            'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'च': 'ch', 'छ': 'chh',
-                            'ज': 'j', 'झ': 'jh', 'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh',
-                            'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
-                            'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y',
-                            'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh', 'स': 's',
-                            'ह': 'h', 'ड़': 'r', 'ढ़': 'rh'
-                        }
-                        
-                        for hindi_char, english_char in phonetic_mapping.items():
-                            result = result.replace(hindi_char, english_char)
-                        
-                        # Remove diacritics
-                        result = result.replace('़', '').replace('्', '').replace('ं', 'n').replace('ः', 'h')
-                        
-                        print(f"📝 Phonetically converted result: {result}")
-                
-                # Final check - if still contains Hindi characters, provide helpful message
-                if any(char in result for char in ['अ', 'आ', 'इ', 'ई', 'उ', 'ऊ', 'ए', 'ऐ', 'ओ', 'औ', 'क', 'ख', 'ग', 'घ', 'च', 'छ', 'ज', 'झ', 'ट', 'ठ', 'ड', 'ढ', 'ण', 'त', 'थ', 'द', 'ध', 'न', 'प', 'फ', 'ब', 'भ', 'म', 'य', 'र', 'ल', 'व', 'श', 'ष', 'स', 'ह', 'ड़', 'ढ़', '़', '्', 'ं', 'ः']):
-                    print("⚠️ Still contains Hindi characters after conversion attempts")
-                    print("💡 Tip: Try speaking more clearly in English or check your microphone settings")
-                    # Return a helpful message instead of Hindi text
-                    if 'प्राइम मिनिस्टर' in result or 'prime minister' in result.lower():
-                        result = "Prime Minister of India"
-                    elif 'who' in result.lower() or 'कौन' in result:
-                        result = "Who is"
-                    else:
-                        result = "I heard you speak, but please try speaking in English more clearly"
-                
-                return result
-                
-            finally:
-                os.unlink(temp_file)
-                
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"❌ STT Error: {e}")
             print(f"❌ STT Error traceback: {traceback.format_exc()}")
-            raise 
\ No newline at end of file
+            raise
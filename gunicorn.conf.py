@@ -0,0 +1,47 @@
+"""
+Gunicorn Configuration
+Serves app_simple from one worker per CPU, each with its own clients built after the fork
+
+    gunicorn app_simple:app -c gunicorn.conf.py
+
+The master imports the app and its SDKs once (preload_app); workers fork
+from it, call the app's ``init_worker`` and only start taking requests
+once their upstream connections are warm. A worker recycled after
+WEB_MAX_REQUESTS comes back the same way, without re-importing anything.
+Requests from one conversation can reach any worker, so use
+SESSION_BACKEND=sqlite with more than one.
+
+The Socket.IO app (app.py) needs a client's requests to reach the
+process holding its connection, which gunicorn can't do; see
+nginx.conf.example for running one process per CPU behind a sticky proxy.
+"""
+
+import importlib
+import multiprocessing
+import os
+from config import Config
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = Config.WEB_CONCURRENCY or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+preload_app = True
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS // 10
+timeout = 120
+keepalive = 2
+
+
+def on_starting(server):
+    if workers > 1 and Config.SESSION_BACKEND == "memory":
+        print(f"⚠️ {workers} workers with SESSION_BACKEND=memory: a conversation's requests may land on "
+              f"different workers and lose their history; set SESSION_BACKEND=sqlite")
+
+
+def post_worker_init(worker):
+    """Build the worker's clients and wait for them to warm up before it accepts requests"""
+    app_module = importlib.import_module(worker.app.app_uri.split(':')[0])
+    init_worker = getattr(app_module, 'init_worker', None)
+    if init_worker is not None:
+        init_worker()
+        app_module.worker_ready.wait()
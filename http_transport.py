@@ -0,0 +1,305 @@
+"""
+HTTP Transport Module
+One pooled, kept-alive HTTP transport shared by the ElevenLabs and OpenAI clients
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from typing import List
+from urllib.parse import urlsplit
+import httpx
+from config import Config
+from metrics import metrics
+
+class _CountingTransport(httpx.BaseTransport):
+    """Sends through an httpx connection pool, counting requests and new connections.
+
+    The pool is rebuilt in a forked child (gunicorn --preload), whose copy of
+    the parent's sockets must not be reused.
+    """
+
+    def __init__(self, owner: "HTTPTransport"):
+        self.owner = owner
+        self.pool = owner._pool()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions['trace'] = self.owner._tracer(request)
+        self.owner._started('sync')
+        try:
+            response = self.pool.handle_request(request)
+        except BaseException:
+            self.owner._finished('sync')
+            raise
+        response.stream = _CountedStream(response.stream, lambda: self.owner._finished('sync'))
+        return response
+
+    def close(self):
+        self.pool.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """asyncio counterpart of _CountingTransport, bound to one event loop"""
+
+    def __init__(self, owner: "HTTPTransport"):
+        self.owner = owner
+        self.pool = owner._pool(asynchronous=True)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions['trace'] = self.owner._tracer(request, asynchronous=True)
+        self.owner._started('async')
+        try:
+            response = await self.pool.handle_async_request(request)
+        except BaseException:
+            self.owner._finished('async')
+            raise
+        response.stream = _AsyncCountedStream(response.stream, lambda: self.owner._finished('async'))
+        return response
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class _CountedStream(httpx.SyncByteStream):
+    """Response body that reports when it is closed, i.e. when the request stops holding a connection"""
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if self.on_close is not None:
+                self.on_close, on_close = None, self.on_close
+                on_close()
+
+
+class _AsyncCountedStream(httpx.AsyncByteStream):
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.on_close is not None:
+                self.on_close, on_close = None, self.on_close
+                on_close()
+
+
+class HTTPTransport:
+    """Connection pools for the upstream APIs, shared by every client in the process.
+
+    ``client`` is one ``httpx.Client`` for the synchronous SDK clients;
+    ``async_client()`` makes an ``httpx.AsyncClient`` for an event loop. Both
+    use the configured pool limits and keep-alive expiry (longer than
+    httpx's 5 s, so connections survive the pause between turns), HTTP/2 if
+    enabled, and per-stage read timeouts from ``timeout(stage)``.
+    ``warm_up(url)`` opens connections to an upstream in the background, again
+    in each forked worker, so the first turn doesn't pay for TCP and TLS
+    handshakes; ``wait_warm()`` lets a worker hold off taking requests until
+    they are open. ``stats()`` reports pool utilization and connection churn.
+    """
+
+    def __init__(self):
+        self.limits = httpx.Limits(
+            max_connections=Config.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.http2 = Config.HTTP2_ENABLED
+        if self.http2 and importlib.util.find_spec('h2') is None:
+            print("⚠️ HTTP2_ENABLED needs the h2 package (pip install 'httpx[http2]'); using HTTP/1.1")
+            self.http2 = False
+        self.warm_urls: List[str] = []
+        self.warming: List[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.in_flight = {}
+        self._reset_counters()
+        self.transport = _CountingTransport(self)
+        self.async_transports = []
+        self.client = httpx.Client(transport=self.transport, timeout=self.timeout(), follow_redirects=True)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def timeout(self, stage: str = None) -> httpx.Timeout:
+        """Timeouts for a request of ``stage`` (stt, llm or tts); the read timeout is the longest wait for data"""
+        read = {
+            'stt': Config.HTTP_STT_TIMEOUT_SECONDS,
+            'llm': Config.HTTP_LLM_TIMEOUT_SECONDS,
+            'tts': Config.HTTP_TTS_TIMEOUT_SECONDS,
+        }.get(stage, max(Config.HTTP_STT_TIMEOUT_SECONDS, Config.HTTP_LLM_TIMEOUT_SECONDS, Config.HTTP_TTS_TIMEOUT_SECONDS))
+        return httpx.Timeout(read, connect=Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+                             write=Config.HTTP_WRITE_TIMEOUT_SECONDS, pool=Config.HTTP_POOL_TIMEOUT_SECONDS)
+
+    def async_client(self) -> httpx.AsyncClient:
+        """A pooled client for the running event loop (async pools can't be shared between loops)"""
+        transport = _AsyncCountingTransport(self)
+        with self.lock:
+            self.async_transports.append(transport)
+        return httpx.AsyncClient(transport=transport, timeout=self.timeout(), follow_redirects=True)
+
+    def _pool(self, asynchronous: bool = False):
+        pool_class = httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport
+        return pool_class(limits=self.limits, http2=self.http2)
+
+    def _reset_counters(self):
+        self.counters = {'requests': 0, 'connections_opened': 0, 'tls_handshakes': 0, 'connect_errors': 0,
+                         'warmup_connections': 0, 'peak_in_flight': 0}
+        self.in_flight = {'sync': 0, 'async': 0}
+
+    def _after_fork(self):
+        # The parent's connections belong to the parent; start this worker with empty pools
+        self.lock = threading.Lock()
+        self._reset_counters()
+        self.transport.pool = self._pool()
+        self.async_transports = []
+        self.warming = []
+        if self.warm_urls:
+            self._warm_in_background(list(self.warm_urls))
+
+    def _started(self, kind: str):
+        with self.lock:
+            self.counters['requests'] += 1
+            self.in_flight[kind] += 1
+            self.counters['peak_in_flight'] = max(self.counters['peak_in_flight'], sum(self.in_flight.values()))
+
+    def _finished(self, kind: str):
+        with self.lock:
+            self.in_flight[kind] -= 1
+
+    def _tracer(self, request: httpx.Request, asynchronous: bool = False):
+        """httpcore trace hook timing the TCP connect and TLS handshake of a new connection"""
+        host = request.url.host
+        started = {}
+
+        def trace(name: str, info: dict):
+            step = name.rsplit('.', 2)
+            if len(step) < 3 or step[1] not in ('connect_tcp', 'start_tls'):
+                return
+            if step[2] == 'started':
+                started[step[1]] = time.perf_counter()
+            elif step[2] == 'failed':
+                with self.lock:
+                    self.counters['connect_errors'] += 1
+            elif step[2] == 'complete':
+                seconds = time.perf_counter() - started.get(step[1], time.perf_counter())
+                with self.lock:
+                    self.counters['connections_opened' if step[1] == 'connect_tcp' else 'tls_handshakes'] += 1
+                metrics.observe('http_connect' if step[1] == 'connect_tcp' else 'tls_handshake', seconds, host=host)
+
+        if not asynchronous:
+            return trace
+
+        async def atrace(name: str, info: dict):
+            trace(name, info)
+        return atrace
+
+    def warm_up(self, base_url: str):
+        """Open ``HTTP_WARMUP_CONNECTIONS`` connections to ``base_url`` in the background (and after each fork)"""
+        if Config.HTTP_WARMUP_CONNECTIONS <= 0 or not base_url:
+            return
+        with self.lock:
+            if base_url in self.warm_urls:
+                return
+            self.warm_urls.append(base_url)
+        self._warm_in_background([base_url])
+
+    def _warm_in_background(self, urls: List[str]):
+        thread = threading.Thread(target=self._warm, args=(urls,), name="http-warmup", daemon=True)
+        with self.lock:
+            self.warming.append(thread)
+        thread.start()
+
+    def wait_warm(self, timeout: float = None) -> bool:
+        """Wait for this process's warm-ups to finish; False if some are still connecting after ``timeout``"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            threads = list(self.warming)
+        for thread in threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not any(thread.is_alive() for thread in threads)
+
+    def _warm(self, urls: List[str]):
+        # Concurrent requests, so the pool opens one connection for each rather than reusing the first
+        opened = []
+        threads = [threading.Thread(target=self._open, args=(url, opened), daemon=True)
+                   for url in urls for _ in range(Config.HTTP_WARMUP_CONNECTIONS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"🔥 Warmed {len(opened)} connections to {', '.join(_origin(url) for url in urls)}")
+
+    def _open(self, url: str, opened: list):
+        try:
+            self.client.head(url, timeout=self.timeout()).close()
+            opened.append(url)
+            with self.lock:
+                self.counters['warmup_connections'] += 1
+        except httpx.HTTPError as e:
+            print(f"⚠️ Could not warm up connection to {_origin(url)}: {e}")
+
+    async def warm_up_async(self, client: httpx.AsyncClient):
+        """Open connections to every warmed-up upstream from an async client"""
+        async def open_one(url: str):
+            try:
+                await client.head(url)
+                with self.lock:
+                    self.counters['warmup_connections'] += 1
+            except httpx.HTTPError as e:
+                print(f"⚠️ Could not warm up async connection to {_origin(url)}: {e}")
+
+        await asyncio.gather(*(open_one(url) for url in list(self.warm_urls)
+                               for _ in range(Config.HTTP_WARMUP_CONNECTIONS)))
+
+    @staticmethod
+    def _connections(transport) -> list:
+        # httpx keeps its httpcore pool private; the connection list is all we read
+        pool = getattr(transport.pool, '_pool', None)
+        return list(getattr(pool, 'connections', []))
+
+    def stats(self) -> dict:
+        connections = self._connections(self.transport)
+        with self.lock:
+            for transport in self.async_transports:
+                connections += self._connections(transport)
+            counters = dict(self.counters)
+            in_flight = sum(self.in_flight.values())
+        idle = sum(connection.is_idle() for connection in connections)
+        requests = counters['requests']
+        return {
+            **counters,
+            'connections': len(connections),
+            'active_connections': len(connections) - idle,
+            'idle_connections': idle,
+            'in_flight': in_flight,
+            'max_connections': self.limits.max_connections,
+            'pool_utilization': round((len(connections) - idle) / self.limits.max_connections, 3)
+            if self.limits.max_connections else None,
+            'connection_reuse': round(1 - counters['connections_opened'] / requests, 3) if requests else None,
+            'http2': self.http2,
+            'keepalive_expiry': self.limits.keepalive_expiry,
+        }
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# Process-wide pools shared by ElevenLabsClient, OpenAIClient and the async pipeline
+http_transport = HTTPTransport()
@@ -10,9 +10,10 @@ from audio_handler import AudioHandler
 from elevenlabs_client import ElevenLabsClient
 from openai_client import OpenAIClient
 from conversation_logger import ConversationLogger
+from cancellation import Cancelled
 
 # Initialize modules
-audio_handler = AudioHandler()
+audio_handler = AudioHandler(playback_sample_rate=ElevenLabsClient.SAMPLE_RATE)
 elevenlabs_client = ElevenLabsClient()
 openai_client = OpenAIClient()
 logger = ConversationLogger()
@@ -33,20 +34,26 @@ signal.signal(signal.SIGINT, signal_handler)
 
 print("\n🗣️  Start speaking! (Press Ctrl+C to exit)")
 
-# Main conversational loop
+# Main conversational loop (runs on AudioHandler's worker thread, one utterance at a time)
 def on_audio_data(audio_bytes):
     print("🔎 Transcribing...")
+    # Cancelled if the user barges in (UTTERANCE_POLICY=barge-in)
+    cancel = audio_handler.current_turn
     try:
-        user_text = elevenlabs_client.stt(audio_bytes)
+        user_text = elevenlabs_client.stt(audio_bytes, cancel=cancel)
         print(f"👤 You: {user_text}")
         logger.log("User", user_text)
         print("🤖 Generating response...")
-        ai_text = openai_client.ask(user_text)
+        ai_text = openai_client.ask(user_text, cancel=cancel)
         print(f"🤖 AI: {ai_text}")
         logger.log("AI", ai_text)
         print("🗣️  Speaking...")
-        ai_audio = elevenlabs_client.tts(ai_text)
-        elevenlabs_client.play_audio(ai_audio)
+        # Playback starts on the first streamed chunks; barge-in flushes whatever is still queued
+        playback = audio_handler.playback
+        playback.play(elevenlabs_client.tts_stream(ai_text, cancel=cancel, sample_rate=playback.sample_rate),
+                      cancel=cancel)
+    except Cancelled:
+        print("🛑 Interrupted, dropping this reply")
     except Exception as e:
         print(f"❌ Error in conversation loop: {e}")
 
@@ -9,11 +9,13 @@ from config import Config
 from elevenlabs_client import ElevenLabsClient
 from openai_client import OpenAIClient
 from conversation_logger import ConversationLogger
+from playback import create_playback
 
 # Initialize modules
 elevenlabs_client = ElevenLabsClient()
 openai_client = OpenAIClient()
 logger = ConversationLogger()
+playback = create_playback(ElevenLabsClient.SAMPLE_RATE)
 
 # Print config for user
 Config.print_config()
@@ -47,8 +49,7 @@ while running:
         print(f"🤖 AI: {ai_response}")
         
         print("🗣️  Speaking...")
-        ai_audio = elevenlabs_client.tts(ai_response)
-        elevenlabs_client.play_audio(ai_audio)
+        playback.play(elevenlabs_client.tts_stream(ai_response, sample_rate=playback.sample_rate))
         
         # Log the conversation
         logger.log("User", user_input)
@@ -59,4 +60,5 @@ while running:
     except Exception as e:
         print(f"❌ Error in conversation loop: {e}")
 
+playback.close()
 print("👋 Goodbye!") 
\ No newline at end of file
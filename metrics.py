@@ -0,0 +1,130 @@
+"""
+Metrics Module
+Timing spans for each stage of a turn, aggregated into histograms for a Prometheus /metrics endpoint
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from cancellation import Cancelled
+from config import Config
+
+# Seconds; spans range from sub-millisecond encodes to multi-second LLM replies
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Session the current turn belongs to; spans deep in the clients pick it up from here
+_session = contextvars.ContextVar('metrics_session', default=None)
+
+
+class Histogram:
+    """Bucket counts, sum and count of observations, Prometheus style"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Histograms of stage durations, labelled by stage and a few low-cardinality tags.
+
+    Sessions are not histogram labels (there would be one series per
+    conversation); instead the last ``recent`` spans are kept with their
+    session id, for finding out where one slow turn spent its time.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS, recent: int = None):
+        self.buckets = buckets
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.recent = deque(maxlen=Config.METRICS_RECENT_SPANS if recent is None else recent)
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, session: str = None, **labels):
+        key = (stage, *sorted(labels.items()))
+        session = session or _session.get()
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self.recent.append((time.time(), stage, seconds, session, labels))
+
+    @contextmanager
+    def span(self, stage: str, session: str = None, **labels) -> Iterator[None]:
+        """Time the block; ``outcome`` is ok, error or cancelled"""
+        started_at = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except Cancelled:
+            outcome = 'cancelled'
+            raise
+        except BaseException:
+            outcome = 'error'
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started_at, session, outcome=outcome, **labels)
+
+    def observe_turn(self, timings: dict, session: str = None):
+        """Record the whole-turn stages from a turn's ``timings``"""
+        for key, stage in (('stt', 'stt'), ('time_to_first_audio', 'time_to_first_audio'), ('total', 'turn_total')):
+            if key in timings:
+                self.observe(stage, timings[key], session)
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[None]:
+        """Tag spans recorded in this block, and in work it hands to other threads with
+        ``contextvars.copy_context``, with ``session_id``"""
+        token = _session.set(session_id)
+        try:
+            yield
+        finally:
+            _session.reset(token)
+
+    @staticmethod
+    def current_session() -> str:
+        return _session.get()
+
+    def spans(self, session: str = None, limit: int = 200) -> List[dict]:
+        """Most recent spans, newest last, optionally only one session's"""
+        with self.lock:
+            recent = list(self.recent)
+        if session is not None:
+            recent = [span for span in recent if span[3] == session]
+        return [{'ts': ts, 'stage': stage, 'seconds': round(seconds, 6), 'session': session_id, **labels}
+                for ts, stage, seconds, session_id, labels in recent[-limit:]]
+
+    def render(self, gauges: dict = None) -> str:
+        """Prometheus text exposition of the histograms, plus any ``gauges`` given as name -> value"""
+        with self.lock:
+            snapshot = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(self.histograms.items())]
+        lines = [
+            "# HELP voice_stage_seconds Time spent in each stage of a conversational turn",
+            "# TYPE voice_stage_seconds histogram",
+        ]
+        for (stage, *labels), counts, total, count in snapshot:
+            tags = ",".join([f'stage="{stage}"', *(f'{name}="{value}"' for name, value in labels)])
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(f'voice_stage_seconds_bucket{{{tags},le="{bound}"}} {cumulative}')
+            lines.append(f"voice_stage_seconds_sum{{{tags}}} {total:.6f}")
+            lines.append(f"voice_stage_seconds_count{{{tags}}} {count}")
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the clients, turn engines and web apps
+metrics = Metrics()
@@ -4,9 +4,19 @@ Handles conversational LLM responses using OpenAI API
 """
 
 import openai
+import time
+from typing import Iterator, List, Optional, Tuple
+from cancellation import CancelToken, Cancelled
 from config import Config
+from context_window import ContextWindow
+from http_transport import http_transport
+from metrics import metrics
+from response_cache import CacheKey, create_response_cache
+from session_store import Session
 
 class OpenAIClient:
+    FALLBACK_RESPONSE = "I'm sorry, I'm having trouble connecting to my AI service right now. Please try again in a moment."
+
     def __init__(self):
         # Validate API key before initializing client
         if not Config.OPENAI_API_KEY or Config.OPENAI_API_KEY.strip() == "":
@@ -18,43 +28,179 @@ class OpenAIClient:
         print(f"🔑 OpenAI API key configured: {Config.OPENAI_API_KEY[:10]}...")
         
         try:
-            self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            self.client = openai.OpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                base_url=Config.OPENAI_BASE_URL or None,
+                http_client=http_transport.client,
+                timeout=http_transport.timeout('llm')
+            )
             print("✅ OpenAI client initialized successfully")
         except Exception as e:
             print(f"❌ Failed to initialize OpenAI client: {e}")
             raise
         
-        self.history = []  # List of (role, content) tuples
+        http_transport.warm_up(str(self.client.base_url))
+        # Default conversation for single-user callers (CLI); web apps pass a per-client session
+        self.session = Session("default")
+        self.context = ContextWindow(self._summarize)
+        self.response_cache = create_response_cache()
+
+    @property
+    def history(self) -> list:
+        return self.session.history
+
+    def _summarize(self, previous_summary: str, messages: List[Tuple[str, str]]) -> str:
+        """Fold ``messages`` into the running conversation summary"""
+        transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+        if previous_summary:
+            transcript = f"Summary so far: {previous_summary}\n\nNew messages:\n{transcript}"
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": (
+                    "Summarize this conversation for your own memory. Keep names, facts, "
+                    f"user preferences and open questions. Use at most {Config.CONTEXT_SUMMARY_TOKENS // 2} words."
+                )},
+                {"role": "user", "content": transcript}
+            ],
+            max_tokens=Config.CONTEXT_SUMMARY_TOKENS
+        )
+        return response.choices[0].message.content.strip()
+
+    def record_turn(self, session: Session, prompt: str, answer: str):
+        session.history.append(("user", prompt))
+        session.history.append(("assistant", answer))
+        # Summarizes in the background; the next turn picks the summary up
+        self.context.compact(session)
+
+    def cached_answer(self, prompt: str, system_prompt: str, session: Session) -> Tuple[Optional[str], Optional[CacheKey]]:
+        """An earlier answer to ``prompt`` in this context, and the key to cache a new answer under"""
+        if self.response_cache is None:
+            return None, None
+        key = self.response_cache.key(prompt, system_prompt, session.history)
+        if key is None:
+            return None, None
+        answer = self.response_cache.get(key)
+        if answer is not None:
+            print(f"🗃️ Answering from the response cache: {answer[:100]}...")
+        return answer, key
 
-    def ask(self, prompt: str, system_prompt: str = None) -> str:
+    def ask(self, prompt: str, system_prompt: str = None, session: Session = None, cancel: CancelToken = None) -> str:
+        session = session or self.session
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            for role, content in self.history:
-                messages.append({"role": role, "content": content})
-            messages.append({"role": "user", "content": prompt})
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            cached, cache_key = self.cached_answer(prompt, system_prompt, session)
+            if cached is not None:
+                self.record_turn(session, prompt, cached)
+                return cached
+            messages = self.context.build_messages(prompt, system_prompt, session)
             
-            print(f"🤖 Sending request to OpenAI with {len(messages)} messages")
+            print(f"🤖 Sending request to OpenAI with {len(messages)} messages "
+                  f"(~{self.context.stats()['last_prompt_tokens']} prompt tokens)")
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages
-            )
+            with metrics.span('llm_total', session=session.session_id):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages
+                )
             
             answer = response.choices[0].message.content.strip()
+            if cancel is not None and cancel.cancelled:
+                # Superseded while waiting; the caller has moved on, so don't keep this exchange
+                cancel.note('llm_calls_discarded')
+                raise Cancelled(cancel.reason)
             print(f"🤖 Received response from OpenAI: {answer[:100]}...")
             
-            self.history.append(("user", prompt))
-            self.history.append(("assistant", answer))
+            if cache_key is not None:
+                self.response_cache.put(cache_key, answer)
+            self.record_turn(session, prompt, answer)
             return answer
             
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"❌ OpenAI API error: {e}")
             # Return a fallback response instead of crashing
-            fallback_response = "I'm sorry, I'm having trouble connecting to my AI service right now. Please try again in a moment."
+            fallback_response = self.FALLBACK_RESPONSE
             print(f"🤖 Using fallback response: {fallback_response}")
             return fallback_response
 
-    def reset_history(self):
-        self.history = [] 
\ No newline at end of file
+    def ask_stream(self, prompt: str, system_prompt: str = None, session: Session = None,
+                   cancel: CancelToken = None) -> Iterator[str]:
+        """Yield the answer as text deltas while the completion is generated.
+
+        The full answer is recorded into history once the stream finishes, so
+        callers see the same history semantics as ``ask``. If ``cancel`` fires,
+        the completion stream is closed and ``Cancelled`` raised; like a
+        cancelled ``ask``, the exchange is left out of the history.
+        """
+        session = session or self.session
+        parts = []
+        interrupted = False
+        try:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            cached, cache_key = self.cached_answer(prompt, system_prompt, session)
+            if cached is not None:
+                # One delta; the sentence splitter cuts it where it cut the original stream
+                yield cached
+                if cancel is not None and cancel.cancelled:
+                    raise Cancelled(cancel.reason)
+                self.record_turn(session, prompt, cached)
+                return
+            messages = self.context.build_messages(prompt, system_prompt, session)
+            
+            print(f"🤖 Streaming request to OpenAI with {len(messages)} messages "
+                  f"(~{self.context.stats()['last_prompt_tokens']} prompt tokens)")
+            
+            started_at = time.perf_counter()
+            stream = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                stream=True
+            )
+            
+            try:
+                for chunk in stream:
+                    if cancel is not None and cancel.cancelled:
+                        cancel.note('llm_streams_closed')
+                        break
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not parts:
+                            metrics.observe('llm_first_token', time.perf_counter() - started_at, session.session_id)
+                        parts.append(delta)
+                        yield delta
+            finally:
+                # Hangs up on the completion if we stopped reading early
+                stream.close()
+            
+        except Cancelled:
+            raise
+        except Exception as e:
+            print(f"❌ OpenAI API error: {e}")
+            if parts:
+                # Keep whatever was already spoken rather than contradicting it
+                print("🤖 Stream interrupted, keeping partial response")
+                interrupted = True
+            else:
+                print(f"🤖 Using fallback response: {self.FALLBACK_RESPONSE}")
+                parts.append(self.FALLBACK_RESPONSE)
+                yield self.FALLBACK_RESPONSE
+                return
+        
+        answer = "".join(parts).strip()
+        if cancel is not None and cancel.cancelled:
+            print(f"🛑 OpenAI stream cancelled after {len(parts)} deltas")
+            raise Cancelled(cancel.reason)
+        print(f"🤖 Received streamed response from OpenAI: {answer[:100]}...")
+        metrics.observe('llm_total', time.perf_counter() - started_at, session.session_id)
+        if cache_key is not None and not interrupted:
+            self.response_cache.put(cache_key, answer)
+        self.record_turn(session, prompt, answer)
+
+    def reset_history(self, session: Session = None):
+        (session or self.session).reset() 
\ No newline at end of file
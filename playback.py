@@ -0,0 +1,318 @@
+"""
+Playback Module
+One long-lived audio output fed by a queue of PCM, so replies play gaplessly as TTS streams them
+"""
+
+import threading
+import time
+import wave
+from typing import Iterable, Union
+from cancellation import CancelToken, Cancelled
+from config import Config
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+class NullOutput:
+    """An output device that plays nothing.
+
+    With ``realtime`` each write blocks like a sound card would, until the
+    audio before it has played, so underruns and gaps behave as on real
+    hardware; ``gaps`` records every stretch of silence between writes.
+    """
+
+    name = 'null'
+
+    def __init__(self, sample_rate: int, channels: int = 1, realtime: bool = True):
+        self.sample_rate = sample_rate
+        self.bytes_per_second = sample_rate * channels * SAMPLE_WIDTH
+        self.realtime = realtime
+        self.written = 0
+        self.gaps = []
+        self.clock = None  # when the audio written so far finishes playing
+
+    def write(self, pcm: bytes):
+        self.written += len(pcm)
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self.clock is not None and now > self.clock:
+            self.gaps.append(now - self.clock)
+        start = now if self.clock is None else max(self.clock, now)
+        if start > now:
+            time.sleep(start - now)
+        self.clock = start + len(pcm) / self.bytes_per_second
+
+    def close(self):
+        pass
+
+
+class FileOutput(NullOutput):
+    """Writes what would have been played to a WAV file (as fast as it comes, unless ``realtime``)"""
+
+    name = 'file'
+
+    def __init__(self, path: str, sample_rate: int, channels: int = 1, realtime: bool = False):
+        super().__init__(sample_rate, channels, realtime)
+        self.path = path
+        self.wav = wave.open(path, 'wb')
+        self.wav.setnchannels(channels)
+        self.wav.setsampwidth(SAMPLE_WIDTH)
+        self.wav.setframerate(sample_rate)
+
+    def write(self, pcm: bytes):
+        self.wav.writeframes(pcm)
+        super().write(pcm)
+
+    def close(self):
+        self.wav.close()
+
+
+class PyAudioOutput:
+    """A PyAudio output stream, opened once and written to for the life of the process.
+
+    If the device can't play ``sample_rate`` it's opened at the device's own
+    rate; ``sample_rate`` is then the rate to send it.
+    """
+
+    name = 'pyaudio'
+
+    def __init__(self, sample_rate: int, channels: int = 1, frames_per_buffer: int = 1024, audio=None):
+        import pyaudio
+        self.audio = audio or pyaudio.PyAudio()
+        # Only terminate PortAudio if this output started it (AudioHandler shares its own)
+        self.owns_audio = audio is None
+        try:
+            self.stream = self._open(pyaudio.paInt16, sample_rate, channels, frames_per_buffer)
+        except (ValueError, IOError) as e:
+            device_rate = int(self.audio.get_default_output_device_info()['defaultSampleRate'])
+            if device_rate == sample_rate:
+                raise
+            print(f"⚠️ Audio output can't play {sample_rate} Hz ({e}), using {device_rate} Hz")
+            self.stream = self._open(pyaudio.paInt16, device_rate, channels, frames_per_buffer)
+            sample_rate = device_rate
+        self.sample_rate = sample_rate
+
+    def _open(self, sample_format: int, sample_rate: int, channels: int, frames_per_buffer: int):
+        return self.audio.open(
+            format=sample_format,
+            channels=channels,
+            rate=sample_rate,
+            output=True,
+            frames_per_buffer=frames_per_buffer
+        )
+
+    def write(self, pcm: bytes):
+        self.stream.write(pcm, exception_on_underflow=False)
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        if self.owns_audio:
+            self.audio.terminate()
+
+
+class PlaybackQueue:
+    """Plays 16-bit PCM through one output device from a background thread.
+
+    ``enqueue`` adds audio as it streams from TTS and returns straight away;
+    ``end`` says the current reply is complete. Playback starts once
+    ``jitter_buffer_ms`` of audio is queued (or the reply has ended), so a
+    slow network read doesn't starve the device mid-word. Audio enqueued
+    while earlier audio is still playing follows it without a gap. Running
+    dry before ``end`` and then getting more audio is an underrun: playback
+    waits for the jitter buffer to refill, and the stall is counted.
+    ``flush`` drops everything queued for barge-in; only the one or two
+    ``period_ms`` writes already handed to the device still play.
+    """
+
+    def __init__(self, output, sample_rate: int, channels: int = 1, jitter_buffer_ms: int = None,
+                 period_ms: int = None):
+        self.output = output
+        self.sample_rate = sample_rate
+        self.frame_bytes = channels * SAMPLE_WIDTH
+        self.jitter_buffer_ms = Config.PLAYBACK_JITTER_BUFFER_MS if jitter_buffer_ms is None else jitter_buffer_ms
+        self.period_ms = Config.PLAYBACK_PERIOD_MS if period_ms is None else period_ms
+        self.jitter_bytes = self._frames(self.jitter_buffer_ms)
+        self.period_bytes = max(self._frames(self.period_ms), self.frame_bytes)
+        self.buffer = bytearray()
+        self.ended = True  # no reply is being enqueued
+        self.priming = True  # waiting for the jitter buffer to fill
+        self.writing = False
+        self.underrun_at = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.counters = {'replies': 0, 'enqueued_bytes': 0, 'played_bytes': 0, 'underruns': 0,
+                         'underrun_ms': 0.0, 'flushes': 0, 'flushed_bytes': 0, 'max_buffered_ms': 0.0}
+        self.thread = threading.Thread(target=self._play, name="playback", daemon=True)
+        self.thread.start()
+
+    def _frames(self, ms: float) -> int:
+        return int(self.sample_rate * ms / 1000) * self.frame_bytes
+
+    def _ms(self, size: int) -> float:
+        return size / self.frame_bytes / self.sample_rate * 1000
+
+    def enqueue(self, pcm: bytes):
+        if not pcm:
+            return
+        with self.condition:
+            if self.ended:
+                self.ended = False
+                self.counters['replies'] += 1
+            self.buffer += pcm
+            self.counters['enqueued_bytes'] += len(pcm)
+            self.counters['max_buffered_ms'] = max(self.counters['max_buffered_ms'], self._ms(len(self.buffer)))
+            self.condition.notify_all()
+
+    def end(self):
+        """No more audio is coming for this reply; play out what is queued without waiting to buffer"""
+        with self.condition:
+            self.ended = True
+            # Running dry just before the end wasn't a stall
+            self.underrun_at = None
+            self.condition.notify_all()
+
+    def flush(self):
+        """Drop all queued audio (barge-in)"""
+        with self.condition:
+            if self.buffer:
+                self.counters['flushes'] += 1
+                self.counters['flushed_bytes'] += len(self.buffer)
+            self.buffer.clear()
+            self.ended = True
+            self.priming = True
+            self.underrun_at = None
+            self.condition.notify_all()
+
+    def wait(self, timeout: float = None, cancel: CancelToken = None) -> bool:
+        """Block until the queued audio has played; False on timeout.
+
+        If ``cancel`` fires first, the queue is flushed and ``Cancelled`` raised.
+        """
+        if cancel is not None:
+            cancel.on_cancel(self._wake)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.buffer or self.writing:
+                if cancel is not None and cancel.cancelled:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        if cancel is not None and cancel.cancelled:
+            self.flush()
+            raise Cancelled(cancel.reason)
+        return True
+
+    def play(self, audio: Union[bytes, Iterable[bytes]], cancel: CancelToken = None):
+        """Enqueue a reply (all of it, or chunks as they stream) and wait until it has played"""
+        try:
+            for chunk in ([audio] if isinstance(audio, (bytes, bytearray)) else audio):
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                self.enqueue(chunk)
+            self.end()
+            self.wait(cancel=cancel)
+        except Cancelled:
+            self.flush()
+            raise
+        except Exception:
+            # A failed stream still ends its reply; what arrived plays out
+            self.end()
+            raise
+
+    def _wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def _ready(self) -> bool:
+        if not self.buffer:
+            return False
+        if self.priming and not self.ended and len(self.buffer) < self.jitter_bytes:
+            return False
+        return True
+
+    def _play(self):
+        while True:
+            with self.condition:
+                while not self.closed and not self._ready():
+                    self.condition.wait()
+                if self.closed:
+                    return
+                if self.priming:
+                    self.priming = False
+                    if self.underrun_at is not None:
+                        self.counters['underruns'] += 1
+                        self.counters['underrun_ms'] += (time.monotonic() - self.underrun_at) * 1000
+                        self.underrun_at = None
+                size = min(self.period_bytes, len(self.buffer))
+                size -= size % self.frame_bytes
+                if size == 0:
+                    # The tail of an ended reply isn't a whole frame; pad it with silence
+                    self.buffer += bytes(self.frame_bytes - len(self.buffer))
+                    size = self.frame_bytes
+                chunk = bytes(self.buffer[:size])
+                del self.buffer[:size]
+                self.writing = True
+            try:
+                self.output.write(chunk)
+            except Exception as e:
+                print(f"❌ Error playing audio: {e}")
+            with self.condition:
+                self.writing = False
+                self.counters['played_bytes'] += len(chunk)
+                if not self.buffer:
+                    self.priming = True
+                    if not self.ended:
+                        # The device caught up with TTS mid-reply; it's an underrun if more audio follows
+                        self.underrun_at = time.monotonic()
+                self.condition.notify_all()
+
+    def stats(self) -> dict:
+        with self.condition:
+            counters = dict(self.counters)
+            buffered = len(self.buffer)
+        return {
+            **counters,
+            'underrun_ms': round(counters['underrun_ms'], 1),
+            'max_buffered_ms': round(counters['max_buffered_ms'], 1),
+            'buffered_ms': round(self._ms(buffered), 1),
+            'jitter_buffer_ms': self.jitter_buffer_ms,
+            'period_ms': self.period_ms,
+            'device': self.output.name,
+        }
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.output.close()
+
+
+def create_playback(sample_rate: int, channels: int = 1, device: str = None, audio=None) -> PlaybackQueue:
+    """Build a PlaybackQueue on PLAYBACK_DEVICE (pyaudio, file or null).
+
+    ``audio`` is an existing ``pyaudio.PyAudio`` to open the stream on. The
+    queue's ``sample_rate`` is what the device ended up playing, which may
+    differ from ``sample_rate``; ask TTS for that rate.
+    """
+    device = device or Config.PLAYBACK_DEVICE
+    period_frames = max(int(sample_rate * Config.PLAYBACK_PERIOD_MS / 1000), 1)
+    if device == 'pyaudio':
+        try:
+            output = PyAudioOutput(sample_rate, channels, period_frames, audio=audio)
+        except Exception as e:
+            print(f"⚠️ Could not open the audio output ({e}), playing nothing")
+            output = NullOutput(sample_rate, channels)
+    elif device == 'file':
+        print(f"💾 Writing playback to {Config.PLAYBACK_FILE}")
+        output = FileOutput(Config.PLAYBACK_FILE, sample_rate, channels)
+    else:
+        if device != 'null':
+            print(f"⚠️ Unknown playback device '{device}', playing nothing")
+        output = NullOutput(sample_rate, channels)
+    return PlaybackQueue(output, output.sample_rate, channels)
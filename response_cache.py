@@ -0,0 +1,176 @@
+"""
+Response Cache Module
+Answers repeated questions with an earlier LLM reply: an exact tier and an opt-in near-duplicate tier
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+from config import Config
+
+_WORD = re.compile(r"\w+")
+
+# Words that don't change what a question asks for. Pronouns, tense and time words ("you", "me",
+# "will", "now") do, so they stay; "tell me" and "can you" only count as filler as an opening
+FILLER_WORDS = frozenset("a an the is are s please hey hi hello ok okay so just um uh".split())
+_POLITE_OPENING = re.compile(
+    r"^(?:(?:hey|hi|hello|ok|okay|so|um|uh|please|just) )*"
+    r"(?:(?:can|could|would|will) you (?:please )?)?(?:tell me |do you know )?"
+)
+_CONTRACTIONS = {'whats': 'what', 'whos': 'who', 'wheres': 'where', 'hows': 'how'}
+
+
+def normalize_prompt(text: str) -> str:
+    """A prompt as it affects the answer: NFKC, case-folded, punctuation dropped, whitespace collapsed"""
+    return " ".join(_WORD.findall(unicodedata.normalize('NFKC', text).casefold()))
+
+
+def context_fingerprint(system_prompt: str, history: list, messages: int) -> str:
+    """Short hash of the rest of what shapes the answer: the system prompt and the last ``messages`` of history"""
+    recent = history[-messages:] if messages > 0 else []
+    material = "\x00".join([system_prompt or "", *(f"{role}:{normalize_prompt(content)}" for role, content in recent)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+
+def content_words(normalized: str) -> Tuple[str, ...]:
+    """The words of a normalized prompt that carry its meaning, in order"""
+    words = (_CONTRACTIONS.get(word, word) for word in _POLITE_OPENING.sub("", normalized).split())
+    return tuple(word for word in words if word not in FILLER_WORDS)
+
+
+class CacheKey(NamedTuple):
+    prompt: str  # normalized
+    context: str  # context_fingerprint
+
+
+class _Entry:
+    __slots__ = ('answer', 'expires_at', 'near')
+
+    def __init__(self, answer: str, expires_at: float, near: Optional[tuple]):
+        self.answer = answer
+        self.expires_at = expires_at
+        self.near = near
+
+
+class ResponseCache:
+    """LLM answers keyed by normalized prompt and a fingerprint of the conversation around it.
+
+    The exact tier matches prompts that normalize the same ("Who is Elon
+    Musk?" and "who is elon musk"). With ``semantic`` on, a miss falls back
+    to a near-duplicate tier keyed on the prompt's content words, so
+    rewordings that only differ in filler and politeness words ("can you
+    tell me who elon musk is") share an answer in the same context, while a
+    changed name or number ("the capital of spain") never does. Entries
+    expire after ``ttl_seconds``, and past ``max_entries`` the least
+    recently used is evicted. Prompts longer than ``max_prompt_chars`` are
+    one-offs and aren't cached.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, context_messages: int = None,
+                 semantic: bool = None, max_prompt_chars: int = None):
+        self.max_entries = max(1, Config.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries)
+        self.ttl_seconds = Config.RESPONSE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.context_messages = Config.RESPONSE_CACHE_CONTEXT_MESSAGES if context_messages is None else context_messages
+        self.semantic = Config.RESPONSE_CACHE_SEMANTIC if semantic is None else semantic
+        self.max_prompt_chars = Config.RESPONSE_CACHE_MAX_PROMPT_CHARS if max_prompt_chars is None else max_prompt_chars
+        self.entries = OrderedDict()
+        # (context, content words) -> the exact key last stored under them
+        self.near: Dict[tuple, CacheKey] = {}
+        self.lock = threading.Lock()
+        self.metrics = {'lookups': 0, 'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'stores': 0,
+                        'evictions': 0, 'expirations': 0}
+
+    def key(self, prompt: str, system_prompt: str, history: list) -> Optional[CacheKey]:
+        """The key for ``prompt`` asked after ``history``, or None if it isn't worth caching"""
+        normalized = normalize_prompt(prompt)
+        if not normalized or len(normalized) > self.max_prompt_chars:
+            return None
+        return CacheKey(normalized, context_fingerprint(system_prompt, history, self.context_messages))
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        near = self._near_key(key)
+        now = time.monotonic()
+        with self.lock:
+            self.metrics['lookups'] += 1
+            answer = self._fresh(key, now)
+            if answer is not None:
+                self.metrics['exact_hits'] += 1
+                return answer
+            similar = self.near.get(near) if near is not None else None
+            answer = self._fresh(similar, now) if similar is not None else None
+            if answer is not None:
+                self.metrics['semantic_hits'] += 1
+                return answer
+            self.metrics['misses'] += 1
+            return None
+
+    def put(self, key: CacheKey, answer: str):
+        if not answer:
+            return
+        near = self._near_key(key)
+        with self.lock:
+            self.metrics['stores'] += 1
+            self._remove(key)
+            while len(self.entries) >= self.max_entries:
+                evicted, _ = next(iter(self.entries.items()))
+                self._remove(evicted)
+                self.metrics['evictions'] += 1
+            if near is not None:
+                self.near[near] = key
+            self.entries[key] = _Entry(answer, time.monotonic() + self.ttl_seconds, near)
+
+    def stats(self) -> dict:
+        with self.lock:
+            metrics = dict(self.metrics)
+            entries = len(self.entries)
+        lookups = metrics['lookups']
+
+        def rate(hits: int):
+            return round(hits / lookups, 3) if lookups else None
+
+        return {
+            **metrics,
+            'entries': entries,
+            'exact_hit_rate': rate(metrics['exact_hits']),
+            'semantic_hit_rate': rate(metrics['semantic_hits']) if self.semantic else None,
+            'hit_rate': rate(metrics['exact_hits'] + metrics['semantic_hits']),
+            'semantic': self.semantic,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+    def _fresh(self, key: CacheKey, now: float) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self.metrics['expirations'] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry.answer
+
+    def _near_key(self, key: CacheKey) -> Optional[tuple]:
+        if not self.semantic:
+            return None
+        words = content_words(key.prompt)
+        # A prompt of nothing but filler ("hello", "okay") isn't a near duplicate of every other one
+        return (key.context, words) if words else None
+
+    def _remove(self, key: CacheKey):
+        entry = self.entries.pop(key, None)
+        if entry is not None and entry.near is not None and self.near.get(entry.near) == key:
+            del self.near[entry.near]
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the LLM response cache if RESPONSE_CACHE_ENABLED"""
+    if not Config.RESPONSE_CACHE_ENABLED:
+        return None
+    cache = ResponseCache()
+    tiers = "exact + near-duplicate" if cache.semantic else "exact"
+    print(f"🗃️ Response cache enabled ({tiers}, {cache.max_entries} entries, {cache.ttl_seconds:.0f}s TTL)")
+    return cache
@@ -0,0 +1,69 @@
+"""
+Ring Buffer Module
+Preallocated, array-backed sample buffer for audio capture
+"""
+
+from typing import List
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO of audio samples.
+
+    Storage is one numpy array allocated up front, so writes never allocate and
+    cost O(chunk). When full, new samples overwrite the oldest ones. Contents are
+    read back as at most two zero-copy views (the data may wrap around the end
+    of the array).
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+        self.overwritten = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    def write(self, samples: np.ndarray):
+        """Append ``samples``, overwriting the oldest data if there isn't room"""
+        count = len(samples)
+        if count >= self.capacity:
+            self.overwritten += self.size + count - self.capacity
+            self.buffer[:] = samples[count - self.capacity:]
+            self.start, self.size = 0, self.capacity
+            return
+        if count > self.free:
+            dropped = count - self.free
+            self.overwritten += dropped
+            self.start = (self.start + dropped) % self.capacity
+            self.size -= dropped
+        end = (self.start + self.size) % self.capacity
+        first = min(count, self.capacity - end)
+        self.buffer[end:end + first] = samples[:first]
+        if first < count:
+            self.buffer[:count - first] = samples[first:]
+        self.size += count
+
+    def segments(self) -> List[np.ndarray]:
+        """Buffered samples, oldest first, as views into the buffer (valid until the next write)"""
+        end = self.start + self.size
+        if end <= self.capacity:
+            return [self.buffer[self.start:end]]
+        return [self.buffer[self.start:], self.buffer[:end - self.capacity]]
+
+    def read(self) -> np.ndarray:
+        """Buffered samples as a new contiguous array"""
+        segments = self.segments()
+        return segments[0].copy() if len(segments) == 1 else np.concatenate(segments)
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
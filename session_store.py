@@ -0,0 +1,265 @@
+"""
+Session Store Module
+Keeps per-client conversation state with TTL, LRU and memory-budget eviction
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from cancellation import Cancelled
+from config import Config
+
+# Rough per-message bookkeeping cost on top of the text itself
+_MESSAGE_OVERHEAD_BYTES = 64
+
+
+class Session:
+    """Conversation state for a single client"""
+
+    def __init__(self, session_id: str, history: list = None, summary: str = "", last_access: float = None):
+        self.session_id = session_id
+        self.history = history if history is not None else []  # List of (role, content) tuples
+        self.summary = summary  # Rolling summary of turns no longer kept verbatim
+        self.last_access = last_access or time.time()
+
+    def reset(self):
+        self.history = []
+        self.summary = ""
+
+    def size_bytes(self) -> int:
+        return len(self.summary) + sum(len(content) + _MESSAGE_OVERHEAD_BYTES for _, content in self.history)
+
+    def trim_to(self, max_bytes: int):
+        """Drop the oldest exchanges until the session fits in ``max_bytes``"""
+        while self.history and self.size_bytes() > max_bytes:
+            del self.history[:2]
+
+    def to_json(self) -> str:
+        return json.dumps({'history': self.history, 'summary': self.summary})
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str, last_access: float = None) -> "Session":
+        data = json.loads(data)
+        history = [tuple(message) for message in data['history']]
+        return cls(session_id, history, data.get('summary', ""), last_access)
+
+
+class MemorySessionStore:
+    """In-process session store, ordered from least to most recently used"""
+
+    def __init__(self, ttl_seconds: int = None, max_sessions: int = None, max_bytes: int = None):
+        self.ttl_seconds = Config.SESSION_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_sessions = Config.SESSION_MAX_COUNT if max_sessions is None else max_sessions
+        self.max_bytes = Config.SESSION_MAX_BYTES if max_bytes is None else max_bytes
+        self.sessions = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session:
+        """Return the session for ``session_id``, creating it if needed"""
+        with self.lock:
+            self._expire()
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = Session(session_id)
+                self.sizes[session_id] = 0
+            self.sessions.move_to_end(session_id)
+            session.last_access = time.time()
+            return session
+
+    def save(self, session: Session):
+        """Record the session's new size and enforce the store limits"""
+        with self.lock:
+            session.trim_to(self.max_bytes)
+            session.last_access = time.time()
+            if session.session_id not in self.sessions:
+                self.sizes[session.session_id] = 0
+            self.sessions[session.session_id] = session
+            self.sessions.move_to_end(session.session_id)
+            size = session.size_bytes()
+            self.total_bytes += size - self.sizes[session.session_id]
+            self.sizes[session.session_id] = size
+            self._evict(keep=session.session_id)
+
+    def reset(self, session_id: str):
+        """Clear the conversation history for one session"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.reset()
+                self.total_bytes -= self.sizes[session_id]
+                self.sizes[session_id] = 0
+
+    def discard(self, session_id: str):
+        with self.lock:
+            self._remove(session_id)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self.sessions),
+                'bytes': self.total_bytes,
+                'evictions': self.evictions,
+            }
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        """Load a session for the duration of a turn and save it afterwards.
+
+        A cancelled turn doesn't save: whatever cancelled it (a newer turn, a
+        reset) owns the session now, and a stale copy would overwrite it.
+        """
+        session = self.get(session_id)
+        try:
+            yield session
+        except Cancelled:
+            raise
+        except BaseException:
+            self.save(session)
+            raise
+        self.save(session)
+
+    def _remove(self, session_id: str):
+        if self.sessions.pop(session_id, None) is not None:
+            self.total_bytes -= self.sizes.pop(session_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            self._remove(session_id)
+            self.evictions += 1
+
+    def _evict(self, keep: str = None):
+        self._expire()
+        for session_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions and self.total_bytes <= self.max_bytes:
+                break
+            if session_id != keep:
+                self._remove(session_id)
+                self.evictions += 1
+
+
+class SQLiteSessionStore:
+    """Session store in a local SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path: str = None, ttl_seconds: int = None, max_sessions: int = None, max_bytes: int = None):
+        self.path = path or Config.SESSION_DB_PATH
+        self.ttl_seconds = Config.SESSION_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_sessions = Config.SESSION_MAX_COUNT if max_sessions is None else max_sessions
+        self.max_bytes = Config.SESSION_MAX_BYTES if max_bytes is None else max_bytes
+        self.evictions = 0
+        self.local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; keep one per thread
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def get(self, session_id: str) -> Session:
+        db = self._connect()
+        now = time.time()
+        row = db.execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND last_access >= ?",
+            (session_id, now - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return Session(session_id, last_access=now)
+        db.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        return Session.from_json(session_id, row[0], now)
+
+    def save(self, session: Session):
+        session.trim_to(self.max_bytes)
+        session.last_access = time.time()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (session.session_id, session.to_json(), session.size_bytes(), session.last_access)
+            )
+            self._evict(db, keep=session.session_id)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def reset(self, session_id: str):
+        self._connect().execute(
+            "UPDATE sessions SET data = ?, size = 0 WHERE session_id = ?",
+            (Session(session_id).to_json(), session_id)
+        )
+
+    def discard(self, session_id: str):
+        self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        count, total = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return {
+            'backend': 'sqlite',
+            'sessions': count,
+            'bytes': total,
+            'evictions': self.evictions,
+        }
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        session = self.get(session_id)
+        try:
+            yield session
+        except Cancelled:
+            raise
+        except BaseException:
+            self.save(session)
+            raise
+        self.save(session)
+
+    def _evict(self, db: sqlite3.Connection, keep: str):
+        expired = db.execute(
+            "DELETE FROM sessions WHERE last_access < ? AND session_id != ?",
+            (time.time() - self.ttl_seconds, keep)
+        ).rowcount
+        self.evictions += expired
+
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        if count <= self.max_sessions and total <= self.max_bytes:
+            return
+        rows = db.execute(
+            "SELECT session_id, size FROM sessions WHERE session_id != ? ORDER BY last_access",
+            (keep,)
+        ).fetchall()
+        for session_id, size in rows:
+            if count <= self.max_sessions and total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            count -= 1
+            total -= size
+            self.evictions += 1
+
+
+def create_session_store():
+    """Build the session store selected by SESSION_BACKEND"""
+    if Config.SESSION_BACKEND == "sqlite":
+        print(f"🗂️ Using SQLite session store: {Config.SESSION_DB_PATH}")
+        return SQLiteSessionStore()
+    return MemorySessionStore()
@@ -10,6 +10,17 @@ class VoiceChatApp {
         this.mediaRecorder = null;
         this.audioChunks = [];
         this.isRecording = false;
+        this.playbackContext = null;
+        this.nextPlayTime = 0;
+        // Stream 16 kHz PCM frames while speaking so the server can transcribe as we go
+        this.streamingSupported = !!(window.AudioContext || window.webkitAudioContext);
+        this.captureContext = null;
+        this.captureSource = null;
+        this.captureNode = null;
+        this.interimMessage = null;
+        // The AI message being filled in by ai_response_delta events
+        this.responseMessage = null;
+        this.turn = 0;  // bumped on barge-in or reset, so a superseded reply stops playing
         
         this.initializeElements();
         this.setupEventListeners();
@@ -78,18 +89,48 @@ class VoiceChatApp {
         });
 
         this.socket.on('transcript', (data) => {
-            this.addMessage('user', data.text);
+            this.showTranscript(data.text, data.final !== false);
+        });
+
+        this.socket.on('ai_response_delta', (data) => {
+            if (data.turn !== this.turn) return;
+            if (!this.responseMessage) {
+                this.responseMessage = this.addMessage('ai', '');
+                this.responseMessage.classList.add('interim');
+            }
+            this.responseMessage.querySelector('.message-content').textContent += data.text;
+            this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
         });
 
         this.socket.on('ai_response', (data) => {
-            this.addMessage('ai', data.text);
+            if (data.turn !== this.turn) return;
+            // The full answer replaces whatever the deltas built up
+            if (this.responseMessage) {
+                this.responseMessage.querySelector('.message-content').textContent = data.text;
+                this.responseMessage.classList.remove('interim');
+                this.responseMessage = null;
+            } else {
+                this.addMessage('ai', data.text);
+            }
         });
 
         this.socket.on('audio_response', (data) => {
-            this.playAudioResponse(data.audio);
+            // Chunks of a turn stopped by barge-in or reset can still be in flight
+            if (data.turn !== this.turn) return;
+            this.playAudioResponse(data.audio, data.sample_rate);
+        });
+
+        this.socket.on('turn_cancelled', (data) => {
+            console.log('Turn cancelled:', data.reason);
+            this.endResponseMessage();
+        });
+
+        this.socket.on('turn_complete', (data) => {
+            console.log('Turn timings:', data.timings);
         });
 
         this.socket.on('error', (data) => {
+            this.endResponseMessage();
             this.updateStatus(`❌ ${data.message}`);
             this.showError(data.message);
         });
@@ -118,6 +159,8 @@ class VoiceChatApp {
 
         this.isRecording = true;
         this.audioChunks = [];
+        // Talking over the reply stops it; the server cancels the rest of the turn
+        this.stopPlayback();
         
         // Update UI
         this.recordBtn.classList.add('recording');
@@ -125,6 +168,11 @@ class VoiceChatApp {
         this.audioVisualizer.classList.add('active');
         this.updateStatus('🎤 Recording...');
 
+        if (this.streamingSupported) {
+            this.startStreaming();
+            return;
+        }
+
         // Start recording
         this.mediaRecorder = new MediaRecorder(this.audioStream, {
             mimeType: 'audio/webm;codecs=opus'
@@ -143,8 +191,45 @@ class VoiceChatApp {
         this.mediaRecorder.start();
     }
 
+    startStreaming() {
+        if (!this.captureContext) {
+            this.captureContext = new (window.AudioContext || window.webkitAudioContext)();
+        }
+        const context = this.captureContext;
+        const source = context.createMediaStreamSource(this.audioStream);
+        this.captureNode = context.createScriptProcessor(4096, 1, 1);
+        this.captureNode.onaudioprocess = (event) => {
+            if (!this.isRecording) return;
+            const pcm = this.downsample(event.inputBuffer.getChannelData(0), context.sampleRate, 16000);
+            this.socket.emit('audio_frame', { audio: pcm.buffer });
+        };
+        source.connect(this.captureNode);
+        this.captureNode.connect(context.destination);
+        this.captureSource = source;
+
+        // Push-to-talk: the turn runs when the button is released
+        this.socket.emit('audio_start', { sample_rate: 16000, endpointing: 'client', binary: true, turn: this.turn });
+    }
+
+    downsample(input, inputRate, outputRate) {
+        // Average each output sample's span of input samples (a cheap low-pass), as 16-bit PCM
+        const ratio = inputRate / outputRate;
+        const output = new Int16Array(Math.floor(input.length / ratio));
+        for (let i = 0; i < output.length; i++) {
+            const start = Math.floor(i * ratio);
+            const end = Math.min(input.length, Math.floor((i + 1) * ratio));
+            let sum = 0;
+            for (let j = start; j < end; j++) {
+                sum += input[j];
+            }
+            const sample = Math.max(-1, Math.min(1, sum / Math.max(1, end - start)));
+            output[i] = sample < 0 ? sample * 32768 : sample * 32767;
+        }
+        return output;
+    }
+
     stopRecording() {
-        if (!this.isRecording || !this.mediaRecorder) return;
+        if (!this.isRecording || (!this.mediaRecorder && !this.captureNode)) return;
 
         this.isRecording = false;
         
@@ -153,6 +238,14 @@ class VoiceChatApp {
         this.recordBtn.innerHTML = '<i class="fas fa-microphone"></i><span>Hold to Speak</span>';
         this.audioVisualizer.classList.remove('active');
         
+        if (this.captureNode) {
+            this.captureSource.disconnect();
+            this.captureNode.disconnect();
+            this.captureNode = null;
+            this.updateStatus('🔎 Transcribing...');
+            this.socket.emit('audio_end');
+            return;
+        }
         this.mediaRecorder.stop();
     }
 
@@ -166,16 +259,9 @@ class VoiceChatApp {
             // Create blob from recorded chunks
             const audioBlob = new Blob(this.audioChunks, { type: 'audio/webm;codecs=opus' });
             
-            // Convert to WAV format
-            const wavBlob = await this.convertToWav(audioBlob);
-            
-            // Convert to base64
-            const reader = new FileReader();
-            reader.onload = () => {
-                const base64Audio = reader.result.split(',')[1];
-                this.socket.emit('audio_data', { audio: base64Audio });
-            };
-            reader.readAsDataURL(wavBlob);
+            // Opus/WebM goes up as recorded; the server prepares it for STT
+            // Sent as a binary attachment, so the reply audio comes back binary too
+            this.socket.emit('audio_data', { audio: await audioBlob.arrayBuffer(), turn: this.turn });
             
         } catch (error) {
             this.showError('Error processing audio: ' + error.message);
@@ -183,92 +269,50 @@ class VoiceChatApp {
         }
     }
 
-    async convertToWav(audioBlob) {
-        // Create audio context
-        const audioContext = new (window.AudioContext || window.webkitAudioContext)();
-        
-        // Convert blob to array buffer
-        const arrayBuffer = await audioBlob.arrayBuffer();
-        
-        // Decode audio data
-        const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
-        
-        // Convert to WAV
-        const wavBuffer = this.audioBufferToWav(audioBuffer);
-        
-        return new Blob([wavBuffer], { type: 'audio/wav' });
-    }
-
-    audioBufferToWav(buffer) {
-        const length = buffer.length;
-        const numberOfChannels = buffer.numberOfChannels;
-        const sampleRate = buffer.sampleRate;
-        const arrayBuffer = new ArrayBuffer(44 + length * numberOfChannels * 2);
-        const view = new DataView(arrayBuffer);
-        
-        // WAV header
-        const writeString = (offset, string) => {
-            for (let i = 0; i < string.length; i++) {
-                view.setUint8(offset + i, string.charCodeAt(i));
-            }
-        };
-        
-        writeString(0, 'RIFF');
-        view.setUint32(4, 36 + length * numberOfChannels * 2, true);
-        writeString(8, 'WAVE');
-        writeString(12, 'fmt ');
-        view.setUint32(16, 16, true);
-        view.setUint16(20, 1, true);
-        view.setUint16(22, numberOfChannels, true);
-        view.setUint32(24, sampleRate, true);
-        view.setUint32(28, sampleRate * numberOfChannels * 2, true);
-        view.setUint16(32, numberOfChannels * 2, true);
-        view.setUint16(34, 16, true);
-        writeString(36, 'data');
-        view.setUint32(40, length * numberOfChannels * 2, true);
-        
-        // PCM data
-        let offset = 44;
-        for (let i = 0; i < length; i++) {
-            for (let channel = 0; channel < numberOfChannels; channel++) {
-                const sample = Math.max(-1, Math.min(1, buffer.getChannelData(channel)[i]));
-                view.setInt16(offset, sample < 0 ? sample * 0x8000 : sample * 0x7FFF, true);
-                offset += 2;
-            }
+    decodePcm(pcm) {
+        // Binary transports hand over an ArrayBuffer; the JSON ones a base64 string
+        if (typeof pcm !== 'string') {
+            return new Int16Array(pcm, 0, pcm.byteLength >> 1);
         }
-        
-        return arrayBuffer;
+        const audioData = atob(pcm);
+        const samples = new Int16Array(audioData.length >> 1);
+        for (let i = 0; i < samples.length; i++) {
+            samples[i] = audioData.charCodeAt(2 * i) | (audioData.charCodeAt(2 * i + 1) << 8);
+        }
+        return samples;
     }
 
-    playAudioResponse(base64Audio) {
+    playAudioResponse(pcm, sampleRate) {
+        // Reply audio streams in as raw 16-bit PCM chunks; schedule each one
+        // right after the previous so playback starts on the first chunk
         try {
-            const audioData = atob(base64Audio);
-            const arrayBuffer = new ArrayBuffer(audioData.length);
-            const uint8Array = new Uint8Array(arrayBuffer);
-            
-            for (let i = 0; i < audioData.length; i++) {
-                uint8Array[i] = audioData.charCodeAt(i);
+            if (!this.playbackContext) {
+                this.playbackContext = new (window.AudioContext || window.webkitAudioContext)();
             }
+            const context = this.playbackContext;
             
-            const audioBlob = new Blob([arrayBuffer], { type: 'audio/wav' });
-            const audioUrl = URL.createObjectURL(audioBlob);
-            const audio = new Audio(audioUrl);
+            const samples = this.decodePcm(pcm);
             
-            audio.onloadeddata = () => {
-                this.updateStatus('🔊 Playing response...');
-            };
+            const buffer = context.createBuffer(1, samples.length, sampleRate);
+            const channel = buffer.getChannelData(0);
+            for (let i = 0; i < samples.length; i++) {
+                channel[i] = samples[i] / 32768;
+            }
             
-            audio.onended = () => {
-                this.updateStatus('🎤 Ready to listen...');
-                URL.revokeObjectURL(audioUrl);
-            };
+            const source = context.createBufferSource();
+            source.buffer = buffer;
+            source.connect(context.destination);
             
-            audio.onerror = () => {
-                this.updateStatus('❌ Audio playback failed');
-                URL.revokeObjectURL(audioUrl);
-            };
+            const startAt = Math.max(context.currentTime, this.nextPlayTime);
+            source.start(startAt);
+            this.nextPlayTime = startAt + buffer.duration;
+            this.updateStatus('🔊 Playing response...');
             
-            audio.play();
+            source.onended = () => {
+                if (context.currentTime >= this.nextPlayTime - 0.05) {
+                    this.updateStatus('🎤 Ready to listen...');
+                }
+            };
             
         } catch (error) {
             this.showError('Error playing audio: ' + error.message);
@@ -276,6 +320,36 @@ class VoiceChatApp {
         }
     }
 
+    stopPlayback() {
+        this.turn++;
+        if (this.playbackContext) {
+            this.playbackContext.close();
+            this.playbackContext = null;
+        }
+        this.nextPlayTime = 0;
+    }
+
+    showTranscript(text, final) {
+        // Interim transcripts update one message in place until the final one arrives
+        if (!this.interimMessage) {
+            this.interimMessage = this.addMessage('user', text);
+        } else {
+            this.interimMessage.querySelector('.message-content').textContent = text;
+        }
+        this.interimMessage.classList.toggle('interim', !final);
+        if (final) {
+            this.interimMessage = null;
+        }
+    }
+
+    endResponseMessage() {
+        // A reply cut short keeps the text that had arrived
+        if (this.responseMessage) {
+            this.responseMessage.classList.remove('interim');
+            this.responseMessage = null;
+        }
+    }
+
     addMessage(type, content) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}-message`;
@@ -299,6 +373,7 @@ class VoiceChatApp {
         
         this.chatMessages.appendChild(messageDiv);
         this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+        return messageDiv;
     }
 
     updateStatus(message) {
@@ -311,7 +386,10 @@ class VoiceChatApp {
     }
 
     resetConversation() {
+        this.stopPlayback();
         this.socket.emit('reset_conversation');
+        this.interimMessage = null;
+        this.responseMessage = null;
         this.chatMessages.innerHTML = `
             <div class="welcome-message">
                 <i class="fas fa-microphone"></i>
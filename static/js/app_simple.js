@@ -3,6 +3,9 @@ class SimpleVoiceChatApp {
         this.mediaRecorder = null;
         this.audioChunks = [];
         this.isRecording = false;
+        this.playbackContext = null;
+        this.nextPlayTime = 0;
+        this.turn = 0;  // bumped on barge-in or reset, so a superseded reply stops playing
         
         this.initializeElements();
         this.setupEventListeners();
@@ -75,6 +78,8 @@ class SimpleVoiceChatApp {
 
         this.isRecording = true;
         this.audioChunks = [];
+        // Talking over the reply stops it; the server cancels the rest of the turn
+        this.stopPlayback();
         
         // Update UI
         this.recordBtn.classList.add('recording');
@@ -123,16 +128,8 @@ class SimpleVoiceChatApp {
             // Create blob from recorded chunks
             const audioBlob = new Blob(this.audioChunks, { type: 'audio/webm;codecs=opus' });
             
-            // Convert to WAV format
-            const wavBlob = await this.convertToWav(audioBlob);
-            
-            // Convert to base64
-            const reader = new FileReader();
-            reader.onload = async () => {
-                const base64Audio = reader.result.split(',')[1];
-                await this.sendAudioToServer(base64Audio);
-            };
-            reader.readAsDataURL(wavBlob);
+            // Opus/WebM goes up as recorded; the server prepares it for STT
+            await this.sendAudioToServer(audioBlob);
             
         } catch (error) {
             this.showError('Error processing audio: ' + error.message);
@@ -140,36 +137,57 @@ class SimpleVoiceChatApp {
         }
     }
 
-    async sendAudioToServer(audioBase64) {
+    async sendAudioToServer(audioBlob) {
         try {
             this.updateStatus('🔎 Transcribing...');
+            const turn = this.turn;
             
-            const response = await fetch('/process_audio', {
+            // The reply is streamed as binary frames so the first sentence plays
+            // while the rest of the answer is still being generated
+            const response = await fetch('/process_audio_stream', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json',
+                    'Content-Type': audioBlob.type,
+                    'Accept': 'application/octet-stream',
                 },
-                body: JSON.stringify({ audio: audioBase64 })
+                body: audioBlob
             });
 
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
+            const sampleRate = Number(response.headers.get('X-Sample-Rate'));
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffered = new Uint8Array(0);
             
-            if (data.error) {
-                throw new Error(data.error);
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                if (turn !== this.turn) {
+                    reader.cancel();
+                    return;
+                }
+                const joined = new Uint8Array(buffered.length + value.length);
+                joined.set(buffered);
+                joined.set(value, buffered.length);
+                buffered = joined;
+                
+                // Frame: 1-byte kind ('j' JSON event, 'a' PCM), uint32 little-endian length, payload
+                while (buffered.length >= 5) {
+                    const length = new DataView(buffered.buffer, buffered.byteOffset + 1, 4).getUint32(0, true);
+                    if (buffered.length < 5 + length) break;
+                    const kind = String.fromCharCode(buffered[0]);
+                    const payload = buffered.slice(5, 5 + length);
+                    buffered = buffered.slice(5 + length);
+                    if (kind === 'a') {
+                        this.playAudioResponse(payload.buffer, sampleRate);
+                    } else {
+                        this.handleTurnEvent(JSON.parse(decoder.decode(payload)));
+                    }
+                }
             }
-
-            // Display transcript
-            this.addMessage('user', data.transcript);
-            
-            // Display AI response
-            this.addMessage('ai', data.response);
-            
-            // Play audio response
-            this.playAudioResponse(data.audio);
             
         } catch (error) {
             this.showError('Server error: ' + error.message);
@@ -177,92 +195,73 @@ class SimpleVoiceChatApp {
         }
     }
 
-    async convertToWav(audioBlob) {
-        // Create audio context
-        const audioContext = new (window.AudioContext || window.webkitAudioContext)();
-        
-        // Convert blob to array buffer
-        const arrayBuffer = await audioBlob.arrayBuffer();
-        
-        // Decode audio data
-        const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
-        
-        // Convert to WAV
-        const wavBuffer = this.audioBufferToWav(audioBuffer);
-        
-        return new Blob([wavBuffer], { type: 'audio/wav' });
+    handleTurnEvent(event) {
+        switch (event.type) {
+            case 'transcript':
+                this.addMessage('user', event.text);
+                this.updateStatus('🤖 Generating response...');
+                break;
+            case 'audio_chunk':
+                this.playAudioResponse(event.audio, event.sample_rate);
+                break;
+            case 'response':
+                this.addMessage('ai', event.text);
+                break;
+            case 'done':
+                console.log('Turn timings:', event.timings);
+                break;
+            case 'cancelled':
+                console.log('Turn cancelled:', event.reason);
+                break;
+            case 'error':
+                throw new Error(event.error);
+        }
     }
 
-    audioBufferToWav(buffer) {
-        const length = buffer.length;
-        const numberOfChannels = buffer.numberOfChannels;
-        const sampleRate = buffer.sampleRate;
-        const arrayBuffer = new ArrayBuffer(44 + length * numberOfChannels * 2);
-        const view = new DataView(arrayBuffer);
-        
-        // WAV header
-        const writeString = (offset, string) => {
-            for (let i = 0; i < string.length; i++) {
-                view.setUint8(offset + i, string.charCodeAt(i));
-            }
-        };
-        
-        writeString(0, 'RIFF');
-        view.setUint32(4, 36 + length * numberOfChannels * 2, true);
-        writeString(8, 'WAVE');
-        writeString(12, 'fmt ');
-        view.setUint32(16, 16, true);
-        view.setUint16(20, 1, true);
-        view.setUint16(22, numberOfChannels, true);
-        view.setUint32(24, sampleRate, true);
-        view.setUint32(28, sampleRate * numberOfChannels * 2, true);
-        view.setUint16(32, numberOfChannels * 2, true);
-        view.setUint16(34, 16, true);
-        writeString(36, 'data');
-        view.setUint32(40, length * numberOfChannels * 2, true);
-        
-        // PCM data
-        let offset = 44;
-        for (let i = 0; i < length; i++) {
-            for (let channel = 0; channel < numberOfChannels; channel++) {
-                const sample = Math.max(-1, Math.min(1, buffer.getChannelData(channel)[i]));
-                view.setInt16(offset, sample < 0 ? sample * 0x8000 : sample * 0x7FFF, true);
-                offset += 2;
-            }
+    decodePcm(pcm) {
+        // Binary transports hand over an ArrayBuffer; the JSON ones a base64 string
+        if (typeof pcm !== 'string') {
+            return new Int16Array(pcm, 0, pcm.byteLength >> 1);
         }
-        
-        return arrayBuffer;
+        const audioData = atob(pcm);
+        const samples = new Int16Array(audioData.length >> 1);
+        for (let i = 0; i < samples.length; i++) {
+            samples[i] = audioData.charCodeAt(2 * i) | (audioData.charCodeAt(2 * i + 1) << 8);
+        }
+        return samples;
     }
 
-    playAudioResponse(base64Audio) {
+    playAudioResponse(pcm, sampleRate) {
+        // Reply audio streams in as raw 16-bit PCM chunks; schedule each one
+        // right after the previous so playback starts on the first chunk
         try {
-            const audioData = atob(base64Audio);
-            const arrayBuffer = new ArrayBuffer(audioData.length);
-            const uint8Array = new Uint8Array(arrayBuffer);
-            
-            for (let i = 0; i < audioData.length; i++) {
-                uint8Array[i] = audioData.charCodeAt(i);
+            if (!this.playbackContext) {
+                this.playbackContext = new (window.AudioContext || window.webkitAudioContext)();
             }
+            const context = this.playbackContext;
             
-            const audioBlob = new Blob([arrayBuffer], { type: 'audio/wav' });
-            const audioUrl = URL.createObjectURL(audioBlob);
-            const audio = new Audio(audioUrl);
+            const samples = this.decodePcm(pcm);
             
-            audio.onloadeddata = () => {
-                this.updateStatus('🔊 Playing response...');
-            };
+            const buffer = context.createBuffer(1, samples.length, sampleRate);
+            const channel = buffer.getChannelData(0);
+            for (let i = 0; i < samples.length; i++) {
+                channel[i] = samples[i] / 32768;
+            }
             
-            audio.onended = () => {
-                this.updateStatus('🎤 Ready to listen...');
-                URL.revokeObjectURL(audioUrl);
-            };
+            const source = context.createBufferSource();
+            source.buffer = buffer;
+            source.connect(context.destination);
             
-            audio.onerror = () => {
-                this.updateStatus('❌ Audio playback failed');
-                URL.revokeObjectURL(audioUrl);
-            };
+            const startAt = Math.max(context.currentTime, this.nextPlayTime);
+            source.start(startAt);
+            this.nextPlayTime = startAt + buffer.duration;
+            this.updateStatus('🔊 Playing response...');
             
-            audio.play();
+            source.onended = () => {
+                if (context.currentTime >= this.nextPlayTime - 0.05) {
+                    this.updateStatus('🎤 Ready to listen...');
+                }
+            };
             
         } catch (error) {
             this.showError('Error playing audio: ' + error.message);
@@ -270,6 +269,15 @@ class SimpleVoiceChatApp {
         }
     }
 
+    stopPlayback() {
+        this.turn++;
+        if (this.playbackContext) {
+            this.playbackContext.close();
+            this.playbackContext = null;
+        }
+        this.nextPlayTime = 0;
+    }
+
     addMessage(type, content) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}-message`;
@@ -305,6 +313,7 @@ class SimpleVoiceChatApp {
     }
 
     async resetConversation() {
+        this.stopPlayback();
         try {
             const response = await fetch('/reset', {
                 method: 'POST',
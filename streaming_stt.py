@@ -0,0 +1,126 @@
+"""
+Streaming STT Module
+Transcribes live audio segment by segment while the user is still speaking
+"""
+
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, List, Optional
+import numpy as np
+from audio_format import wav_bytes
+from config import Config
+from vad import create_endpointer
+
+
+class StreamingTranscriber:
+    """Cuts a live stream of 16-bit mono PCM into segments at pauses and transcribes each one as it closes.
+
+    A segment closes when the VAD sees ``segment_pause_ms`` of silence (or
+    after ``max_segment_seconds`` of unbroken speech) and goes to ``transcribe``
+    on ``executor`` straight away, so by the time the speaker stops, usually
+    only the last segment is left to transcribe. Speech ends after
+    VAD_HANGOVER_MS of silence, or when the caller says so with ``finish``.
+
+    ``feed`` returns events for the caller to forward:
+
+    - ``{'type': 'interim', 'text': ..., 'segments': n}`` when the transcript so far grows
+    - ``{'type': 'end_of_speech'}`` once the VAD decides the speaker has stopped
+    """
+
+    def __init__(self, transcribe: Callable[[bytes], str], executor: Executor, sample_rate: int,
+                 segment_pause_ms: int = None, max_segment_seconds: float = None):
+        self.transcribe = transcribe
+        self.executor = executor
+        self.sample_rate = sample_rate
+        self.segment_pause_ms = Config.STREAMING_SEGMENT_PAUSE_MS if segment_pause_ms is None else segment_pause_ms
+        max_segment_seconds = Config.STREAMING_MAX_SEGMENT_SECONDS if max_segment_seconds is None else max_segment_seconds
+        self.max_segment_samples = int(max_segment_seconds * sample_rate)
+        self.endpointer = create_endpointer(sample_rate, 1, hangover_ms=self.segment_pause_ms)
+        # Silence after a segment closes that still has to pass before speech has ended
+        self.end_of_speech_samples = max(0, Config.VAD_HANGOVER_MS - self.segment_pause_ms) * sample_rate // 1000
+        self.lock = threading.RLock()  # a segment that is already transcribed reports back on this thread
+        self.carry = b""  # odd trailing byte of the last frame, completed by the next one
+        self._start_utterance()
+
+    def _start_utterance(self):
+        self.parts: List[np.ndarray] = []
+        self.part_samples = 0
+        self.pending: List[Future] = []
+        self.texts: List[Optional[str]] = []
+        self.reported = 0
+        self.last_segment_end = None  # stream position where the last segment closed
+        self.ended = False
+
+    def feed(self, pcm: bytes) -> List[dict]:
+        """Consume a frame of captured audio; a frame may end partway through a sample"""
+        events = []
+        with self.lock:
+            pcm = self.carry + pcm
+            whole = len(pcm) - len(pcm) % 2
+            self.carry = pcm[whole:]
+            for event in self.endpointer.feed(np.frombuffer(pcm, dtype=np.int16, count=whole // 2)):
+                if event.kind == 'end':
+                    self._close_segment()
+                    self.last_segment_end = event.offset
+                    continue
+                self.parts.append(event.samples)
+                self.part_samples += len(event.samples)
+                if self.part_samples >= self.max_segment_samples:
+                    self._close_segment()
+            events += self._interim()
+            if (not self.ended and self.last_segment_end is not None and not self.endpointer.in_speech
+                    and self.endpointer.position - self.last_segment_end >= self.end_of_speech_samples):
+                self.ended = True
+                events.append({'type': 'end_of_speech'})
+        return events
+
+    def finish(self) -> tuple:
+        """Close the utterance, wait for its outstanding segments and return ``(transcript, timings)``.
+
+        ``timings['stt']`` is only the time spent after speech ended, which is
+        all the transcription the turn still has to wait for.
+        """
+        started_at = time.perf_counter()
+        with self.lock:
+            self._close_segment()
+            self.endpointer.end_utterance()
+            pending = self.pending
+        texts = []
+        for future in pending:
+            try:
+                texts.append(future.result())
+            except Exception as e:
+                print(f"⚠️ Streaming STT segment failed: {e}")
+        with self.lock:
+            self._start_utterance()
+        transcript = " ".join(text.strip() for text in texts if text and text.strip())
+        return transcript, {'stt': time.perf_counter() - started_at, 'stt_segments': len(pending)}
+
+    def _close_segment(self):
+        if not self.parts:
+            return
+        wav = wav_bytes([memoryview(part) for part in self.parts], self.sample_rate)
+        self.parts = []
+        self.part_samples = 0
+        index = len(self.pending)
+        self.texts.append(None)
+        future = self.executor.submit(self.transcribe, wav)
+        self.pending.append(future)
+        future.add_done_callback(lambda done: self._segment_done(index, done))
+
+    def _segment_done(self, index: int, future: Future):
+        with self.lock:
+            if index < len(self.texts) and future in self.pending:
+                self.texts[index] = "" if future.exception() else future.result()
+
+    def _interim(self) -> List[dict]:
+        """An interim event if more leading segments have been transcribed since the last one"""
+        done = 0
+        while done < len(self.texts) and self.texts[done] is not None:
+            done += 1
+        if done <= self.reported:
+            return []
+        self.reported = done
+        text = " ".join(text.strip() for text in self.texts[:done] if text and text.strip())
+        return [{'type': 'interim', 'text': text, 'segments': done}] if text else []
@@ -0,0 +1,283 @@
+"""
+STT Strategy Module
+Chooses speech-to-text model settings, hedging slow requests and remembering which settings work
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, List
+from cancellation import CancelToken, Cancelled
+from config import Config
+from metrics import metrics
+
+
+class STTOption:
+    """One model/parameter combination the STT API can be called with"""
+
+    def __init__(self, model_id: str, language_code: str = None):
+        self.params = {'model_id': model_id}
+        if language_code:
+            self.params['language_code'] = language_code
+        self.name = f"{model_id}/{language_code}" if language_code else model_id
+
+    @classmethod
+    def parse_list(cls, spec: str) -> List["STTOption"]:
+        """Parse ``model[:language],...`` such as ``scribe_v1:en,scribe_v1``"""
+        options = []
+        for item in spec.split(','):
+            item = item.strip()
+            if item:
+                model_id, _, language_code = item.partition(':')
+                options.append(cls(model_id.strip(), language_code.strip() or None))
+        return options
+
+
+class OptionHealth:
+    """Recent latencies and failures for one STTOption"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class HedgedSTT:
+    """Runs an STT call over a ranked list of options.
+
+    The option that last succeeded is tried first. If it hasn't answered by the
+    ``hedge_percentile`` of its recent latencies, the next option is started in
+    parallel (up to ``max_parallel`` in flight) and the first good answer wins.
+    A failure starts the next option straight away, and puts the failing option
+    in a cooldown that grows with repeated failures so later calls skip it.
+
+    The strategy doesn't know how to talk to the API: ``transcribe`` and
+    ``transcribe_async`` take a callable ``(upload, params) -> text`` and pass
+    ``upload`` (e.g. the convert call's file arguments) through untouched, so
+    the sync and asyncio clients share the same policy.
+    """
+
+    # Latency samples needed before the percentile replaces hedge_delay
+    MIN_SAMPLES = 5
+
+    def __init__(self, options: List[STTOption] = None, max_parallel: int = None,
+                 hedge_percentile: float = None, hedge_delay: float = None,
+                 cooldown_seconds: float = None, window: int = 50, workers: int = 8):
+        self.options = options or STTOption.parse_list(Config.STT_OPTIONS)
+        self.max_parallel = max(1, Config.STT_MAX_PARALLEL if max_parallel is None else max_parallel)
+        self.hedge_percentile = Config.STT_HEDGE_PERCENTILE if hedge_percentile is None else hedge_percentile
+        self.hedge_delay = Config.STT_HEDGE_DELAY_SECONDS if hedge_delay is None else hedge_delay
+        self.cooldown_seconds = Config.STT_FAILURE_COOLDOWN_SECONDS if cooldown_seconds is None else cooldown_seconds
+        self.health = {option.name: OptionHealth(window) for option in self.options}
+        self.preferred = self.options[0].name
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt")
+
+    def ranked(self) -> List[STTOption]:
+        """Options in the order to try them: preferred first, cooling-down ones last"""
+        now = time.time()
+        with self.lock:
+            return sorted(
+                self.options,
+                key=lambda option: (
+                    self.health[option.name].cooldown_until > now,
+                    option.name != self.preferred,
+                )
+            )
+
+    def hedge_after(self, option: STTOption) -> float:
+        """Seconds to wait on ``option`` before starting a hedge request"""
+        with self.lock:
+            health = self.health[option.name]
+            if len(health.latencies) < self.MIN_SAMPLES:
+                return self.hedge_delay
+            return health.percentile(self.hedge_percentile)
+
+    def record_success(self, option: STTOption, seconds: float, decided: threading.Event = None):
+        """Record a good answer; only the first answer of a call becomes the preferred option"""
+        with self.lock:
+            health = self.health[option.name]
+            health.latencies.append(seconds)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.cooldown_until = 0.0
+            if decided is None or not decided.is_set():
+                self.preferred = option.name
+            if decided is not None:
+                decided.set()
+
+    def record_failure(self, option: STTOption, error: Exception):
+        with self.lock:
+            health = self.health[option.name]
+            health.failures += 1
+            health.consecutive_failures += 1
+            cooldown = self.cooldown_seconds * 2 ** min(health.consecutive_failures - 1, 5)
+            health.cooldown_until = time.time() + cooldown
+        print(f"⚠️ STT option {option.name} failed ({error}); skipping it for {cooldown:.0f}s")
+
+    def _attempt(self, call: Callable, option: STTOption, upload: Any, decided: threading.Event) -> str:
+        started_at = time.perf_counter()
+        try:
+            with metrics.span('stt_attempt', option=option.name):
+                text = call(upload, dict(option.params))
+        except Exception as e:
+            self.record_failure(option, e)
+            raise
+        self.record_success(option, time.perf_counter() - started_at, decided)
+        return text
+
+    def _record_hedge(self, option: STTOption):
+        with self.lock:
+            self.hedges += 1
+        print(f"🔀 Hedging STT with {option.name}")
+
+    def _record_win(self, option: STTOption, hedged: set):
+        if option.name in hedged:
+            with self.lock:
+                self.hedge_wins += 1
+
+    def transcribe(self, upload: Any, call: Callable[[Any, dict], str], cancel: CancelToken = None) -> str:
+        """Run ``call`` on worker threads, hedging and failing over between options.
+
+        Threads can't be interrupted, so a losing request still runs to completion
+        in the background; its outcome only updates the health stats. The same
+        goes for requests abandoned when ``cancel`` fires, which raises
+        ``Cancelled`` without waiting for them.
+        """
+        remaining = self.ranked()
+        pending = {}
+        hedged = set()
+        decided = threading.Event()
+        last_error = None
+        woken = Future()  # completes on cancel, so the wait below returns at once
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+            cancel.on_cancel(lambda: woken.set_result(None))
+
+        def start(hedge: bool = False):
+            option = remaining.pop(0)
+            # In the caller's context, so the attempt's span is tagged with the turn's session
+            attempt = self.executor.submit(contextvars.copy_context().run, self._attempt, call, option, upload, decided)
+            pending[attempt] = option
+            if hedge:
+                hedged.add(option.name)
+                self._record_hedge(option)
+            return option
+
+        primary = start()
+        try:
+            while pending:
+                can_hedge = remaining and len(pending) < self.max_parallel
+                done, _ = wait([*pending, woken], timeout=self.hedge_after(primary) if can_hedge else None,
+                               return_when=FIRST_COMPLETED)
+                if woken.done():
+                    cancel.note('stt_abandoned', len(pending))
+                    raise Cancelled(cancel.reason)
+                if not done:
+                    start(hedge=True)
+                    continue
+                for future in done:
+                    option = pending.pop(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    self._record_win(option, hedged)
+                    return text
+                if remaining and not pending:
+                    primary = start()
+                elif remaining and hedged and len(pending) < self.max_parallel:
+                    # Already hedging: refill the slot a failed request freed up
+                    start(hedge=True)
+        finally:
+            for future in pending:
+                future.cancel()
+        raise last_error
+
+    async def transcribe_async(self, upload: Any, call: Callable[[Any, dict], Awaitable[str]]) -> str:
+        """asyncio version of ``transcribe``; losing requests are cancelled outright"""
+        remaining = self.ranked()
+        pending = {}
+        hedged = set()
+        last_error = None
+
+        decided = threading.Event()
+
+        async def attempt(option: STTOption) -> str:
+            started_at = time.perf_counter()
+            try:
+                with metrics.span('stt_attempt', option=option.name):
+                    text = await call(upload, dict(option.params))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.record_failure(option, e)
+                raise
+            self.record_success(option, time.perf_counter() - started_at, decided)
+            return text
+
+        def start(hedge: bool = False):
+            option = remaining.pop(0)
+            pending[asyncio.ensure_future(attempt(option))] = option
+            if hedge:
+                hedged.add(option.name)
+                self._record_hedge(option)
+            return option
+
+        primary = start()
+        try:
+            while pending:
+                can_hedge = remaining and len(pending) < self.max_parallel
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_after(primary) if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    start(hedge=True)
+                    continue
+                for task in done:
+                    option = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    self._record_win(option, hedged)
+                    return task.result()
+                if remaining and not pending:
+                    primary = start()
+                elif remaining and hedged and len(pending) < self.max_parallel:
+                    # Already hedging: refill the slot a failed request freed up
+                    start(hedge=True)
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {
+                'preferred': self.preferred,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'options': {
+                    name: {
+                        'successes': health.successes,
+                        'failures': health.failures,
+                        'cooling_down': health.cooldown_until > now,
+                        'p50_seconds': round(health.percentile(0.5), 3) if health.latencies else None,
+                        'hedge_after_seconds': round(health.percentile(self.hedge_percentile), 3)
+                        if len(health.latencies) >= self.MIN_SAMPLES else self.hedge_delay,
+                    }
+                    for name, health in self.health.items()
+                },
+            }
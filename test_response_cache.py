@@ -0,0 +1,52 @@
+"""
+Response Cache Tests
+Rewordings share a cached answer; questions that ask something else never do
+"""
+
+import pytest
+from response_cache import ResponseCache
+
+REWORDINGS = [
+    ("Who is Elon Musk?", "Can you tell me who Elon Musk is?"),
+    ("Tell me a joke.", "Hey, could you please tell me a joke?"),
+    ("What's the capital of France?", "What is the capital of France, please?"),
+]
+# Differ only in pronouns, time, tense or one name or number: a shared answer would be wrong
+COLLISIONS = [
+    ("Tell me about you.", "Tell you about me."),
+    ("What is the weather?", "What is the weather now?"),
+    ("What is your name?", "What is my name?"),
+    ("Will it rain?", "Would it rain?"),
+    ("What is the capital of France?", "What is the capital of Spain?"),
+    ("What is 2 plus 2?", "What is 2 plus 3?"),
+    ("Is France bigger than Spain?", "Is Spain bigger than France?"),
+    ("Hello", "Okay"),
+]
+
+
+def cached(cached_prompt: str, asked_prompt: str, history: list = ()):
+    cache = ResponseCache(semantic=True, ttl_seconds=60)
+    cache.put(cache.key(cached_prompt, None, []), "answer")
+    return cache.get(cache.key(asked_prompt, None, list(history)))
+
+
+@pytest.mark.parametrize("cached_prompt, asked_prompt", REWORDINGS)
+def test_rewording_hits(cached_prompt, asked_prompt):
+    assert cached(cached_prompt, asked_prompt) == "answer"
+
+
+@pytest.mark.parametrize("cached_prompt, asked_prompt", COLLISIONS)
+def test_different_question_misses(cached_prompt, asked_prompt):
+    assert cached(cached_prompt, asked_prompt) is None
+    assert cached(asked_prompt, cached_prompt) is None
+
+
+def test_different_context_misses():
+    assert cached("Who is Elon Musk?", "Who is Elon Musk?", [("user", "hi"), ("assistant", "hello")]) is None
+
+
+def test_exact_tier_only_without_semantic():
+    cache = ResponseCache(semantic=False, ttl_seconds=60)
+    cache.put(cache.key("Who is Elon Musk?", None, []), "answer")
+    assert cache.get(cache.key("who is elon musk", None, [])) == "answer"
+    assert cache.get(cache.key("Tell me who Elon Musk is.", None, [])) is None
@@ -0,0 +1,31 @@
+"""
+Transliteration Tests
+Expected English output of the transliteration engine for Hindi, mixed and English transcripts
+"""
+
+import pytest
+from transliteration import to_english
+
+# (transcript, expected to_english output)
+CASES = [
+    ("What is the weather like today?", "What is the weather like today?"),
+    ("व्हू इज प्राइम मिनिस्टर ऑफ इंडिया", "Who is Prime Minister of India"),
+    ("इलोन मस्क कौन है", "Elon Musk who is"),
+    ("आप कैसे हैं", "you how are"),        # the old loop turned "हैं" into "isं" ("है" came first)
+    ("काम", "kaam"),                        # a phrase ("का") inside a word is left alone
+    ("नमस्ते", "namaste"),                  # conjunct स्त, final vowel sign
+    ("मित्र", "mitra"),                      # a conjunct keeps its final "a"
+    ("कमल", "kamal"),                        # word-final schwa dropped
+    ("न", "na"),                             # one-letter word keeps it
+    ("कृष्ण", "krishna"),
+    ("दिल्ली", "dillee"),
+    ("ज़िंदगी", "zindagee"),                 # nukta, precomposed
+    ("पढ़ाई", "parhaaee"),                   # nukta, consonant + combining sign
+    ("क्रिकेट २०२४ में।", "kriket 2024 in."),
+    ("Hello भारत", "Hello India"),
+]
+
+
+@pytest.mark.parametrize("transcript, expected", CASES)
+def test_to_english(transcript, expected):
+    assert to_english(transcript) == expected
@@ -5,6 +5,7 @@ Test if ElevenLabs TTS and audio playback are working
 
 from elevenlabs_client import ElevenLabsClient
 from config import Config
+from playback import create_playback
 
 def test_tts():
     print("🧪 Testing ElevenLabs TTS...")
@@ -19,13 +20,15 @@ def test_tts():
     
     try:
         # Generate audio
-        audio_bytes = client.tts(test_text)
+        playback = create_playback(client.SAMPLE_RATE)
+        audio_bytes = client.tts(test_text, sample_rate=playback.sample_rate)
         print(f"✅ TTS successful! Generated {len(audio_bytes)} bytes of audio")
         
         # Test playback
         print("🔊 Playing audio...")
-        client.play_audio(audio_bytes)
-        print("✅ Audio playback completed")
+        playback.play(audio_bytes)
+        print(f"✅ Audio playback completed ({playback.stats()})")
+        playback.close()
         
     except Exception as e:
         print(f"❌ Error: {e}")
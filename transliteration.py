@@ -0,0 +1,178 @@
+"""
+Transliteration Module
+Turns transcripts that came back in Devanagari script into English words or Latin phonetics
+"""
+
+import re
+from typing import Dict
+
+# Common Hindi words and phrases the STT returns in Devanagari, with their English meaning
+PHRASES: Dict[str, str] = {
+    'प्राइम मिनिस्टर ऑफ इंडिया': 'Prime Minister of India',
+    'व्हू इज': 'Who is',
+    'इलोन मस्क': 'Elon Musk',
+    'नरेंद्र मोदी': 'Narendra Modi',
+    'भारत': 'India',
+    'प्रधानमंत्री': 'Prime Minister',
+    'क्या': 'what',
+    'कौन': 'who',
+    'कहाँ': 'where',
+    'कब': 'when',
+    'कैसे': 'how',
+    'क्यों': 'why',
+    'है': 'is',
+    'हैं': 'are',
+    'था': 'was',
+    'थे': 'were',
+    'में': 'in',
+    'का': 'of',
+    'के': 'of',
+    'की': 'of',
+    'और': 'and',
+    'लेकिन': 'but',
+    'या': 'or',
+    'नहीं': 'not',
+    'हाँ': 'yes',
+    'बहुत': 'very',
+    'अच्छा': 'good',
+    'बुरा': 'bad',
+    'बड़ा': 'big',
+    'छोटा': 'small',
+    'नया': 'new',
+    'पुराना': 'old',
+    'सही': 'correct',
+    'गलत': 'wrong',
+    'आज': 'today',
+    'कल': 'yesterday',
+    'परसों': 'day after tomorrow',
+    'अभी': 'now',
+    'फिर': 'then',
+    'भी': 'too',
+    'सिर्फ': 'only',
+    'मैं': 'I',
+    'मुझे': 'me',
+    'मेरा': 'my',
+    'मेरी': 'my',
+    'मेरे': 'my',
+    'आप': 'you',
+    'आपका': 'your',
+    'आपकी': 'your',
+    'आपके': 'your',
+    'उसका': 'his/her',
+    'उसकी': 'his/her',
+    'उसके': 'his/her',
+    'यह': 'this',
+    'वह': 'that',
+    'यहाँ': 'here',
+    'वहाँ': 'there',
+}
+
+NUKTA = '़'
+VIRAMA = '्'
+
+CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'ng',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'ny',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n', 'ऩ': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ऱ': 'r', 'ल': 'l', 'ळ': 'l', 'ऴ': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+}
+
+# Consonants with a nukta, which Unicode may encode as one code point or as consonant + nukta
+NUKTA_CONSONANTS = {
+    'क': 'q', 'ख': 'kh', 'ग': 'gh', 'ज': 'z', 'ड': 'r', 'ढ': 'rh', 'फ': 'f', 'य': 'y',
+}
+PRECOMPOSED_NUKTA = {
+    'क़': 'क', 'ख़': 'ख', 'ग़': 'ग', 'ज़': 'ज',
+    'ड़': 'ड', 'ढ़': 'ढ', 'फ़': 'फ', 'य़': 'य',
+}
+
+# Dependent vowel signs (matras), which replace a consonant's inherent "a"; the virama removes it
+MARKS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ee', 'ु': 'u', 'ू': 'oo', 'ृ': 'ri', 'ॄ': 'ree',
+    'ॅ': 'e', 'ॆ': 'e', 'े': 'e', 'ै': 'ai', 'ॉ': 'o', 'ॊ': 'o', 'ो': 'o', 'ौ': 'au',
+    'ॢ': 'lri', 'ॣ': 'lree', VIRAMA: '',
+}
+
+# Everything else that maps one character to one string, whatever surrounds it
+OTHERS = {
+    'ऄ': 'a', 'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ee', 'उ': 'u', 'ऊ': 'oo', 'ऋ': 'ri', 'ॠ': 'ree',
+    'ऌ': 'lri', 'ॡ': 'lree', 'ऍ': 'e', 'ऎ': 'e', 'ए': 'e', 'ऐ': 'ai', 'ऑ': 'o', 'ऒ': 'o', 'ओ': 'o', 'औ': 'au',
+    'ऀ': 'n', 'ँ': 'n', 'ं': 'n', 'ः': 'h', 'ऽ': '', 'ॐ': 'om', NUKTA: '',
+    '।': '.', '॥': '.', '॰': '.',
+    **{chr(0x0966 + digit): str(digit) for digit in range(10)},
+}
+
+# Letters and signs that continue a word (the danda, digits and abbreviation sign end one)
+WORD_CHARACTER = 'ऀ-ॣॱ-ॿ'
+SCRIPT = re.compile('[ऀ-ॿ]')
+
+
+# Consonants written as consonant + nukta, and the single code points they're spelled as here
+_NUKTA_PAIRS = {base + NUKTA: precomposed for precomposed, base in PRECOMPOSED_NUKTA.items()}
+_NUKTA_PAIR = re.compile("|".join(_NUKTA_PAIRS))
+
+_CONSONANT = f"[{''.join(CONSONANTS)}{''.join(PRECOMPOSED_NUKTA)}]"
+_WORD = f"[{WORD_CHARACTER}]"
+_NO_VOWEL_SIGN = f"(?![{''.join(MARKS)}{NUKTA}])"
+# A consonant that keeps its inherent "a": mid-word, in a one-letter word, or ending a word
+# after a conjunct. Hindi drops it at the end of other words ("भारत" is "bhaarat").
+# Nukta pairs are single code points by now, so the lookbehinds are fixed width.
+_INHERENT_VOWEL = re.compile(
+    f"{_CONSONANT}{_NO_VOWEL_SIGN}(?:(?={_WORD})|(?<!{_WORD}.)|(?<={VIRAMA}.))"
+)
+
+
+def _latin_table() -> dict:
+    table = {**CONSONANTS, **MARKS, **OTHERS}
+    for precomposed, base in PRECOMPOSED_NUKTA.items():
+        table[precomposed] = NUKTA_CONSONANTS[base]
+    latin = {code: table.get(chr(code), '') for code in range(0x0900, 0x0980)}
+    return str.maketrans(latin)
+
+
+# Every Devanagari code point to Latin (unknown ones to nothing); the inherent vowel is
+# written as "अ" first, so this needs no context
+_LATIN = _latin_table()
+
+
+def _phrase_pattern(phrases: Dict[str, str]) -> re.Pattern:
+    # Longest first, so "हैं" wins over "है"; whole words only, so "का" doesn't match inside "काम"
+    alternatives = "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+    return re.compile(f"(?<![{WORD_CHARACTER}])(?:{alternatives})(?![{WORD_CHARACTER}])")
+
+
+_PHRASE = _phrase_pattern(PHRASES)
+
+
+def contains_devanagari(text: str) -> bool:
+    return SCRIPT.search(text) is not None
+
+
+def translate_phrases(text: str) -> str:
+    """Replace the known Hindi words and phrases in ``text`` with English, in one pass"""
+    return _PHRASE.sub(lambda match: PHRASES[match.group()], text)
+
+
+def transliterate(text: str) -> str:
+    """Spell the Devanagari in ``text`` in Latin letters.
+
+    Conjuncts keep all their consonants ("प्र" is "pr"), vowel signs replace
+    the inherent vowel, and Hindi's word-final schwa is dropped ("भारत" is
+    "bhaarat"). Text in other scripts passes through unchanged.
+    """
+    if NUKTA in text:
+        text = _NUKTA_PAIR.sub(lambda match: _NUKTA_PAIRS[match.group()], text)
+    return _INHERENT_VOWEL.sub(r"\g<0>अ", text).translate(_LATIN)
+
+
+def to_english(text: str) -> str:
+    """Known phrases in English, the remaining Devanagari transliterated"""
+    if not contains_devanagari(text):
+        return text
+    text = translate_phrases(text)
+    if contains_devanagari(text):
+        text = transliterate(text)
+    return text
@@ -0,0 +1,212 @@
+"""
+TTS Cache Module
+Content-addressed cache of synthesized speech with a memory LRU tier and an optional disk tier
+"""
+
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+from config import Config
+
+
+def normalize_text(text: str) -> str:
+    """Text as it affects the synthesized audio: NFC, trimmed, whitespace collapsed"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(voice_id: str, model_id: str, output_format: str, text: str) -> str:
+    """Key for a synthesis request; identical requests always produce identical audio"""
+    material = "\x00".join((voice_id, model_id, output_format, normalize_text(text)))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache of PCM audio keyed by ``cache_key``.
+
+    The memory tier is an LRU bounded by ``max_bytes``. When ``disk_dir`` is set,
+    every entry is also written there (one file per key) and survives restarts;
+    disk hits are read back and promoted into memory. The disk tier is
+    trimmed to ``disk_max_bytes``, oldest-used files first.
+    """
+
+    def __init__(self, max_bytes: int = None, disk_dir: str = None, disk_max_bytes: int = None,
+                 max_text_chars: int = None):
+        self.max_bytes = Config.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.disk_dir = Config.TTS_CACHE_DIR if disk_dir is None else disk_dir
+        self.disk_max_bytes = Config.TTS_CACHE_DISK_MAX_BYTES if disk_max_bytes is None else disk_max_bytes
+        self.max_text_chars = Config.TTS_CACHE_MAX_TEXT_CHARS if max_text_chars is None else max_text_chars
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.metrics = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'disk_evictions': 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def cacheable(self, text: str) -> bool:
+        """Long one-off replies would only push out the phrases that do repeat"""
+        return 0 < len(normalize_text(text)) <= self.max_text_chars
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+                self.metrics['hits'] += 1
+                return audio
+        audio = self._read_disk(key)
+        with self.lock:
+            if audio is None:
+                self.metrics['misses'] += 1
+                return None
+            self.metrics['disk_hits'] += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self.lock:
+            self.metrics['stores'] += 1
+            self._remember(key, audio)
+        if self.disk_dir:
+            self._write_disk(key, audio)
+
+    def prewarm(self, texts: Iterable[str], synthesize: Callable[[str], bytes], key_for: Callable[[str], str]):
+        """Synthesize and store every phrase in ``texts`` that isn't cached yet"""
+        warmed = 0
+        for text in texts:
+            key = key_for(text)
+            if not self.cacheable(text) or self.get(key) is not None:
+                continue
+            try:
+                self.put(key, synthesize(text))
+                warmed += 1
+            except Exception as e:
+                print(f"⚠️ Could not pre-warm TTS cache for '{text[:30]}': {e}")
+        print(f"🔥 TTS cache pre-warmed with {warmed} new phrases")
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.metrics['hits'] + self.metrics['disk_hits'] + self.metrics['misses']
+            return {
+                **self.metrics,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'disk_bytes': self.disk_bytes,
+                'hit_rate': round((self.metrics['hits'] + self.metrics['disk_hits']) / lookups, 3) if lookups else None,
+            }
+
+    def _remember(self, key: str, audio: bytes):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous)
+        self.entries[key] = audio
+        self.total_bytes += len(audio)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+            self.metrics['evictions'] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                audio = f.read()
+            if not audio:
+                return None
+            os.utime(self._path(key))  # mtime doubles as the disk tier's LRU clock
+            return audio
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            existed = os.path.exists(path)
+            with open(temp_path, 'wb') as f:
+                f.write(audio)
+            os.replace(temp_path, path)  # readers never see a partly written file
+        except OSError as e:
+            print(f"⚠️ Could not write TTS cache file: {e}")
+            return
+        with self.lock:
+            if not existed:
+                self.disk_bytes += len(audio)
+            over = self.disk_bytes > self.disk_max_bytes
+        if over:
+            self._trim_disk()
+
+    def _disk_entries(self):
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.pcm'):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def _trim_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self.lock:
+            self.disk_bytes = total
+            self.metrics['disk_evictions'] += evicted
+
+
+def create_tts_cache() -> Optional[TTSCache]:
+    """Build the TTS cache if TTS_CACHE_ENABLED"""
+    if not Config.TTS_CACHE_ENABLED:
+        return None
+    cache = TTSCache()
+    tiers = f"{cache.max_bytes // (1024 * 1024)}MB memory"
+    if cache.disk_dir:
+        tiers += f" + {cache.disk_max_bytes // (1024 * 1024)}MB disk at {cache.disk_dir}"
+    print(f"🗃️ TTS cache enabled ({tiers})")
+    return cache
+
+
+def prewarm_phrases(phrases: Iterable[str] = (), splitter: Callable = None) -> list:
+    """Phrases to synthesize at startup: ``phrases`` plus TTS_CACHE_PREWARM_FILE lines.
+
+    With ``splitter`` (a factory for the turn pipeline's SentenceSplitter),
+    each phrase is also split the way replies are, so the per-sentence TTS
+    requests it makes hit the cache too.
+    """
+    phrases = list(phrases)
+    if Config.TTS_CACHE_PREWARM_FILE:
+        try:
+            with open(Config.TTS_CACHE_PREWARM_FILE, encoding='utf-8') as f:
+                phrases += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        except OSError as e:
+            print(f"⚠️ Could not read TTS pre-warm phrases: {e}")
+    
+    texts = []
+    for phrase in phrases:
+        sentences = []
+        if splitter is not None:
+            split = splitter()
+            sentences = split.feed(phrase)
+            tail = split.flush()
+            sentences += [tail] if tail else []
+        for text in [phrase, *sentences]:
+            if text not in texts:
+                texts.append(text)
+    return texts
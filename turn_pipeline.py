@@ -0,0 +1,289 @@
+"""
+Turn Pipeline Module
+Runs a conversational turn with LLM streaming and per-sentence TTS overlapped
+"""
+
+import re
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from cancellation import CancelToken
+from config import Config
+from metrics import metrics
+
+# Words that end with a period without ending the sentence
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "vs", "etc", "e.g", "i.e", "u.s"}
+
+# Sentence-ending punctuation (plus any closing quotes/brackets) followed by whitespace
+_BOUNDARY = re.compile(r'[.!?…]+["\'”’)\]]*(?=\s)|\n+')
+_LAST_WORD = re.compile(r'([\w.]+)\.$')
+
+
+class SentenceSplitter:
+    """Incrementally splits a stream of text deltas into speakable sentences"""
+
+    def __init__(self, min_chars: int = None):
+        self.min_chars = Config.PIPELINE_MIN_SENTENCE_CHARS if min_chars is None else min_chars
+        self.buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a text delta and return any sentences that are now complete"""
+        self.buffer += delta
+        sentences = []
+        search_from = 0
+        while True:
+            match = _BOUNDARY.search(self.buffer, search_from)
+            if not match:
+                break
+            end = match.end()
+            candidate = self.buffer[:end].strip()
+            word = _LAST_WORD.search(candidate)
+            if len(candidate) < self.min_chars or (word and word.group(1).lower() in _ABBREVIATIONS):
+                # Too short to be worth a TTS round trip, keep accumulating
+                search_from = end
+                continue
+            sentences.append(candidate)
+            self.buffer = self.buffer[end:].lstrip()
+            search_from = 0
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream has ended"""
+        tail = self.buffer.strip()
+        self.buffer = ""
+        return tail or None
+
+
+class TaggedSink:
+    """Where one sentence's TTS chunks go: the turn's shared event queue, tagged with the sentence's index"""
+
+    def __init__(self, events, index: int):
+        self.events = events
+        self.index = index
+
+    def put(self, item):
+        self.events.put_nowait(('audio', self.index, item))
+
+    put_nowait = put
+
+
+class ReplyOrder:
+    """Turns what a reply's producers post, in the order it happens, into events in speaking order.
+
+    The LLM stream and the TTS workers all post to one queue: ``('delta',
+    text)`` per LLM delta, ``('sentence', text)`` as each sentence is handed
+    to TTS, ``('audio', index, chunk)`` from a TaggedSink (a chunk, then an
+    Exception or None to end), and ``('end', error)`` when the LLM stream
+    is over. ``accept`` yields text deltas straight away, if
+    ``stream_text``, and each sentence's audio once the sentences before it
+    are complete; ``done`` is set once the last sentence is. ``first_audio``
+    is called when the first audio event goes out.
+    """
+
+    def __init__(self, stream_chunks: bool, stream_text: bool, first_audio):
+        self.stream_chunks = stream_chunks
+        self.stream_text = stream_text
+        self.first_audio = first_audio
+        self.sentences = []
+        self.pending = []  # per sentence, items not yet passed on
+        self.chunks = []  # the current sentence's audio, when not streaming chunks
+        self.index = 0  # the sentence being spoken
+        self.ended = False
+        self.error = None
+        self.heard = False
+
+    @property
+    def done(self) -> bool:
+        return self.ended and self.index == len(self.sentences)
+
+    def accept(self, item: tuple) -> Iterator[dict]:
+        kind = item[0]
+        if kind == 'delta':
+            if self.stream_text:
+                yield {'type': 'response_delta', 'text': item[1]}
+            return
+        if kind == 'sentence':
+            self.sentences.append(item[1])
+            self.pending.append([])
+        elif kind == 'audio':
+            self.pending[item[1]].append(item[2])
+        elif kind == 'end':
+            self.ended = True
+            self.error = item[1]
+        while self.index < len(self.sentences) and self.pending[self.index]:
+            chunk = self.pending[self.index].pop(0)
+            if isinstance(chunk, Exception):
+                raise chunk
+            if chunk is not None:
+                if self.stream_chunks:
+                    self._heard()
+                    yield {'type': 'audio_chunk', 'index': self.index, 'pcm': chunk}
+                else:
+                    self.chunks.append(chunk)
+                continue
+            sentence = self.sentences[self.index]
+            if self.stream_chunks:
+                yield {'type': 'audio_end', 'index': self.index, 'text': sentence}
+            else:
+                self._heard()
+                yield {'type': 'audio', 'index': self.index, 'text': sentence, 'pcm': b"".join(self.chunks)}
+                self.chunks = []
+            self.pending[self.index] = None
+            self.index += 1
+        # An LLM failure surfaces after the sentences before it have been spoken
+        if self.done and self.error is not None:
+            raise self.error
+
+    def _heard(self):
+        if not self.heard:
+            self.heard = True
+            self.first_audio()
+
+
+class TurnEngine:
+    """Pipelines STT -> streamed LLM -> per-sentence TTS for one conversational turn.
+
+    Turns are consumed as a stream of event dicts so every caller (HTTP, Socket.IO,
+    CLI) can push audio to its client as soon as a segment is ready:
+
+    - ``{'type': 'transcript', 'text': ...}``
+    - ``{'type': 'audio', 'index': n, 'text': sentence, 'pcm': bytes}``
+    - ``{'type': 'response', 'text': ...}``
+    - ``{'type': 'done', 'segments': n, 'timings': {...}}``
+
+    With ``stream_chunks=True`` each sentence is instead delivered as it is
+    synthesized: ``{'type': 'audio_chunk', 'index': n, 'pcm': bytes}`` events
+    followed by ``{'type': 'audio_end', 'index': n, 'text': sentence}``.
+    With ``stream_text=True`` the answer's text is also delivered as the LLM
+    generates it, ahead of the audio: ``{'type': 'response_delta', 'text': delta}``.
+    The PCM is at ``sample_rate`` when given, else the TTS client's SAMPLE_RATE.
+
+    When ``cancel`` fires, STT stops waiting, the LLM and TTS streams are
+    closed, queued sentences are dropped and the turn raises ``Cancelled``.
+    """
+
+    def __init__(self, elevenlabs_client, openai_client, tts_workers: int = None, min_sentence_chars: int = None):
+        self.elevenlabs_client = elevenlabs_client
+        self.openai_client = openai_client
+        self.min_sentence_chars = min_sentence_chars
+        self.executor = ThreadPoolExecutor(
+            max_workers=tts_workers or Config.PIPELINE_TTS_WORKERS,
+            thread_name_prefix="tts"
+        )
+
+    def stats(self) -> dict:
+        return {
+            'mode': 'sync',
+            'tts_workers': self.executor._max_workers,
+            'stt': self.elevenlabs_client.stt_strategy.stats(),
+        }
+
+    def _synthesize(self, sentence: str, sink: queue.Queue, cancel: CancelToken = None, session_id: str = None,
+                    sample_rate: int = None):
+        """Pump TTS chunks for one sentence into ``sink``, ending with None"""
+        try:
+            with metrics.session(session_id):
+                for chunk in self.elevenlabs_client.tts_stream(sentence, cancel=cancel, sample_rate=sample_rate):
+                    sink.put(chunk)
+        except Exception as e:
+            sink.put(e)
+        finally:
+            sink.put(None)
+
+    @staticmethod
+    def _next(items: queue.Queue, cancel: CancelToken = None):
+        """Block for the next item, raising Cancelled as soon as ``cancel`` fires"""
+        if cancel is None:
+            return items.get()
+        while True:
+            cancel.raise_if_cancelled()
+            try:
+                return items.get(timeout=0.05)
+            except queue.Empty:
+                continue
+
+    def run(self, audio: bytes, system_prompt: str = None, stream_chunks: bool = False, session=None,
+            cancel: CancelToken = None, sample_rate: int = None, stream_text: bool = False) -> Iterator[dict]:
+        """Transcribe ``audio`` and stream the reply events for it into ``session``'s history"""
+        started_at = time.perf_counter()
+        with metrics.session(session.session_id if session is not None else None):
+            transcript = self.elevenlabs_client.stt(audio, cancel=cancel)
+        stt_seconds = time.perf_counter() - started_at
+        yield {'type': 'transcript', 'text': transcript}
+
+        if not transcript or not transcript.strip():
+            return
+
+        yield from self.respond(transcript, system_prompt, started_at=started_at, timings={'stt': stt_seconds},
+                                stream_chunks=stream_chunks, session=session, cancel=cancel,
+                                sample_rate=sample_rate, stream_text=stream_text)
+
+    def respond(self, prompt: str, system_prompt: str = None, started_at: float = None,
+                timings: dict = None, stream_chunks: bool = False, session=None,
+                cancel: CancelToken = None, sample_rate: int = None, stream_text: bool = False) -> Iterator[dict]:
+        """Stream reply events for an already transcribed prompt"""
+        started_at = started_at or time.perf_counter()
+        llm_started_at = time.perf_counter()
+        timings = dict(timings or {})
+        events = queue.Queue()
+        response_parts = []
+        futures = []
+        abandoned = threading.Event()
+        session_id = session.session_id if session is not None else None
+
+        def submit(sentence: str):
+            if abandoned.is_set():
+                return
+            sink = TaggedSink(events, len(futures))
+            events.put(('sentence', sentence))
+            futures.append(self.executor.submit(self._synthesize, sentence, sink, cancel, session_id, sample_rate))
+
+        def produce():
+            splitter = SentenceSplitter(self.min_sentence_chars)
+            error = None
+            stream = self.openai_client.ask_stream(prompt, system_prompt, session=session, cancel=cancel)
+            try:
+                for delta in stream:
+                    if abandoned.is_set():
+                        # Closing the stream hangs up on the completion and keeps it out of the history
+                        stream.close()
+                        return
+                    if not response_parts:
+                        timings['llm_first_token'] = time.perf_counter() - llm_started_at
+                    response_parts.append(delta)
+                    events.put(('delta', delta))
+                    for sentence in splitter.feed(delta):
+                        submit(sentence)
+                tail = splitter.flush()
+                if tail:
+                    submit(tail)
+                timings['llm_total'] = time.perf_counter() - llm_started_at
+            except Exception as e:
+                error = e
+            finally:
+                events.put(('end', error))
+
+        threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+
+        order = ReplyOrder(stream_chunks, stream_text, lambda: self._mark_first_audio(timings, started_at))
+        try:
+            while not order.done:
+                yield from order.accept(self._next(events, cancel))
+        finally:
+            # Abandoned or failed turn: stop reading the answer and don't synthesize sentences nobody will hear
+            abandoned.set()
+            skipped = sum(1 for future in list(futures) if future.cancel())
+            if cancel is not None and cancel.cancelled:
+                cancel.note('tts_sentences_skipped', skipped)
+
+        timings['total'] = time.perf_counter() - started_at
+        metrics.observe_turn(timings, session_id)
+        yield {'type': 'response', 'text': "".join(response_parts).strip()}
+        yield {'type': 'done', 'segments': order.index, 'timings': timings}
+
+    @staticmethod
+    def _mark_first_audio(timings: dict, started_at: float):
+        timings['time_to_first_audio'] = time.perf_counter() - started_at
+        print(f"⏱️ Time to first audio: {timings['time_to_first_audio']:.2f}s")
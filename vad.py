@@ -0,0 +1,238 @@
+"""
+VAD Module
+Voice activity detection and endpointing for microphone capture
+"""
+
+from typing import List, NamedTuple, Optional
+import numpy as np
+from config import Config
+from ring_buffer import RingBuffer
+
+
+class FrameVAD:
+    """Classifies fixed-length frames of audio as speech or not.
+
+    Engines implement ``classify``, which gets a batch of frames as a float
+    array of shape ``(frames, frame_length)`` scaled to [-1, 1] and returns one
+    boolean per frame. Frames always arrive in capture order, so engines may
+    keep state (a noise estimate, hysteresis) between calls.
+    """
+
+    name = "base"
+
+    def __init__(self, sample_rate: int, frame_ms: int = None):
+        self.sample_rate = sample_rate
+        self.frame_ms = Config.VAD_FRAME_MS if frame_ms is None else frame_ms
+        if not 10 <= self.frame_ms <= 30:
+            raise ValueError("VAD frames must be 10-30 ms long")
+        self.frame_length = sample_rate * self.frame_ms // 1000
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class EnergyVAD(FrameVAD):
+    """Mean absolute amplitude against a fixed threshold (the original endpointing rule)"""
+
+    name = "energy"
+
+    def __init__(self, sample_rate: int, frame_ms: int = None, threshold: float = 0.01):
+        super().__init__(sample_rate, frame_ms)
+        self.threshold = threshold
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        return np.abs(frames).mean(axis=1) > self.threshold
+
+
+class SpectralVAD(FrameVAD):
+    """Energy above an adaptive noise floor, checked against the frame's spectrum.
+
+    Features for a whole batch of frames come from one windowed FFT: the log
+    energy in the speech band (so hum and rumble below it don't count) and the
+    spectral flatness of that band (voiced speech is peaky, fans and hiss are
+    flat). A frame is speech when its band energy is ``margin_db`` above the
+    noise floor and it is either tonal or much louder than the floor (unvoiced
+    consonants). The floor follows non-speech frames: quickly when the room
+    gets quieter, slowly when it gets louder.
+    """
+
+    name = "spectral"
+
+    SPEECH_BAND_HZ = (250, 4000)
+    MIN_SPEECH_DBFS = -55.0
+    MAX_FLATNESS = 0.3
+    # Once in speech, frames may be this much quieter and still count (hysteresis)
+    RELEASE_DB = 3.0
+    FLOOR_FALL_RATE = 0.3
+    FLOOR_RISE_RATE = 0.05
+    FLOOR_SPEECH_RATE = 0.002
+
+    def __init__(self, sample_rate: int, frame_ms: int = None, margin_db: float = None):
+        super().__init__(sample_rate, frame_ms)
+        self.margin_db = Config.VAD_MARGIN_DB if margin_db is None else margin_db
+        self.window = np.hanning(self.frame_length).astype(np.float32)
+        self.window_energy = float(np.sum(self.window ** 2))
+        frequencies = np.fft.rfftfreq(self.frame_length, 1.0 / sample_rate)
+        self.band = (frequencies >= self.SPEECH_BAND_HZ[0]) & (frequencies <= self.SPEECH_BAND_HZ[1])
+        self.reset()
+
+    def reset(self):
+        self.noise_floor_db = None
+        self.active = False
+
+    def features(self, frames: np.ndarray) -> tuple:
+        """(speech band energy dBFS, spectral flatness within the band) for each frame"""
+        band = np.abs(np.fft.rfft(frames * self.window, axis=1)[:, self.band]) ** 2 + 1e-12
+        # Parseval: twice the one-sided band power over the window energy is the band's mean square
+        energy_db = 10 * np.log10(2 * band.sum(axis=1) / (self.frame_length * self.window_energy) + 1e-10)
+        flatness = np.exp(np.log(band).mean(axis=1)) / band.mean(axis=1)
+        return energy_db, flatness
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        energy_db, flatness = self.features(frames)
+        # Only the floor tracking is sequential; everything per frame is vectorized above
+        candidates = energy_db > self.MIN_SPEECH_DBFS
+        tonal = flatness <= self.MAX_FLATNESS
+        decisions = np.zeros(len(frames), dtype=bool)
+        for i, energy in enumerate(energy_db):
+            if self.noise_floor_db is None:
+                self.noise_floor_db = float(energy)
+            excess = energy - self.noise_floor_db
+            margin = self.margin_db - (self.RELEASE_DB if self.active else 0.0)
+            speech = candidates[i] and excess >= margin and (tonal[i] or excess >= 2 * margin)
+            if speech:
+                rate = self.FLOOR_SPEECH_RATE
+            else:
+                rate = self.FLOOR_FALL_RATE if excess < 0 else self.FLOOR_RISE_RATE
+            self.noise_floor_db += rate * excess
+            decisions[i] = self.active = speech
+        return decisions
+
+    def stats(self) -> dict:
+        return {'noise_floor_dbfs': None if self.noise_floor_db is None else round(self.noise_floor_db, 1)}
+
+
+# VAD_ENGINE name -> engine class; a new engine only needs a FrameVAD subclass added here
+ENGINES = {engine.name: engine for engine in (EnergyVAD, SpectralVAD)}
+
+
+class VADEvent(NamedTuple):
+    """``start`` (speech began; samples are the pre-roll and onset), ``speech`` or ``end``.
+
+    ``offset`` is the frame index in the stream where ``samples`` begin, or
+    where the utterance ended for ``end``.
+    """
+    kind: str
+    samples: Optional[np.ndarray]
+    offset: int
+
+
+class Endpointer:
+    """Splits a stream of int16 samples into utterances using a FrameVAD.
+
+    An utterance starts after ``min_speech_ms`` of consecutive speech frames
+    and includes the ``pre_roll_ms`` before them, so soft onsets aren't
+    clipped. It ends once ``hangover_ms`` of non-speech has passed; pauses
+    shorter than that, and the hangover itself, stay in the utterance.
+    ``feed`` accepts chunks of any size (interleaved if ``channels`` > 1).
+    """
+
+    def __init__(self, vad: FrameVAD, channels: int = 1, pre_roll_ms: int = None,
+                 hangover_ms: int = None, min_speech_ms: int = None):
+        self.vad = vad
+        self.channels = channels
+        frame_ms = vad.frame_ms
+        self.pre_roll_ms = Config.VAD_PRE_ROLL_MS if pre_roll_ms is None else pre_roll_ms
+        self.hangover_ms = Config.VAD_HANGOVER_MS if hangover_ms is None else hangover_ms
+        min_speech_ms = Config.VAD_MIN_SPEECH_MS if min_speech_ms is None else min_speech_ms
+        self.hangover_frames = max(1, -(-self.hangover_ms // frame_ms))
+        self.min_speech_frames = max(1, -(-min_speech_ms // frame_ms))
+        self.frame_samples = vad.frame_length * channels
+        pre_roll_samples = vad.sample_rate * self.pre_roll_ms // 1000 * channels
+        self.pre_roll = RingBuffer(pre_roll_samples + self.min_speech_frames * self.frame_samples)
+        self.remainder = np.zeros(0, dtype=np.int16)
+        self.counters = {'frames': 0, 'speech_frames': 0, 'utterances': 0}
+        self.reset()
+
+    def reset(self):
+        self.vad.reset()
+        self.remainder = self.remainder[:0]
+        self.position = 0  # frames (per channel) consumed so far
+        self.end_utterance()
+
+    def end_utterance(self):
+        """Close the current utterance now (e.g. push-to-talk release), keeping the VAD's noise estimate"""
+        self.pre_roll.clear()
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+
+    def feed(self, samples: np.ndarray) -> List[VADEvent]:
+        """Consume ``samples`` and return the events they complete, in order"""
+        data = np.concatenate((self.remainder, samples)) if len(self.remainder) else samples
+        count = len(data) // self.frame_samples
+        self.remainder = data[count * self.frame_samples:].copy()
+        if not count:
+            return []
+
+        framed = data[:count * self.frame_samples].reshape(count, self.vad.frame_length, self.channels)
+        decisions = self.vad.classify(framed.mean(axis=2, dtype=np.float32) / 32768.0)
+        self.counters['frames'] += count
+        self.counters['speech_frames'] += int(decisions.sum())
+
+        events = []
+        run_start = None  # first sample of the current run of in-utterance frames
+        for i, speech in enumerate(decisions):
+            frame = data[i * self.frame_samples:(i + 1) * self.frame_samples]
+            position = self.position + i * self.vad.frame_length
+            if not self.in_speech:
+                self.pre_roll.write(frame)
+                self.speech_run = self.speech_run + 1 if speech else 0
+                if self.speech_run >= self.min_speech_frames:
+                    onset = self.pre_roll.read()
+                    start = position + self.vad.frame_length - len(onset) // self.channels
+                    events.append(VADEvent('start', onset, start))
+                    self.pre_roll.clear()
+                    self.in_speech = True
+                    self.silence_run = 0
+                    run_start = (i + 1) * self.frame_samples
+                continue
+            if run_start is None:
+                run_start = i * self.frame_samples
+            self.silence_run = 0 if speech else self.silence_run + 1
+            if self.silence_run >= self.hangover_frames:
+                self._flush_run(events, data, run_start, (i + 1) * self.frame_samples)
+                events.append(VADEvent('end', None, position + self.vad.frame_length))
+                self.counters['utterances'] += 1
+                self.in_speech = False
+                self.speech_run = 0
+                run_start = None
+        if self.in_speech:
+            self._flush_run(events, data, run_start, count * self.frame_samples)
+        self.position += count * self.vad.frame_length
+        return events
+
+    def _flush_run(self, events: List[VADEvent], data: np.ndarray, start: Optional[int], end: int):
+        if start is not None and end > start:
+            offset = self.position + start // self.channels
+            events.append(VADEvent('speech', data[start:end], offset))
+
+    def stats(self) -> dict:
+        return {'engine': self.vad.name, **self.counters, **self.vad.stats()}
+
+
+def create_endpointer(sample_rate: int = None, channels: int = None, engine: str = None,
+                      hangover_ms: int = None) -> Endpointer:
+    """Build the Endpointer for VAD_ENGINE"""
+    engine = engine or Config.VAD_ENGINE
+    if engine not in ENGINES:
+        print(f"⚠️ Unknown VAD engine '{engine}', using spectral")
+        engine = SpectralVAD.name
+    vad = ENGINES[engine](Config.SAMPLE_RATE if sample_rate is None else sample_rate)
+    return Endpointer(vad, Config.CHANNELS if channels is None else channels, hangover_ms=hangover_ms)